@@ -2,4 +2,15 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# Import po inicjalizacji Django (moduł korzysta z modeli)
+from search.sse import EVENTS_PATH_RE, search_events_app  # noqa: E402
+
+
+async def application(scope, receive, send):
+    """Strumień zdarzeń wyszukiwania obsługiwany poza Django, pozostałe żądania przez Django."""
+    if scope["type"] == "http" and EVENTS_PATH_RE.match(scope["path"]):
+        await search_events_app(scope, receive, send)
+    else:
+        await django_application(scope, receive, send)
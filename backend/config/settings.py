@@ -26,6 +26,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",        # Framework sesji
     "django.contrib.messages",        # Framework wiadomości
     "django.contrib.staticfiles",     # Obsługa plików statycznych
+    "django.contrib.postgres",        # Wyszukiwanie pełnotekstowe Postgres
     "rest_framework",                 # Django REST Framework
     "corsheaders",                    # Obsługa CORS
     "search",                         # Aplikacja wyszukiwania
@@ -123,3 +124,175 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 # Strefa czasowa Celery
 CELERY_TIMEZONE = 'UTC'
+
+# Pula sesji Selenium (osobna w każdym procesie workera Celery)
+# Maksymalna liczba równoczesnych sesji w jednym procesie
+SELENIUM_POOL_MAX_SIZE = int(os.environ.get('SELENIUM_POOL_MAX_SIZE', 2))
+# Liczba sesji tworzonych z wyprzedzeniem przy starcie procesu
+SELENIUM_POOL_WARM_SIZE = int(os.environ.get('SELENIUM_POOL_WARM_SIZE', 1))
+# Maksymalna liczba wypożyczeń jednej sesji przed jej odtworzeniem
+SELENIUM_POOL_MAX_USES = int(os.environ.get('SELENIUM_POOL_MAX_USES', 50))
+# Maksymalny wiek sesji w sekundach (musi być krótszy niż timeout sesji na Selenium Grid)
+SELENIUM_POOL_MAX_AGE = int(os.environ.get('SELENIUM_POOL_MAX_AGE', 600))
+# Maksymalny czas oczekiwania na wolną sesję w sekundach
+SELENIUM_POOL_ACQUIRE_TIMEOUT = int(os.environ.get('SELENIUM_POOL_ACQUIRE_TIMEOUT', 120))
+
+# Nadpisania warunków gotowości stron dla poszczególnych serwisów, np.
+# {"rp.pl": {"article": [("dom_ready", {}, 5)]}} (patrz search/readiness.py)
+SEARCH_READINESS = {}
+
+# Domyślna liczba artykułów przetwarzanych równolegle w jednym wyszukiwaniu
+SEARCH_ARTICLE_CONCURRENCY = int(os.environ.get('SEARCH_ARTICLE_CONCURRENCY', 2))
+# Górny limit równoległości, który może zażądać klient API
+SEARCH_MAX_ARTICLE_CONCURRENCY = int(os.environ.get('SEARCH_MAX_ARTICLE_CONCURRENCY', 4))
+
+# Podział wyszukiwania na zadania per artykuł w osobnych kolejkach
+# (wyłączenie przywraca przetwarzanie całego wyszukiwania w jednym zadaniu)
+SEARCH_FAN_OUT = os.environ.get('SEARCH_FAN_OUT', '1') == '1'
+# Kolejki Celery: wyszukiwanie linków, renderowanie w przeglądarce, pobieranie HTTP.
+# Każda kolejka może mieć własną pulę workerów skalowaną niezależnie.
+CELERY_TASK_ROUTES = {
+    'search.tasks.perform_search': {'queue': 'discovery'},
+    'search.tasks.finalize_search': {'queue': 'discovery'},
+    'search.tasks.fail_search': {'queue': 'discovery'},
+    'search.tasks.render_article': {'queue': 'render'},
+    'search.tasks.download_article': {'queue': 'download'},
+    'search.tasks.refetch_article': {'queue': 'render'},
+    'search.tasks.evict_artifacts': {'queue': 'discovery'},
+    'search.tasks.index_article_text': {'queue': 'discovery'},
+}
+# Długie zadania - worker pobiera z kolejki tylko jedno zadanie naraz
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
+# Po ilu dniach ponownie próbować szybkiej ścieżki HTTP dla serwisu,
+# dla którego wcześniej potrzebne było Selenium
+SEARCH_STRATEGY_RECHECK_DAYS = int(os.environ.get('SEARCH_STRATEGY_RECHECK_DAYS', 7))
+
+# Silnik pobierania plików (search/downloader.py)
+# Rozmiar fragmentu zapisywanego na dysk w bajtach
+DOWNLOAD_CHUNK_SIZE = int(os.environ.get('DOWNLOAD_CHUNK_SIZE', 64 * 1024))
+# Liczba ponowień nieudanego pobrania
+DOWNLOAD_RETRIES = int(os.environ.get('DOWNLOAD_RETRIES', 3))
+# Bazowe opóźnienie ponowienia w sekundach (podwajane przy każdej próbie)
+DOWNLOAD_BACKOFF_BASE = float(os.environ.get('DOWNLOAD_BACKOFF_BASE', 1.0))
+# Maksymalna liczba równoczesnych połączeń do jednego hosta
+DOWNLOAD_PER_HOST_LIMIT = int(os.environ.get('DOWNLOAD_PER_HOST_LIMIT', 4))
+# Liczba hostów, dla których utrzymywane są pule połączeń
+DOWNLOAD_POOL_CONNECTIONS = int(os.environ.get('DOWNLOAD_POOL_CONNECTIONS', 20))
+# Liczba równoległych pobrań plików PDF w tle podczas przetwarzania artykułów (process_articles)
+DOWNLOAD_CONCURRENCY = int(os.environ.get('DOWNLOAD_CONCURRENCY', 8))
+
+# Redis dla pamięci podręcznej, blokad i metryk (osobna baza niż broker Celery)
+REDIS_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/1')
+# Pamięć podręczna Django współdzielona przez wszystkie procesy
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': REDIS_URL,
+    }
+}
+# Czas przechowywania wpisu pamięci podręcznej wyrenderowanych artykułów w sekundach
+RENDER_CACHE_TTL = int(os.environ.get('RENDER_CACHE_TTL', 7 * 24 * 3600))
+
+# Łączenie identycznych wyszukiwań (search/coalescing.py)
+# Jak długo zakończone wyszukiwanie jest zwracane ponownie zamiast uruchamiania nowego (0 = wyłączone)
+SEARCH_CACHE_TTL = int(os.environ.get('SEARCH_CACHE_TTL', 3600))
+# Po ilu sekundach wyszukiwanie bez wyniku nie przyjmuje już nowych żądań (np. po awarii workera)
+SEARCH_COALESCE_MAX_AGE = int(os.environ.get('SEARCH_COALESCE_MAX_AGE', 1800))
+
+# Zapis wyników w trakcie wyszukiwania: liczba artykułów w jednej partii bulk_create
+SEARCH_RESULT_BATCH_SIZE = int(os.environ.get('SEARCH_RESULT_BATCH_SIZE', 5))
+# Maksymalny czas w sekundach, przez jaki gotowy artykuł czeka w buforze na zapis
+SEARCH_RESULT_FLUSH_INTERVAL = float(os.environ.get('SEARCH_RESULT_FLUSH_INTERVAL', 2.0))
+
+# Odstęp w sekundach między komentarzami podtrzymującymi strumień zdarzeń SSE
+SSE_HEARTBEAT_INTERVAL = int(os.environ.get('SSE_HEARTBEAT_INTERVAL', 15))
+
+# Czas przechowywania migawki stanu wyszukiwania (endpoint statusu) w sekundach
+SEARCH_SNAPSHOT_TTL = int(os.environ.get('SEARCH_SNAPSHOT_TTL', 3600))
+
+# Sposób wydawania plików artykułów: "django" (FileResponse) albo "nginx"
+# (Django autoryzuje żądanie, nginx wysyła plik przez X-Accel-Redirect)
+FILE_SERVE_MODE = os.environ.get('FILE_SERVE_MODE', 'django')
+# Wewnętrzna lokalizacja nginx wskazująca na MEDIA_ROOT (patrz nginx/nginx.conf)
+FILE_ACCEL_PREFIX = os.environ.get('FILE_ACCEL_PREFIX', '/protected-media/')
+# Czas przechowywania plików z magazynu artefaktów w pamięci podręcznej klientów (sekundy)
+FILE_CACHE_MAX_AGE = int(os.environ.get('FILE_CACHE_MAX_AGE', 365 * 24 * 3600))
+
+# Cykl życia plików artykułów (search/lifecycle.py)
+# Limit miejsca zajmowanego przez magazyn artefaktów w bajtach
+ARTICLES_QUOTA_BYTES = int(os.environ.get('ARTICLES_QUOTA_BYTES', 10 * 1024 ** 3))
+# Po przekroczeniu limitu pliki są usuwane do tej części limitu (zapas przed kolejnym przebiegiem)
+ARTICLES_EVICTION_TARGET = float(os.environ.get('ARTICLES_EVICTION_TARGET', 0.9))
+# Pliki nieużywane dłużej niż tyle dni są usuwane niezależnie od limitu (0 = wyłączone)
+ARTICLES_MAX_IDLE_DAYS = int(os.environ.get('ARTICLES_MAX_IDLE_DAYS', 90))
+# Dokładność zapisu czasu ostatniego użycia pliku w sekundach
+ARTICLES_ACCESS_RESOLUTION = int(os.environ.get('ARTICLES_ACCESS_RESOLUTION', 3600))
+# Co ile sekund uruchamiać zadanie usuwania plików (Celery beat)
+ARTICLES_EVICTION_INTERVAL = int(os.environ.get('ARTICLES_EVICTION_INTERVAL', 3600))
+# Zadania okresowe (Celery beat)
+CELERY_BEAT_SCHEDULE = {
+    'evict-artifacts': {
+        'task': 'search.tasks.evict_artifacts',
+        'schedule': ARTICLES_EVICTION_INTERVAL,
+    },
+}
+
+# Ograniczanie tempa żądań do serwisów (search/ratelimit.py), wspólne dla wszystkich workerów
+# Domyślne tempo: żądania na sekundę na domenę i liczba żądań dozwolonych naraz (pojemność kubełka)
+RATE_LIMIT_DEFAULT_RATE = float(os.environ.get('RATE_LIMIT_DEFAULT_RATE', 2.0))
+RATE_LIMIT_DEFAULT_BURST = int(os.environ.get('RATE_LIMIT_DEFAULT_BURST', 4))
+# Tempo dla poszczególnych serwisów (obejmuje subdomeny): domena -> (żądania/s, pojemność)
+SITE_RATE_LIMITS = {
+    'onet.pl': (1.0, 2),
+    'rp.pl': (1.0, 2),
+}
+# Jak długo (sekundy) obowiązuje spowolnienie po wykryciu blokady
+RATE_LIMIT_PENALTY_TTL = int(os.environ.get('RATE_LIMIT_PENALTY_TTL', 300))
+# Maksymalny czas oczekiwania na token w sekundach
+RATE_LIMIT_MAX_WAIT = int(os.environ.get('RATE_LIMIT_MAX_WAIT', 60))
+
+# Profil blokowania zasobów stron artykułów: none, standard albo aggressive (search/blocking.py)
+SEARCH_BLOCKING_PROFILE = os.environ.get('SEARCH_BLOCKING_PROFILE', 'standard')
+# Profile dla poszczególnych serwisów, np. {"onet.pl": "aggressive"}
+SITE_BLOCKING_PROFILES = {}
+
+# Tryb generowania PDF ze stron artykułów: reader (sama treść, search/reader.py) albo full (wydruk całej strony)
+SEARCH_RENDER_MODE = os.environ.get('SEARCH_RENDER_MODE', 'reader')
+# Tryby dla poszczególnych serwisów, np. {"onet.pl": "full"}
+SITE_RENDER_MODES = {}
+# Minimalna długość tekstu akapitów, przy której treść artykułu trafia do PDF w trybie reader
+READER_MIN_TEXT_LENGTH = int(os.environ.get('READER_MIN_TEXT_LENGTH', 500))
+
+# Rozmiar fragmentu (w bajtach) odczytywanego ze strumienia wydruku PDF (CDP IO.read)
+PRINT_CHUNK_SIZE = int(os.environ.get('PRINT_CHUNK_SIZE', 1024 * 1024))
+
+# Nadpisania adapterów serwisów (search/sites.py), np.
+# {"example.pl": {"search_url": "https://example.pl/szukaj?q={query}", "result_selectors": [".wynik a"]}}
+SITE_ADAPTERS = {}
+# Liczba wyuczonych selektorów wyników sprawdzanych przed pełną listą selektorów ogólnych
+SELECTOR_LEARNED_LIMIT = int(os.environ.get('SELECTOR_LEARNED_LIMIT', 3))
+# Liczba kolejnych chybień, po której wyuczony selektor przestaje być sprawdzany jako pierwszy
+SELECTOR_MAX_MISSES = int(os.environ.get('SELECTOR_MAX_MISSES', 3))
+
+# Domyślna liczba artykułów zbieranych przez wyszukiwanie
+SEARCH_DEFAULT_RESULTS = int(os.environ.get('SEARCH_DEFAULT_RESULTS', 10))
+# Największa liczba artykułów, jaką można zamówić w jednym wyszukiwaniu (parametr max_results)
+SEARCH_MAX_RESULTS = int(os.environ.get('SEARCH_MAX_RESULTS', 200))
+# Największa liczba stron wyników wyszukiwania przeglądanych w jednym wyszukiwaniu
+SEARCH_MAX_PAGES = int(os.environ.get('SEARCH_MAX_PAGES', 20))
+
+# Rozmiar filtra Blooma widzianych adresów w bitach (2^24 bitów = 2 MiB w Redis,
+# ok. 1% fałszywych trafień przy 1,7 mln adresów)
+SEEN_BLOOM_BITS = int(os.environ.get('SEEN_BLOOM_BITS', 2 ** 24))
+# Liczba funkcji skrótu filtra Blooma
+SEEN_BLOOM_HASHES = int(os.environ.get('SEEN_BLOOM_HASHES', 7))
+
+# Konfiguracja wyszukiwania pełnotekstowego Postgres dla lokalnej biblioteki artykułów
+# ("simple" jest dostępna zawsze; słownik polski wymaga instalacji w bazie)
+LIBRARY_SEARCH_CONFIG = os.environ.get('LIBRARY_SEARCH_CONFIG', 'simple')
+# Największa liczba znaków tekstu indeksowanego z jednego pliku
+LIBRARY_MAX_TEXT_LENGTH = int(os.environ.get('LIBRARY_MAX_TEXT_LENGTH', 500000))
+# Domyślna i największa liczba wyników wyszukiwania w lokalnej bibliotece
+LIBRARY_RESULTS_LIMIT = int(os.environ.get('LIBRARY_RESULTS_LIMIT', 20))
+LIBRARY_MAX_RESULTS_LIMIT = int(os.environ.get('LIBRARY_MAX_RESULTS_LIMIT', 100))
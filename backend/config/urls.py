@@ -6,10 +6,14 @@ Definiuje główne endpointy dla panelu admina i API.
 from django.contrib import admin
 from django.urls import path, include
 
+from . import views
+
 # Lista głównych tras URL projektu
 urlpatterns = [
     # Panel administracyjny Django
     path("admin/", admin.site.urls),
     # Trasy API aplikacji search
     path("api/", include("search.urls")),
+    # Metryki w formacie Prometheus (pobierane bezpośrednio z backendu, poza nginx)
+    path("metrics", views.metrics, name="metrics"),
 ]
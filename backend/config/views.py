@@ -1,10 +1,14 @@
 """
 Widoki konfiguracyjne projektu.
-Zawiera podstawowy widok testowy do sprawdzenia połączenia z bazą danych.
+Zawiera podstawowy widok testowy do sprawdzenia połączenia z bazą danych
+oraz eksport metryk dla Prometheusa.
 """
 
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.db import connection
+from redis.exceptions import RedisError
+
+from search import metrics as app_metrics
 
 
 def hello(request):
@@ -17,3 +21,16 @@ def hello(request):
         cursor.execute("SELECT 'Hello from PostgreSQL!'")
         row = cursor.fetchone()
     return JsonResponse({"message": row[0]})
+
+
+def metrics(request):
+    """
+    Metryki aplikacji w formacie tekstowym Prometheus: liczniki i histogramy
+    z search/metrics.py, m.in. czasy etapów wyszukiwania (search_stage_seconds
+    z etykietami stage, site i queue).
+    """
+    try:
+        body = app_metrics.exposition()
+    except RedisError:
+        return HttpResponse("metrics unavailable\n", status=503, content_type="text/plain")
+    return HttpResponse(body, content_type=app_metrics.CONTENT_TYPE)
@@ -4,7 +4,18 @@ Rejestruje modele SearchQuery i FoundArticle w panelu admina.
 """
 
 from django.contrib import admin
-from .models import SearchQuery, FoundArticle
+from .models import ArticleText, Artifact, SearchQuery, SearchStageTiming, FoundArticle, SeenUrl, SelectorStat, SiteProfile
+
+
+class SearchStageTimingInline(admin.TabularInline):
+    """
+    Czasy etapów wyszukiwania wyświetlane na stronie SearchQuery.
+    """
+    model = SearchStageTiming
+    # Pomiary są zapisywane tylko przez zadania
+    readonly_fields = ("stage", "count", "total_seconds", "max_seconds")
+    extra = 0
+    can_delete = False
 
 
 @admin.register(SearchQuery)
@@ -16,6 +27,8 @@ class SearchQueryAdmin(admin.ModelAdmin):
     list_display = ("id", "query", "site", "status", "created_at")
     # Pola tylko do odczytu
     readonly_fields = ("created_at",)
+    # Czasy etapów wyszukiwania
+    inlines = [SearchStageTimingInline]
 
 
 @admin.register(FoundArticle)
@@ -24,6 +37,77 @@ class FoundArticleAdmin(admin.ModelAdmin):
     Konfiguracja wyświetlania modelu FoundArticle w panelu admina.
     """
     # Kolumny wyświetlane w liście
-    list_display = ("id", "title", "url", "downloaded", "pdf_filename", "created_at")
+    list_display = ("id", "title", "url", "downloaded", "evicted", "artifact", "created_at")
     # Pola tylko do odczytu
     readonly_fields = ("created_at",)
+
+
+@admin.register(SiteProfile)
+class SiteProfileAdmin(admin.ModelAdmin):
+    """
+    Konfiguracja wyświetlania modelu SiteProfile w panelu admina.
+    """
+    # Kolumny wyświetlane w liście
+    list_display = ("domain", "fetch_strategy", "js_only", "updated_at")
+    # Pola edytowalne bezpośrednio na liście
+    list_editable = ("fetch_strategy", "js_only")
+    # Pola adaptera serwisu (puste = adapter wbudowany lub z ustawień)
+    fieldsets = (
+        (None, {"fields": ("domain", "fetch_strategy", "js_only")}),
+        ("Adapter", {"fields": (
+            "search_url", "page_url", "result_selectors", "next_page_selector", "consent_selector",
+            "search_input_selector",
+        )}),
+    )
+
+
+@admin.register(SelectorStat)
+class SelectorStatAdmin(admin.ModelAdmin):
+    """
+    Konfiguracja wyświetlania modelu SelectorStat w panelu admina.
+    """
+    # Kolumny wyświetlane w liście
+    list_display = ("domain", "selector", "hits", "misses", "last_hit_at")
+    # Filtrowanie po serwisie
+    list_filter = ("domain",)
+
+
+@admin.register(Artifact)
+class ArtifactAdmin(admin.ModelAdmin):
+    """
+    Konfiguracja wyświetlania modelu Artifact w panelu admina.
+    """
+    # Kolumny wyświetlane w liście
+    list_display = ("sha256", "ext", "size", "ref_count", "evicted", "last_accessed_at", "created_at")
+    # Filtry w panelu bocznym
+    list_filter = ("evicted", "ext")
+    # Pola tylko do odczytu
+    readonly_fields = ("sha256", "ext", "size", "ref_count", "evicted", "last_accessed_at", "created_at")
+
+
+@admin.register(SeenUrl)
+class SeenUrlAdmin(admin.ModelAdmin):
+    """
+    Konfiguracja wyświetlania modelu SeenUrl w panelu admina.
+    """
+    # Kolumny wyświetlane w liście
+    list_display = ("url", "first_seen_at", "last_seen_at")
+    # Wyszukiwanie po adresie
+    search_fields = ("url",)
+    # Pola tylko do odczytu
+    readonly_fields = ("url_hash", "url", "first_seen_at", "last_seen_at")
+
+
+@admin.register(ArticleText)
+class ArticleTextAdmin(admin.ModelAdmin):
+    """
+    Konfiguracja wyświetlania modelu ArticleText w panelu admina.
+    """
+    # Kolumny wyświetlane w liście
+    list_display = ("title", "artifact", "indexed_at")
+    # Wyszukiwanie po tytule
+    search_fields = ("title",)
+    # Pola tylko do odczytu
+    readonly_fields = ("artifact", "title", "content", "indexed_at")
+    # Wektor dokumentu nie jest czytelny w formularzu
+    exclude = ("search_vector",)
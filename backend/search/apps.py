@@ -0,0 +1,18 @@
+"""
+Konfiguracja aplikacji wyszukiwania.
+"""
+
+from django.apps import AppConfig
+
+
+class SearchConfig(AppConfig):
+    """
+    Konfiguracja aplikacji search.
+    Rejestruje odbiorniki sygnałów przy starcie Django.
+    """
+    name = "search"
+    default_auto_field = "django.db.models.BigAutoField"
+
+    def ready(self):
+        # Odbiorniki sygnałów magazynu artefaktów (zwalnianie odwołań)
+        from . import storage  # noqa: F401
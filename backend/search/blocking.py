@@ -0,0 +1,67 @@
+"""
+Moduł profili blokowania zasobów stron.
+Profil to lista grup zasobów (reklamy i trackery, media, czcionki, obrazy,
+skrypty zewnętrzne), których adresy są blokowane w przeglądarce przez CDP
+Network.setBlockedURLs przed otwarciem artykułu. Zasoby nieistotne dla
+zapisywanej treści nie są pobierane, więc strona szybciej osiąga gotowość,
+a PDF jest mniejszy. Profil wybiera się dla wyszukiwania, serwisu
+(SITE_BLOCKING_PROFILES) albo globalnie (SEARCH_BLOCKING_PROFILE).
+"""
+
+from django.conf import settings
+
+# Wzorce adresów (z symbolem wieloznacznym *) dla poszczególnych grup zasobów
+RESOURCE_GROUPS = {
+    # Sieci reklamowe, analityka i widżety rekomendacji
+    "ads": [
+        "*doubleclick.net*", "*googlesyndication.com*", "*googleadservices.com*",
+        "*google-analytics.com*", "*googletagmanager.com*", "*googletagservices.com*",
+        "*adocean.pl*", "*gemius.pl*", "*hit.gemius.pl*", "*criteo.com*", "*criteo.net*",
+        "*taboola.com*", "*outbrain.com*", "*scorecardresearch.com*", "*chartbeat.com*",
+        "*chartbeat.net*", "*hotjar.com*", "*cxense.com*", "*adnxs.com*", "*rubiconproject.com*",
+        "*pubmatic.com*", "*smartadserver.com*", "*amazon-adsystem.com*", "*quantserve.com*",
+    ],
+    # Odtwarzacze i pliki audio/wideo
+    "media": [
+        "*.mp4*", "*.webm*", "*.m3u8*", "*.mpd*", "*.ts?*", "*.mp3*", "*.aac*",
+        "*jwplayer.com*", "*jwpcdn.com*", "*youtube.com/embed*", "*player.vimeo.com*",
+    ],
+    # Czcionki internetowe
+    "fonts": [
+        "*.woff*", "*.ttf*", "*.otf*", "*.eot*", "*fonts.googleapis.com*", "*fonts.gstatic.com*",
+        "*use.typekit.net*",
+    ],
+    # Obrazy (opcjonalnie - ilustracje bywają częścią artykułu)
+    "images": [
+        "*.jpg*", "*.jpeg*", "*.png*", "*.gif*", "*.webp*", "*.avif*", "*.svg*",
+    ],
+    # Skrypty zewnętrznych dostawców (widżety społecznościowe, czaty, testy A/B)
+    "third_party_scripts": [
+        "*connect.facebook.net*", "*platform.twitter.com*", "*instagram.com/embed*",
+        "*tiktok.com/embed*", "*optimizely.com*", "*intercom.io*", "*onesignal.com*",
+        "*pushpushgo.com*", "*disqus.com*",
+    ],
+}
+
+# Profile: nazwa -> grupy zasobów
+PROFILES = {
+    "none": [],
+    "standard": ["ads", "media", "fonts", "third_party_scripts"],
+    "aggressive": ["ads", "media", "fonts", "third_party_scripts", "images"],
+}
+
+
+def profile_for(site, profile=None):
+    """Nazwa profilu: wybrany dla wyszukiwania, dla serwisu albo domyślny."""
+    if profile:
+        return profile
+    domain = site.lower().strip().replace("www.", "")
+    return settings.SITE_BLOCKING_PROFILES.get(domain, settings.SEARCH_BLOCKING_PROFILE)
+
+
+def blocked_urls(site, profile=None):
+    """Lista wzorców adresów blokowanych dla serwisu w danym profilu."""
+    patterns = []
+    for group in PROFILES[profile_for(site, profile)]:
+        patterns.extend(RESOURCE_GROUPS[group])
+    return patterns
@@ -0,0 +1,85 @@
+"""
+Moduł kanonizacji adresów URL artykułów.
+Różne warianty tego samego adresu (wielkość liter hosta, parametry śledzące,
+fragment, wersje AMP) są sprowadzane do jednej postaci używanej jako klucz
+pamięci podręcznej i deduplikacji.
+"""
+
+import hashlib
+import re
+import urllib.parse
+
+# Parametry zapytania dodawane przez systemy śledzące i reklamowe
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "igshid", "yclid",
+    "mc_cid", "mc_eid", "_ga", "srsltid", "ocid",
+}
+
+# Prefiksy parametrów śledzących (utm_source, utm_medium, ...)
+TRACKING_PREFIXES = ("utm_",)
+
+# Domyślne porty pomijane w postaci kanonicznej
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+# Parametry zapytania oznaczające wersję AMP strony (amp=1, outputType=amp)
+AMP_PARAMS = {"amp", "outputtype"}
+
+# Końcówka ścieżki wersji AMP: /amp, /amp/ albo .amp
+AMP_PATH_RE = re.compile(r"(/amp/?|\.amp)$", re.IGNORECASE)
+
+# Kopie stron w pamięci podręcznej Google AMP: <host>.cdn.ampproject.org/c/s/<host>/<ścieżka>
+AMP_CACHE_RE = re.compile(r"^/(?:[a-z]/)?(s/)?(.+)$", re.IGNORECASE)
+
+
+def is_tracking_param(name):
+    """Czy parametr zapytania służy wyłącznie do śledzenia."""
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def _unwrap_amp_cache(parts):
+    """Adres oryginalnej strony dla kopii z cdn.ampproject.org (pozostałe bez zmian)."""
+    host = (parts.hostname or "").lower()
+    if not host.endswith(".cdn.ampproject.org"):
+        return parts
+    match = AMP_CACHE_RE.match(parts.path)
+    if not match:
+        return parts
+    scheme = "https" if match.group(1) else "http"
+    return urllib.parse.urlsplit(f"{scheme}://{match.group(2)}?{parts.query}")
+
+
+def is_amp_param(name, value):
+    """Czy parametr zapytania wybiera wersję AMP strony."""
+    name = name.lower()
+    return name in AMP_PARAMS and (name == "amp" or value.lower() == "amp")
+
+
+def canonicalize_url(url):
+    """
+    Postać kanoniczna adresu: schemat i host małymi literami (bez kropki na
+    końcu i prefiksu "amp."), bez domyślnego portu, fragmentu, parametrów
+    śledzących i oznaczeń wersji AMP; pozostałe parametry posortowane.
+    """
+    parts = _unwrap_amp_cache(urllib.parse.urlsplit(url.strip()))
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower().rstrip(".")
+    if host.startswith("amp."):
+        host = host[len("amp."):]
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    params = [
+        (name, value)
+        for name, value in urllib.parse.parse_qsl(parts.query, keep_blank_values=True)
+        if not is_tracking_param(name) and not is_amp_param(name, value)
+    ]
+    query = urllib.parse.urlencode(sorted(params))
+    path = AMP_PATH_RE.sub("", parts.path) or "/"
+
+    return urllib.parse.urlunsplit((scheme, host, path, query, ""))
+
+
+def url_hash(url):
+    """Skrót SHA-1 postaci kanonicznej adresu (klucz indeksu i deduplikacji)."""
+    return hashlib.sha1(canonicalize_url(url).encode("utf-8")).hexdigest()
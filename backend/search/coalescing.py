@@ -0,0 +1,113 @@
+"""
+Moduł łączenia identycznych wyszukiwań.
+Wyszukiwania są identyfikowane kluczem z znormalizowanego zapytania i serwisu
+oraz efektywnego trybu generowania PDF i profilu blokowania zasobów (od nich
+zależą zapisane pliki). Nowe żądanie dołącza do identycznego wyszukiwania, które jeszcze
+trwa, albo dostaje gotowy wynik, jeśli identyczne wyszukiwanie zakończyło się
+w oknie SEARCH_CACHE_TTL. Sprawdzenie i utworzenie rekordu odbywa się pod
+blokadą w Redis, więc równoczesne żądania nie uruchamiają kilku zadań.
+"""
+
+import re
+import hashlib
+import logging
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from redis.exceptions import RedisError
+
+from . import blocking, reader
+from .models import SearchQuery
+from .redis_client import get_redis
+
+# Konfiguracja loggera dla tego modułu
+logger = logging.getLogger(__name__)
+
+# Czas życia blokady w sekundach (zabezpieczenie przed blokadą porzuconą przez proces)
+LOCK_TIMEOUT = 10
+# Maksymalny czas oczekiwania na blokadę w sekundach
+LOCK_WAIT = 5
+
+# Statusy wyszukiwań, do których można dołączyć
+IN_FLIGHT_STATUSES = ("pending", "running")
+
+
+def normalize_query(query):
+    """Zapytanie bez różnic w wielkości liter i białych znakach."""
+    return re.sub(r"\s+", " ", query).strip().casefold()
+
+
+def normalize_site(site):
+    """Serwis bez schematu, prefiksu www. i końcowego ukośnika."""
+    site = site.strip().lower()
+    site = re.sub(r"^https?://", "", site)
+    site = re.sub(r"^www\.", "", site)
+    return site.rstrip("/")
+
+
+def search_key(query, site, render_mode=None, blocking_profile=None):
+    """Klucz identycznych wyszukiwań (SHA-1 znormalizowanych parametrów)."""
+    site = normalize_site(site)
+    normalized = "\n".join((
+        normalize_query(query),
+        site,
+        reader.mode_for(site, render_mode),
+        blocking.profile_for(site, blocking_profile),
+    ))
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+
+@contextmanager
+def search_lock(key):
+    """
+    Blokada w Redis dla klucza wyszukiwania. Gdy Redis jest niedostępny albo
+    blokady nie udało się uzyskać w czasie LOCK_WAIT, kod wykonuje się bez niej.
+    """
+    lock = get_redis().lock(f"search-lock:{key}", timeout=LOCK_TIMEOUT, blocking_timeout=LOCK_WAIT)
+    try:
+        acquired = lock.acquire()
+    except RedisError as exc:
+        logger.warning("Search lock unavailable: %s", exc)
+        acquired = False
+    if not acquired:
+        logger.warning("Proceeding without search lock for %s", key)
+
+    try:
+        yield
+    finally:
+        if acquired:
+            try:
+                lock.release()
+            except RedisError as exc:
+                logger.warning("Failed to release search lock: %s", exc)
+
+
+def find_reusable_search(key, max_results=None):
+    """
+    Wyszukiwanie, którego wynik można zwrócić dla klucza: trwające (nie starsze
+    niż SEARCH_COALESCE_MAX_AGE) albo zakończone w oknie SEARCH_CACHE_TTL.
+    Pomijane są wyszukiwania zbierające mniej artykułów niż max_results
+    (domyślnie SEARCH_DEFAULT_RESULTS).
+    """
+    now = timezone.now()
+    searches = SearchQuery.objects.filter(search_key=key).annotate(
+        limit=Coalesce("max_results", Value(settings.SEARCH_DEFAULT_RESULTS))
+    ).filter(limit__gte=max_results or settings.SEARCH_DEFAULT_RESULTS)
+
+    in_flight = searches.filter(
+        status__in=IN_FLIGHT_STATUSES,
+        created_at__gte=now - timedelta(seconds=settings.SEARCH_COALESCE_MAX_AGE),
+    ).order_by("-created_at").first()
+    if in_flight:
+        return in_flight
+
+    if settings.SEARCH_CACHE_TTL <= 0:
+        return None
+    return searches.filter(
+        status="done",
+        finished_at__gte=now - timedelta(seconds=settings.SEARCH_CACHE_TTL),
+    ).order_by("-finished_at").first()
@@ -0,0 +1,156 @@
+"""
+Moduł silnika pobierania plików.
+Korzysta ze wspólnej sesji requests z pulą połączeń (keep-alive między
+pobraniami), ogranicza liczbę równoczesnych połączeń do jednego hosta,
+ponawia nieudane pobrania z wykładniczym opóźnieniem, wznawia przerwane
+transfery nagłówkiem Range i zapisuje pliki atomowo (plik tymczasowy + rename).
+"""
+
+import os
+import time
+import random
+import logging
+import tempfile
+import threading
+import urllib.parse
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from . import ratelimit
+
+# Konfiguracja loggera dla tego modułu
+logger = logging.getLogger(__name__)
+
+# Nagłówki żądań wysyłanych bez przeglądarki
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+# Kody odpowiedzi, po których warto ponowić pobieranie
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+_host_slots = {}
+_host_slots_lock = threading.Lock()
+
+
+class RetryableError(Exception):
+    """Błąd przejściowy (np. 503), po którym pobieranie jest ponawiane."""
+
+
+def get_session():
+    """Wspólna sesja HTTP procesu z pulą połączeń (tworzona ponownie po fork())."""
+    global _session, _session_pid
+    with _session_lock:
+        if _session is None or _session_pid != os.getpid():
+            session = requests.Session()
+            session.headers.update(DEFAULT_HEADERS)
+            adapter = HTTPAdapter(
+                pool_connections=settings.DOWNLOAD_POOL_CONNECTIONS,
+                pool_maxsize=settings.DOWNLOAD_PER_HOST_LIMIT,
+            )
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+            _session_pid = os.getpid()
+        return _session
+
+
+def host_slot(url):
+    """Semafor ograniczający liczbę równoczesnych pobrań z jednego hosta."""
+    host = urllib.parse.urlparse(url).netloc.lower()
+    with _host_slots_lock:
+        if host not in _host_slots:
+            _host_slots[host] = threading.BoundedSemaphore(settings.DOWNLOAD_PER_HOST_LIMIT)
+        return _host_slots[host]
+
+
+def backoff_delay(attempt):
+    """Opóźnienie przed kolejną próbą: wykładnicze z losowym rozrzutem."""
+    base = settings.DOWNLOAD_BACKOFF_BASE * (2 ** attempt)
+    return base + random.uniform(0, base / 2)
+
+
+def _stream_to(resp, fh, chunk_size):
+    written = 0
+    for chunk in resp.iter_content(chunk_size):
+        if chunk:
+            fh.write(chunk)
+            written += len(chunk)
+    return written
+
+
+def _fetch(url, part_path, timeout, chunk_size, state):
+    """
+    Jedna próba pobrania do pliku częściowego.
+    Jeśli plik częściowy ma już dane, wysyła Range (z If-Range, gdy znany jest
+    walidator); odpowiedź 200 zamiast 206 oznacza pobieranie od początku.
+    Walidator (ETag lub Last-Modified) jest zapamiętywany w state["validator"]
+    przed zapisem danych, aby był dostępny przy wznowieniu po przerwaniu.
+    """
+    offset = os.path.getsize(part_path)
+    headers = {}
+    if offset:
+        headers["Range"] = f"bytes={offset}-"
+        if state.get("validator"):
+            headers["If-Range"] = state["validator"]
+
+    ratelimit.acquire(url)
+    with get_session().get(url, stream=True, timeout=timeout, headers=headers) as resp:
+        if resp.status_code in ratelimit.BLOCK_STATUSES:
+            ratelimit.report_block(url, resp.headers.get("Retry-After"))
+        if resp.status_code in RETRY_STATUSES:
+            raise RetryableError(f"HTTP {resp.status_code}")
+        if resp.status_code == 416 and offset:
+            # Plik częściowy jest już kompletny
+            return
+        resp.raise_for_status()
+
+        validator = resp.headers.get("ETag") or resp.headers.get("Last-Modified")
+        if validator:
+            state["validator"] = validator
+        mode = "ab" if offset and resp.status_code == 206 else "wb"
+        with open(part_path, mode) as fh:
+            _stream_to(resp, fh, chunk_size)
+
+
+def download(url, dest, timeout=30, retries=None, chunk_size=None):
+    """
+    Pobranie pliku spod url do ścieżki dest.
+    Dane trafiają do pliku tymczasowego w katalogu docelowym, który po
+    zakończeniu jest atomowo przemianowywany na dest. Zwraca True przy sukcesie.
+    """
+    retries = settings.DOWNLOAD_RETRIES if retries is None else retries
+    chunk_size = chunk_size or settings.DOWNLOAD_CHUNK_SIZE
+
+    fd, part_path = tempfile.mkstemp(prefix=".dl-", suffix=".part", dir=os.path.dirname(dest))
+    os.close(fd)
+    state = {}
+
+    try:
+        for attempt in range(retries + 1):
+            try:
+                # Miejsce w limicie hosta tylko na czas próby - nie podczas oczekiwania
+                with host_slot(url):
+                    _fetch(url, part_path, timeout, chunk_size, state)
+                break
+            except (RetryableError, requests.ConnectionError, requests.Timeout,
+                    requests.exceptions.ChunkedEncodingError) as exc:
+                if attempt >= retries:
+                    raise
+                delay = backoff_delay(attempt)
+                logger.info("Download of %s failed (%s), retrying in %.1fs", url, exc, delay)
+                time.sleep(delay)
+        os.replace(part_path, dest)
+        return True
+    except Exception:
+        logger.exception("Failed to download %s", url)
+        return False
+    finally:
+        if os.path.exists(part_path):
+            os.remove(part_path)
@@ -0,0 +1,250 @@
+"""
+Moduł puli sesji WebDriver dla procesów workerów Celery.
+Utrzymuje "ciepłe" sesje przeglądarki na serwerze Selenium, sprawdza ich
+stan przed wypożyczeniem, odtwarza je po przekroczeniu limitu użyć lub wieku
+i czyści stan przeglądarki (cookies, karty, storage) między zadaniami.
+"""
+
+import os
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+from celery.signals import worker_process_init, worker_process_shutdown
+from django.conf import settings
+from selenium.common.exceptions import WebDriverException
+
+from . import timing
+from .selenium_client import create_driver, execute_cdp
+
+# Konfiguracja loggera dla tego modułu
+logger = logging.getLogger(__name__)
+
+
+class PoolExhausted(Exception):
+    """Brak wolnej sesji w puli w zadanym czasie oczekiwania."""
+
+
+class PooledSession:
+    """Sesja WebDriver wraz z licznikami używanymi przez politykę odtwarzania."""
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.created_at = time.monotonic()
+        self.uses = 0
+
+    @property
+    def age(self):
+        return time.monotonic() - self.created_at
+
+
+def reset_session(driver):
+    """Czyszczenie stanu przeglądarki: dodatkowe karty, storage i cookies."""
+    handles = driver.window_handles
+    for handle in handles[1:]:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(handles[0])
+
+    # localStorage/sessionStorage są dostępne tylko dla bieżącego originu
+    try:
+        driver.execute_script(
+            "try { window.localStorage.clear(); window.sessionStorage.clear(); } catch (e) {}"
+        )
+    except WebDriverException:
+        pass
+
+    # Network.clearBrowserCookies usuwa cookies wszystkich domen,
+    # delete_all_cookies() tylko dla bieżącej
+    try:
+        execute_cdp(driver, "Network.clearBrowserCookies", {})
+    except Exception:
+        driver.delete_all_cookies()
+
+    # Zdjęcie blokady zasobów ustawionej przez profil poprzedniego wyszukiwania
+    if getattr(driver, "_blocked_urls", None):
+        try:
+            execute_cdp(driver, "Network.setBlockedURLs", {"urls": []})
+        except Exception:
+            pass
+        driver._blocked_urls = None
+
+    # Opróżnienie bufora logu wydajności, aby nie wpływał na kolejne oczekiwania
+    try:
+        driver.get_log("performance")
+    except Exception:
+        pass
+
+    driver.get("about:blank")
+
+
+class DriverPool:
+    """
+    Pula sesji WebDriver należąca do jednego procesu.
+    Sesje są wypożyczane przez acquire()/release() lub menedżer kontekstu session().
+    """
+
+    def __init__(self, factory=create_driver, max_size=2, warm_size=1,
+                 max_uses=50, max_age=600, acquire_timeout=120):
+        self.factory = factory
+        self.max_size = max_size
+        self.warm_size = min(warm_size, max_size)
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.acquire_timeout = acquire_timeout
+        self.pid = os.getpid()
+        self._idle = deque()
+        self._total = 0
+        self._cond = threading.Condition()
+
+    def _expired(self, session):
+        return session.uses >= self.max_uses or session.age >= self.max_age
+
+    def _is_healthy(self, session):
+        try:
+            session.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def _destroy(self, session):
+        try:
+            session.driver.quit()
+        except Exception:
+            logger.exception("Error closing pooled WebDriver")
+        with self._cond:
+            self._total -= 1
+            self._cond.notify()
+
+    def _create(self):
+        try:
+            return PooledSession(self.factory())
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            raise
+
+    def warm(self):
+        """Tworzenie sesji do poziomu warm_size, aby pierwsze zadanie nie czekało na start."""
+        while True:
+            with self._cond:
+                if self._total >= self.warm_size:
+                    return
+                self._total += 1
+            try:
+                session = self._create()
+            except Exception:
+                logger.exception("Failed to warm WebDriver session")
+                return
+            with self._cond:
+                self._idle.append(session)
+                self._cond.notify()
+
+    def acquire(self, timeout=None):
+        """Wypożyczenie zdrowej sesji; tworzy nową, jeśli pula nie osiągnęła max_size."""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            session = None
+            create = False
+            with self._cond:
+                if self._idle:
+                    session = self._idle.popleft()
+                elif self._total < self.max_size:
+                    self._total += 1
+                    create = True
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolExhausted("No WebDriver session available")
+                    self._cond.wait(remaining)
+                    continue
+
+            if create:
+                session = self._create()
+            elif self._expired(session) or not self._is_healthy(session):
+                logger.info("Recycling WebDriver session (uses=%d, age=%.0fs)",
+                            session.uses, session.age)
+                self._destroy(session)
+                continue
+
+            session.uses += 1
+            return session
+
+    def release(self, session, broken=False):
+        """Zwrot sesji do puli; uszkodzone lub przeterminowane sesje są zamykane."""
+        if not broken and not self._expired(session):
+            try:
+                reset_session(session.driver)
+            except Exception:
+                logger.warning("Failed to reset WebDriver session, discarding it")
+                broken = True
+        else:
+            broken = True
+
+        if broken:
+            self._destroy(session)
+            return
+
+        with self._cond:
+            self._idle.append(session)
+            self._cond.notify()
+
+    @contextmanager
+    def session(self, timeout=None):
+        """Menedżer kontekstu zwracający WebDriver wypożyczony z puli."""
+        with timing.span("session"):
+            pooled = self.acquire(timeout)
+        broken = False
+        try:
+            yield pooled.driver
+        except WebDriverException:
+            broken = True
+            raise
+        finally:
+            self.release(pooled, broken=broken)
+
+    def close_all(self):
+        """Zamknięcie wszystkich bezczynnych sesji (np. przy wyłączaniu workera)."""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+        for session in idle:
+            self._destroy(session)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Zwraca pulę bieżącego procesu, tworząc ją po starcie lub po fork()."""
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool.pid != os.getpid():
+            _pool = DriverPool(
+                max_size=settings.SELENIUM_POOL_MAX_SIZE,
+                warm_size=settings.SELENIUM_POOL_WARM_SIZE,
+                max_uses=settings.SELENIUM_POOL_MAX_USES,
+                max_age=settings.SELENIUM_POOL_MAX_AGE,
+                acquire_timeout=settings.SELENIUM_POOL_ACQUIRE_TIMEOUT,
+            )
+        return _pool
+
+
+@worker_process_init.connect
+def _warm_pool_on_worker_start(**kwargs):
+    """Rozgrzanie puli w każdym procesie potomnym workera Celery."""
+    if settings.SELENIUM_POOL_WARM_SIZE > 0:
+        get_pool().warm()
+
+
+@worker_process_shutdown.connect
+def _close_pool_on_worker_shutdown(**kwargs):
+    """Zamknięcie sesji przy wyłączaniu procesu workera."""
+    if _pool is not None and _pool.pid == os.getpid():
+        _pool.close_all()
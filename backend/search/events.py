@@ -0,0 +1,55 @@
+"""
+Moduł publikowania zdarzeń wyszukiwania.
+Workery Celery publikują zmiany statusu, postępu i nowe wyniki w kanale Redis
+pub/sub wyszukiwania; strumień SSE (search/sse.py) przekazuje je klientom bez
+odpytywania bazy danych. Błędy Redis nie przerywają przetwarzania.
+"""
+
+import json
+import logging
+
+from redis.exceptions import RedisError
+
+from .models import SearchQuery
+from .payloads import article_payload, progress_payload
+from .redis_client import get_redis
+
+# Konfiguracja loggera dla tego modułu
+logger = logging.getLogger(__name__)
+
+# Prefiks kanałów Redis ze zdarzeniami wyszukiwań
+CHANNEL_PREFIX = "search-events:"
+
+
+def channel_name(search_id):
+    """Kanał Redis ze zdarzeniami danego wyszukiwania."""
+    return f"{CHANNEL_PREFIX}{search_id}"
+
+
+def publish(search_id, event, data):
+    """Opublikowanie zdarzenia {"event": ..., "data": ...} w kanale wyszukiwania."""
+    message = json.dumps({"event": event, "data": data})
+    try:
+        get_redis().publish(channel_name(search_id), message)
+    except RedisError as exc:
+        logger.debug("Event %s for search %s not published: %s", event, search_id, exc)
+
+
+def publish_status(search_id, status):
+    """Zdarzenie zmiany statusu wyszukiwania."""
+    publish(search_id, "status", {"status": status})
+
+
+def publish_progress(search_id):
+    """Zdarzenie z bieżącymi licznikami postępu."""
+    search = SearchQuery.objects.filter(id=search_id).only(
+        "links_found", "articles_processed", "articles_downloaded"
+    ).first()
+    if search is not None:
+        publish(search_id, "progress", progress_payload(search))
+
+
+def publish_results(search_id, articles):
+    """Zdarzenia z nowo zapisanymi artykułami."""
+    for fa in articles:
+        publish(search_id, "result", article_payload(fa))
@@ -0,0 +1,77 @@
+"""
+Moduł hurtowej ekstrakcji danych z DOM.
+Każda funkcja wykonuje jedno wywołanie execute_script, zamiast pobierać
+atrybuty i tekst każdego elementu osobnym żądaniem do zdalnego WebDrivera.
+Wariant dla statycznego HTML zwraca te same krotki na podstawie BeautifulSoup.
+"""
+
+import urllib.parse
+from collections import namedtuple
+
+from bs4 import BeautifulSoup
+
+# Pojedynczy odnośnik zwrócony przez skrypt ekstrakcji
+ExtractedLink = namedtuple("ExtractedLink", ["selector", "href", "text", "visible"])
+
+# Skrypt zbierający (selektor, href, tekst, widoczność) dla wszystkich selektorów naraz.
+# el.href zwraca adres bezwzględny, tak jak WebElement.get_attribute("href").
+EXTRACT_LINKS_SCRIPT = """
+var selectors = arguments[0];
+var out = [];
+selectors.forEach(function (selector) {
+  var nodes;
+  try { nodes = document.querySelectorAll(selector); } catch (e) { return; }
+  for (var i = 0; i < nodes.length; i++) {
+    var el = nodes[i];
+    var href = typeof el.href === 'string' ? el.href : el.getAttribute('href');
+    var visible = !!(el.offsetWidth || el.offsetHeight || el.getClientRects().length);
+    out.push([selector, href || null, (el.innerText || '').trim(), visible]);
+  }
+});
+return out;
+"""
+
+# Skrypt zwracający pierwszy odnośnik do pliku .pdf oraz adres bieżącej strony
+FIND_PDF_LINK_SCRIPT = """
+var anchors = document.querySelectorAll('a[href]');
+for (var i = 0; i < anchors.length; i++) {
+  var href = anchors[i].href;
+  if (typeof href === 'string' && href.toLowerCase().indexOf('.pdf') !== -1) {
+    return [href, window.location.href];
+  }
+}
+return [null, window.location.href];
+"""
+
+
+def extract_links(driver, selectors):
+    """Zwraca listę ExtractedLink dla wszystkich elementów pasujących do selektorów."""
+    rows = driver.execute_script(EXTRACT_LINKS_SCRIPT, list(selectors)) or []
+    return [ExtractedLink(*row) for row in rows]
+
+
+def find_pdf_link(driver):
+    """Zwraca (href pierwszego odnośnika .pdf lub None, adres bieżącej strony)."""
+    href, current_url = driver.execute_script(FIND_PDF_LINK_SCRIPT)
+    return href, current_url
+
+
+def extract_links_from_html(html, base_url, selectors):
+    """
+    Odpowiednik extract_links dla statycznego HTML (bez przeglądarki).
+    Adresy są rozwiązywane względem base_url; widoczności nie da się ustalić,
+    więc wszystkie elementy są traktowane jako widoczne.
+    """
+    soup = BeautifulSoup(html, "html.parser")
+    links = []
+    for selector in selectors:
+        try:
+            nodes = soup.select(selector)
+        except Exception:
+            continue
+        for node in nodes:
+            href = node.get("href")
+            if href:
+                href = urllib.parse.urljoin(base_url, href)
+            links.append(ExtractedLink(selector, href, node.get_text(" ", strip=True), True))
+    return links
@@ -0,0 +1,238 @@
+"""
+Moduł lokalnego serwera HTTP udającego serwis informacyjny.
+Serwer odtwarza strony wyników wyszukiwania (ze stronicowaniem) i strony
+artykułów w układzie serwisów z adapterów wbudowanych (search/sites.py),
+więc pełny potok wyszukiwania można mierzyć i testować bez dostępu do sieci
+(komenda benchmark_search, testy). Opóźnienie odpowiedzi, rozmiar stron,
+baner zgody na cookies i odnośniki do plików PDF są konfigurowalne.
+
+Adresy:
+    /szukaj?q=<zapytanie>&strona=<n>   strona wyników (per_page artykułów)
+    /kraj/<id>-<n>-artykul             strona artykułu
+    /pdf/<id>-<n>.pdf                  plik PDF artykułu
+"""
+
+import time
+import hashlib
+import threading
+import urllib.parse
+from dataclasses import dataclass, field
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Szablony stron wyników: wynik wyszukiwania i odnośnik do następnej strony
+LAYOUTS = {
+    # Lista zapowiedzi artykułów (rp.pl, gazeta.pl, tvn24.pl i podobne)
+    "teaser": {
+        "result": '<article class="teaser"><h2 class="teaser__title"><a href="{href}">{title}</a></h2></article>',
+        "next": '<a rel="next" href="{href}">Następna strona</a>',
+        "adapter": {},
+    },
+    # Wyniki Google Custom Search (onet.pl)
+    "cse": {
+        "result": '<div class="gsc-webResult gsc-result"><a class="gs-title" href="{href}">{title}</a></div>',
+        "next": '<div class="gsc-cursor"><span class="gsc-cursor-page gsc-cursor-current-page">{page}</span>'
+                '<a class="gsc-cursor-page" href="{href}">{next_page}</a></div>',
+        "adapter": {
+            "result_selectors": (".gsc-result a.gs-title",),
+            "next_page_selector": ".gsc-cursor-current-page + .gsc-cursor-page",
+        },
+    },
+}
+
+# Akapit treści artykułu (kilka akapitów przekracza READER_MIN_TEXT_LENGTH)
+PARAGRAPH = (
+    "Samorząd województwa przedstawił harmonogram prac, a wykonawca zapowiedział, "
+    "że pierwsze odcinki zostaną oddane do użytku jeszcze przed końcem roku. "
+    "Mieszkańcy zgłosili uwagi dotyczące objazdów i organizacji ruchu w centrum miasta."
+)
+
+# Baner zgody na cookies znikający po kliknięciu przycisku
+CONSENT_BANNER = (
+    '<div id="consent" class="consent-banner" style="position:fixed;bottom:0;width:100%">'
+    '<p>Ta strona używa plików cookie.</p>'
+    '<button class="accept" onclick="document.getElementById(\'consent\').remove()">Akceptuję</button>'
+    '</div>'
+)
+
+
+@dataclass
+class FixtureConfig:
+    """Parametry serwisu testowego."""
+    # Układ stron wyników (klucz LAYOUTS)
+    layout: str = "teaser"
+    # Liczba artykułów pasujących do każdego zapytania
+    articles: int = 50
+    # Liczba wyników na stronie wyszukiwania
+    per_page: int = 10
+    # Opóźnienie każdej odpowiedzi w sekundach
+    latency: float = 0.0
+    # Dodatkowe bajty (ukryty blok) w każdej stronie artykułu
+    page_weight: int = 0
+    # Czy strony artykułów wyświetlają baner zgody na cookies
+    consent: bool = False
+    # Co który artykuł ma odnośnik do pliku PDF (0 = żaden)
+    pdf_every: int = 0
+    # Liczba akapitów treści artykułu
+    paragraphs: int = 6
+    # Liczba obsłużonych żądań według rodzaju strony
+    hits: dict = field(default_factory=dict, compare=False, repr=False)
+
+
+def query_id(query):
+    """Krótki identyfikator zapytania - każde zapytanie ma własny zbiór artykułów."""
+    return hashlib.sha1(query.encode("utf-8")).hexdigest()[:8]
+
+
+def pdf_bytes(name):
+    """Minimalny poprawny dokument PDF z nazwą artykułu jako treścią."""
+    text = f"BT /F1 12 Tf 72 720 Td ({name}) Tj ET".encode("ascii")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents 4 0 R"
+        b" /Resources << /Font << /F1 5 0 R >> >> >>",
+        b"<< /Length %d >>\nstream\n%s\nendstream" % (len(text), text),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Obsługa żądań serwisu testowego (konfiguracja w self.server.config)."""
+
+    def log_message(self, format, *args):
+        # Bez logowania każdego żądania na stderr
+        pass
+
+    def do_GET(self):
+        config = self.server.config
+        if config.latency:
+            time.sleep(config.latency)
+
+        parsed = urllib.parse.urlparse(self.path)
+        parts = parsed.path.strip("/").split("/")
+        if parsed.path == "/szukaj":
+            params = urllib.parse.parse_qs(parsed.query)
+            self.count("search")
+            self.send_html(self.search_page(params.get("q", [""])[0], int(params.get("strona", ["1"])[0])))
+        elif len(parts) == 2 and parts[0] == "kraj":
+            self.count("article")
+            self.send_html(self.article_page(parts[1]))
+        elif len(parts) == 2 and parts[0] == "pdf" and parts[1].endswith(".pdf"):
+            self.count("pdf")
+            self.send(pdf_bytes(parts[1][:-4]), "application/pdf")
+        else:
+            self.count("not_found")
+            self.send(b"not found", "text/plain", status=404)
+
+    def count(self, kind):
+        with self.server.hits_lock:
+            self.server.config.hits[kind] = self.server.config.hits.get(kind, 0) + 1
+
+    def send(self, body, content_type, status=200):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_html(self, html):
+        self.send(html.encode("utf-8"), "text/html; charset=utf-8")
+
+    def search_page(self, query, page):
+        config = self.server.config
+        layout = LAYOUTS[config.layout]
+        first = (page - 1) * config.per_page
+        numbers = range(first, min(first + config.per_page, config.articles))
+        results = "\n".join(
+            layout["result"].format(
+                href=f"/kraj/{query_id(query)}-{n}-artykul",
+                title=escape(f"Artykuł numer {n} o zapytaniu {query}"),
+            )
+            for n in numbers
+        )
+        pager = ""
+        if first + config.per_page < config.articles:
+            href = "/szukaj?" + urllib.parse.urlencode({"q": query, "strona": page + 1})
+            pager = layout["next"].format(href=escape(href), page=page, next_page=page + 1)
+        return (
+            f"<html><head><title>Wyniki: {escape(query)}</title></head><body>"
+            f'<main><div class="search-results">{results}</div>{pager}</main></body></html>'
+        )
+
+    def article_page(self, slug):
+        config = self.server.config
+        name = slug.rsplit("-", 1)[0]
+        number = int(name.rsplit("-", 1)[-1]) if name.rsplit("-", 1)[-1].isdigit() else 0
+        pdf_link = ""
+        if config.pdf_every and number % config.pdf_every == 0:
+            pdf_link = f'<p><a href="/pdf/{name}.pdf">Pobierz raport (PDF)</a></p>'
+        body = "".join(f"<p>{PARAGRAPH}</p>" for _ in range(config.paragraphs))
+        padding = ""
+        if config.page_weight:
+            padding = f'<div style="display:none">{"x" * config.page_weight}</div>'
+        return (
+            f"<html><head><title>Artykuł {escape(name)}</title></head><body>"
+            f"{CONSENT_BANNER if config.consent else ''}"
+            f'<nav><a href="/">Strona główna</a></nav>'
+            f'<article><h1>Artykuł {escape(name)}</h1><p class="author">Redakcja</p>'
+            f"{body}{pdf_link}</article>{padding}</body></html>"
+        )
+
+
+class FixtureServer:
+    """
+    Serwer serwisu testowego w osobnym wątku. Port 0 oznacza dowolny wolny
+    port; adres serwera jest dostępny w url po start().
+    """
+
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or FixtureConfig()
+        self.httpd = ThreadingHTTPServer((host, port), FixtureHandler)
+        self.httpd.daemon_threads = True
+        self.httpd.config = self.config
+        self.httpd.hits_lock = threading.Lock()
+        self.thread = None
+
+    @property
+    def port(self):
+        return self.httpd.server_address[1]
+
+    def url(self, host=None):
+        """Adres serwera; host pozwala podać nazwę widzianą z kontenera przeglądarki."""
+        return f"http://{host or self.httpd.server_address[0]}:{self.port}"
+
+    def adapter(self, host=None):
+        """Pola adaptera serwisu (SITE_ADAPTERS) dla bieżącego układu stron."""
+        base = self.url(host)
+        return {
+            "search_url": base + "/szukaj?q={query}",
+            "page_url": base + "/szukaj?q={query}&strona={page}",
+            **LAYOUTS[self.config.layout]["adapter"],
+        }
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,145 @@
+"""
+Moduł lokalnej biblioteki artykułów (wyszukiwanie pełnotekstowe).
+Tekst zapisanych plików (PDF przez pypdf, HTML przez BeautifulSoup) jest
+wyodrębniany po zapisaniu artefaktu i przechowywany w Postgres razem
+z kolumną tsvector z indeksem GIN. Zapytanie do lokalnego zbioru zajmuje
+milisekundy i nie wymaga otwierania serwisu; wyniki mogą być zwracane od
+razu, zanim wyszukiwanie na żywo zbierze nowe artykuły.
+"""
+
+import logging
+
+from bs4 import BeautifulSoup
+from django.conf import settings
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+from django.db.models import F
+
+from . import storage
+from .models import ArticleText, Artifact, FoundArticle
+from .payloads import article_payload
+from .sites import site_domain
+
+# Konfiguracja loggera dla tego modułu
+logger = logging.getLogger(__name__)
+
+
+def extract_pdf_text(path):
+    """Tekst wszystkich stron pliku PDF (pypdf); strony bez warstwy tekstowej są pomijane."""
+    from pypdf import PdfReader
+
+    reader = PdfReader(path)
+    pages = []
+    for page in reader.pages:
+        try:
+            pages.append(page.extract_text() or "")
+        except Exception as exc:
+            logger.debug("Could not extract text from PDF page: %s", exc)
+    return "\n".join(pages)
+
+
+def extract_html_text(path):
+    """Widoczny tekst dokumentu HTML (bez skryptów i stylów)."""
+    with open(path, "rb") as fh:
+        soup = BeautifulSoup(fh.read(), "html.parser")
+    for node in soup(["script", "style", "noscript", "template"]):
+        node.decompose()
+    return soup.get_text(" ", strip=True)
+
+
+# Funkcje wyodrębniania tekstu dla rozszerzeń plików w magazynie
+EXTRACTORS = {
+    "pdf": extract_pdf_text,
+    "html": extract_html_text,
+}
+
+
+def document_vector(config):
+    """Wektor dokumentu: tytuł (waga A) i treść (waga B)."""
+    return (
+        SearchVector("title", weight="A", config=config)
+        + SearchVector("content", weight="B", config=config)
+    )
+
+
+def index_artifact(artifact):
+    """
+    Wyodrębnienie tekstu pliku artefaktu i zapisanie go w indeksie.
+    Zwraca ArticleText albo None, gdy pliku nie ma lub nie zawiera tekstu.
+    """
+    extractor = EXTRACTORS.get(artifact.ext)
+    if extractor is None or artifact.evicted:
+        return None
+
+    try:
+        content = extractor(storage.blob_path(artifact.sha256, artifact.ext))
+    except ImportError:
+        logger.warning("pypdf not available, cannot index %s", artifact.name)
+        return None
+    except (OSError, ValueError) as exc:
+        logger.warning("Could not extract text from %s: %s", artifact.name, exc)
+        return None
+    except Exception as exc:
+        # Uszkodzone pliki PDF zgłaszają różne wyjątki pypdf
+        logger.warning("Text extraction failed for %s: %s", artifact.name, exc)
+        return None
+
+    content = content.replace("\x00", "")[:settings.LIBRARY_MAX_TEXT_LENGTH]
+    article = FoundArticle.objects.filter(artifact=artifact).only("title").first()
+    title = article.title if article else ""
+
+    document, _ = ArticleText.objects.update_or_create(
+        artifact=artifact, defaults={"title": title[:500], "content": content}
+    )
+    ArticleText.objects.filter(id=document.id).update(
+        search_vector=document_vector(settings.LIBRARY_SEARCH_CONFIG)
+    )
+    logger.info("Indexed %s (%d characters)", artifact.name, len(content))
+    return document
+
+
+def unindexed_artifacts():
+    """Artefakty z plikiem na dysku, które nie trafiły jeszcze do indeksu."""
+    return Artifact.objects.filter(
+        evicted=False, ext__in=list(EXTRACTORS), text__isnull=True
+    ).order_by("id")
+
+
+def search(query, site=None, limit=20):
+    """
+    Artykuły z lokalnego zbioru pasujące do zapytania (składnia jak
+    w wyszukiwarkach: słowa, "fraza", -wykluczenie), od najtrafniejszych.
+    Każdy wynik to słownik article_payload z trafnością i fragmentem tekstu.
+    """
+    config = settings.LIBRARY_SEARCH_CONFIG
+    ts_query = SearchQuery(query, search_type="websearch", config=config)
+    documents = ArticleText.objects.filter(search_vector=ts_query)
+    if site:
+        documents = documents.filter(artifact__in=FoundArticle.objects.filter(
+            url__icontains=site_domain(site)
+        ).values("artifact_id"))
+    documents = documents.annotate(
+        rank=SearchRank(F("search_vector"), ts_query),
+        snippet=SearchHeadline(
+            "content", ts_query, config=config, max_words=30, min_words=15,
+            start_sel="<b>", stop_sel="</b>",
+        ),
+    ).order_by("-rank", "-id").values("artifact_id", "rank", "snippet")[:limit]
+    documents = list(documents)
+
+    # Najnowszy artykuł dla każdego artefaktu (tytuł, adres, link do pliku)
+    articles = {}
+    for article in FoundArticle.objects.filter(
+        artifact_id__in=[doc["artifact_id"] for doc in documents]
+    ).select_related("artifact").order_by("-id"):
+        articles.setdefault(article.artifact_id, article)
+
+    results = []
+    for doc in documents:
+        article = articles.get(doc["artifact_id"])
+        if article is None:
+            continue
+        payload = article_payload(article)
+        payload["rank"] = round(doc["rank"], 4)
+        payload["snippet"] = doc["snippet"]
+        results.append(payload)
+    return results
@@ -0,0 +1,139 @@
+"""
+Moduł cyklu życia plików w magazynie artefaktów.
+Pilnuje limitu miejsca ARTICLES_QUOTA_BYTES: usuwa z dysku najdawniej używane
+pliki (LRU według last_accessed_at) oraz pliki nieużywane dłużej niż
+ARTICLES_MAX_IDLE_DAYS. Rekordy Artifact i FoundArticle zostają oznaczone jako
+evicted, dzięki czemu artykuł można pobrać ponownie (zadanie refetch_article).
+Sprząta też osierocone artefakty i pliki tymczasowe po przerwanych zapisach.
+Pliki sprzed magazynu adresowanego treścią są najpierw do niego przenoszone
+(storage.import_legacy_files), więc też liczą się do limitu miejsca.
+"""
+
+import os
+import time
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from . import metrics, snapshots, storage
+from .models import Artifact, FoundArticle
+
+# Konfiguracja loggera dla tego modułu
+logger = logging.getLogger(__name__)
+
+# Wiek w sekundach, po którym plik tymczasowy lub artefakt bez odwołań uznaje się za porzucony
+ORPHAN_AGE = 24 * 3600
+
+
+def evict_artifact(artifact):
+    """
+    Usunięcie pliku artefaktu z dysku i oznaczenie go (oraz wskazujących na
+    niego artykułów) jako evicted. Zwraca False, jeśli plik był już usunięty.
+    """
+    with transaction.atomic():
+        locked = Artifact.objects.select_for_update().filter(id=artifact.id, evicted=False).first()
+        if locked is None:
+            return False
+        Artifact.objects.filter(id=artifact.id).update(evicted=True)
+        articles = FoundArticle.objects.filter(artifact_id=artifact.id)
+        search_ids = set(articles.values_list("search_id", flat=True))
+        articles.update(evicted=True)
+        # Plik jest kasowany po zatwierdzeniu, chyba że put_file zdążył przywrócić artefakt
+        storage.remove_blob_on_commit(artifact.sha256, artifact.ext)
+
+    for search_id in search_ids:
+        snapshots.invalidate(search_id)
+
+    metrics.incr("artifacts_evicted_total")
+    metrics.incr("artifacts_evicted_bytes_total", artifact.size)
+    logger.info("Evicted artifact %s (%d bytes)", artifact.name, artifact.size)
+    return True
+
+
+def stored_bytes():
+    """Łączny rozmiar plików obecnych w magazynie."""
+    return Artifact.objects.filter(evicted=False).aggregate(total=Sum("size"))["total"] or 0
+
+
+def evict_idle(max_idle_days=None):
+    """Usunięcie plików nieużywanych dłużej niż max_idle_days dni; zwraca ich liczbę."""
+    max_idle_days = settings.ARTICLES_MAX_IDLE_DAYS if max_idle_days is None else max_idle_days
+    if max_idle_days <= 0:
+        return 0
+    cutoff = timezone.now() - timedelta(days=max_idle_days)
+    idle = Artifact.objects.filter(evicted=False, last_accessed_at__lt=cutoff)
+    return sum(evict_artifact(artifact) for artifact in idle.iterator())
+
+
+def enforce_quota(quota=None):
+    """
+    Usuwanie najdawniej używanych plików, dopóki magazyn przekracza limit;
+    po przekroczeniu schodzi do ARTICLES_EVICTION_TARGET limitu. Zwraca liczbę usuniętych.
+    """
+    quota = settings.ARTICLES_QUOTA_BYTES if quota is None else quota
+    total = stored_bytes()
+    if total <= quota:
+        return 0
+
+    target = quota * settings.ARTICLES_EVICTION_TARGET
+    evicted = 0
+    lru = Artifact.objects.filter(evicted=False).order_by("last_accessed_at", "id")
+    for artifact in lru.iterator():
+        if total <= target:
+            break
+        if evict_artifact(artifact):
+            total -= artifact.size
+            evicted += 1
+    logger.info("Storage quota enforced: %d artifacts evicted, %d bytes stored", evicted, total)
+    return evicted
+
+
+def remove_unreferenced(artifact):
+    """Usunięcie artefaktu i jego pliku, jeśli nadal nie ma odwołań; zwraca, czy usunięto."""
+    with transaction.atomic():
+        if not Artifact.objects.select_for_update().filter(id=artifact.id, ref_count=0).exists():
+            return False
+        Artifact.objects.filter(id=artifact.id).delete()
+        storage.remove_blob_on_commit(artifact.sha256, artifact.ext)
+    return True
+
+
+def remove_orphans():
+    """
+    Usunięcie artefaktów bez odwołań (np. po awarii między zapisem pliku
+    a zapisem artykułu), porzuconych plików tymczasowych i płaskich plików
+    sprzed magazynu, do których nie odwołuje się żaden artykuł.
+    """
+    cutoff = timezone.now() - timedelta(seconds=ORPHAN_AGE)
+    for artifact in Artifact.objects.filter(ref_count=0, created_at__lt=cutoff).iterator():
+        if remove_unreferenced(artifact):
+            logger.info("Removed orphaned artifact %s", artifact.name)
+
+    now = time.time()
+    for entry in os.scandir(storage.TMP_DIR):
+        if entry.is_file() and now - entry.stat().st_mtime > ORPHAN_AGE:
+            os.remove(entry.path)
+
+    referenced = {
+        os.path.basename(name)
+        for name in FoundArticle.objects.exclude(pdf_filename__isnull=True).values_list("pdf_filename", flat=True)
+    }
+    for entry in os.scandir(storage.ARTICLES_DIR):
+        if entry.name.startswith(".") or entry.name in referenced or not entry.is_file():
+            continue
+        if now - entry.stat().st_mtime > ORPHAN_AGE:
+            os.remove(entry.path)
+            logger.info("Removed orphaned legacy file %s", entry.name)
+
+
+def run_eviction():
+    """Pełny przebieg: pliki sprzed magazynu, porzucone pliki, pliki nieużywane, limit miejsca."""
+    storage.import_legacy_files()
+    remove_orphans()
+    evicted = evict_idle() + enforce_quota()
+    metrics.incr("storage_eviction_runs_total")
+    return evicted
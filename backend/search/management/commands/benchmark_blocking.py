@@ -0,0 +1,100 @@
+"""
+Komenda porównująca profile blokowania zasobów na wskazanych artykułach.
+Dla każdego profilu mierzy czas do gotowości strony, liczbę i rozmiar
+pobranych zasobów oraz rozmiar PDF z Page.printToPDF.
+
+Przykład:
+    python manage.py benchmark_blocking https://www.rp.pl/... --repeat 3
+"""
+
+import time
+import base64
+import statistics
+import urllib.parse
+
+from django.core.management.base import BaseCommand, CommandError
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+from search.blocking import PROFILES
+from search.readiness import wait_until_ready
+from search.selenium_client import apply_blocking_profile, create_driver, execute_cdp
+
+# Skrypt zwracający liczbę zasobów i łączną liczbę przesłanych bajtów
+TRANSFER_SCRIPT = """
+var entries = performance.getEntriesByType('navigation').concat(performance.getEntriesByType('resource'));
+var bytes = 0;
+entries.forEach(function (e) { bytes += e.transferSize || 0; });
+return [entries.length, bytes];
+"""
+
+
+class Command(BaseCommand):
+    help = "Porównanie czasu ładowania i rozmiaru PDF dla profili blokowania zasobów"
+
+    def add_arguments(self, parser):
+        parser.add_argument("urls", nargs="+", help="Adresy artykułów")
+        parser.add_argument("--profiles", nargs="+", default=list(PROFILES), help="Porównywane profile")
+        parser.add_argument("--repeat", type=int, default=3, help="Liczba pomiarów na adres")
+
+    def handle(self, *args, **options):
+        unknown = set(options["profiles"]) - set(PROFILES)
+        if unknown:
+            raise CommandError(f"Unknown profiles: {', '.join(sorted(unknown))}")
+
+        driver = create_driver()
+        try:
+            # Bez pamięci podręcznej przeglądarki każdy pomiar pobiera zasoby od nowa
+            execute_cdp(driver, "Network.enable", {})
+            execute_cdp(driver, "Network.setCacheDisabled", {"cacheDisabled": True})
+            rows = {
+                profile: [self.measure(driver, url, profile)
+                          for url in options["urls"] for _ in range(options["repeat"])]
+                for profile in options["profiles"]
+            }
+        finally:
+            driver.quit()
+
+        self.report(rows)
+
+    def measure(self, driver, url, profile):
+        """Jeden pomiar: (sekundy do gotowości, liczba zasobów, bajty, bajty PDF)."""
+        site = urllib.parse.urlparse(url).hostname or ""
+        driver.get("about:blank")
+        apply_blocking_profile(driver, site, profile)
+
+        started = time.monotonic()
+        driver.get(url)
+        WebDriverWait(driver, 30).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+        wait_until_ready(driver, site, "article")
+        load_time = time.monotonic() - started
+
+        requests_count, transferred = driver.execute_script(TRANSFER_SCRIPT)
+        pdf = execute_cdp(driver, "Page.printToPDF", {"printBackground": True})
+        pdf_size = len(base64.b64decode(pdf["data"]))
+        return load_time, requests_count, transferred, pdf_size
+
+    def report(self, rows):
+        """Tabela median dla każdego profilu i zmiana względem profilu bez blokowania."""
+        medians = {
+            profile: [statistics.median(values) for values in zip(*samples)]
+            for profile, samples in rows.items()
+        }
+        baseline = medians.get("none")
+
+        self.stdout.write(f"{'profile':<12}{'load s':>9}{'requests':>10}{'KiB':>10}{'PDF KiB':>10}")
+        for profile, (load, count, transferred, pdf_size) in medians.items():
+            line = f"{profile:<12}{load:>9.2f}{count:>10.0f}{transferred / 1024:>10.0f}{pdf_size / 1024:>10.0f}"
+            if baseline and profile != "none":
+                line += (
+                    f"   load {self.change(load, baseline[0])}, transfer "
+                    f"{self.change(transferred, baseline[2])}, PDF {self.change(pdf_size, baseline[3])}"
+                )
+            self.stdout.write(line)
+
+    @staticmethod
+    def change(value, baseline):
+        if not baseline:
+            return "n/a"
+        return f"{(value - baseline) / baseline:+.0%}"
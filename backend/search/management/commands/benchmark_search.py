@@ -0,0 +1,201 @@
+"""
+Komenda mierząca przepustowość pełnego wyszukiwania (search_and_find_pdfs)
+na lokalnym serwisie testowym (search/fixture_site.py) - bez dostępu do sieci.
+Raportuje liczbę wyszukiwań na minutę, czas przetwarzania artykułu
+(p50/p95/max) i liczbę poleceń WebDrivera na wyszukiwanie.
+
+Pliki artykułów trafiają do magazynu artefaktów jak przy zwykłym wyszukiwaniu,
+a po pomiarze są usuwane razem z profilem i statystykami selektorów serwisu
+testowego (każde uruchomienie ma nowy port, czyli nowy "serwis").
+Przeglądarka musi widzieć serwer testowy: przy zdalnym Selenium w kontenerze
+serwer nasłuchuje na --host 0.0.0.0, a --public-host to nazwa hosta backendu.
+--local-chrome wymaga Chrome zainstalowanego lokalnie - obraz backendu go nie
+zawiera, więc w kontenerze używa się zdalnego Selenium (SELENIUM_URL).
+
+Przykłady:
+    python manage.py benchmark_search --local-chrome --searches 5 --consent --pdf-every 3
+    python manage.py benchmark_search --host 0.0.0.0 --public-host backend --latency 0.2
+"""
+
+import time
+import uuid
+import statistics
+import threading
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.remote.webdriver import WebDriver
+from unittest.mock import patch
+
+from search import lifecycle, reader, selenium_client
+from search.fixture_site import LAYOUTS, FixtureConfig, FixtureServer
+from search.models import Artifact, SelectorStat, SiteProfile
+from search.sites import site_domain
+
+
+def percentile(values, fraction):
+    """Wartość percentyla (metoda najbliższej rangi) z listy pomiarów."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class Command(BaseCommand):
+    help = "Pomiar przepustowości wyszukiwania na lokalnym serwisie testowym"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--searches", type=int, default=3, help="Liczba wyszukiwań")
+        parser.add_argument("--results", type=int, default=10, help="Liczba artykułów na wyszukiwanie")
+        parser.add_argument("--concurrency", type=int, default=1, help="Artykuły przetwarzane równolegle")
+        parser.add_argument("--strategy", choices=["http", "selenium"], default="http",
+                            help="Pobieranie stron wyników: HTTP albo przeglądarka")
+        parser.add_argument("--render-mode", choices=reader.RENDER_MODES, default=None,
+                            help="Tryb generowania PDF ze strony artykułu")
+        parser.add_argument("--layout", choices=list(LAYOUTS), default="teaser", help="Układ stron wyników")
+        parser.add_argument("--per-page", type=int, default=10, help="Wyników na stronie wyszukiwania")
+        parser.add_argument("--latency", type=float, default=0.0, help="Opóźnienie odpowiedzi serwisu (s)")
+        parser.add_argument("--page-weight", type=int, default=0, help="Dodatkowe bajty strony artykułu")
+        parser.add_argument("--consent", action="store_true", help="Baner zgody na cookies w artykułach")
+        parser.add_argument("--pdf-every", type=int, default=0, help="Co który artykuł ma link do PDF")
+        parser.add_argument("--host", default="127.0.0.1", help="Adres nasłuchiwania serwisu testowego")
+        parser.add_argument("--port", type=int, default=0, help="Port serwisu testowego (0 = dowolny)")
+        parser.add_argument("--public-host", default="", help="Nazwa hosta serwisu widziana z przeglądarki")
+        parser.add_argument("--local-chrome", action="store_true",
+                            help="Lokalny Chrome zamiast zdalnego Selenium (SELENIUM_URL); "
+                                 "wymaga Chrome, którego nie ma w obrazie backendu")
+
+    def handle(self, *args, **options):
+        if options["searches"] < 1 or options["results"] < 1:
+            raise CommandError("--searches and --results must be positive")
+
+        config = FixtureConfig(
+            layout=options["layout"], articles=options["results"], per_page=options["per_page"],
+            latency=options["latency"], page_weight=options["page_weight"],
+            consent=options["consent"], pdf_every=options["pdf_every"],
+        )
+        public_host = options["public_host"] or options["host"]
+
+        with FixtureServer(config, options["host"], options["port"]) as server:
+            site = f"{public_host}:{server.port}"
+            adapter = server.adapter(public_host)
+            adapter["js_only"] = options["strategy"] == "selenium"
+            overrides = override_settings(
+                SITE_ADAPTERS={**settings.SITE_ADAPTERS, site_domain(site): adapter},
+                # Serwis testowy nie jest ograniczany - mierzony jest sam potok
+                SITE_RATE_LIMITS={**settings.SITE_RATE_LIMITS, public_host: (10000.0, 10000)},
+            )
+            artifacts = set()
+            try:
+                with overrides:
+                    report = self.run_searches(site, config, options, artifacts)
+            finally:
+                self.cleanup(site, artifacts)
+
+        self.print_report(report, config, options)
+
+    def cleanup(self, site, artifacts):
+        """Usunięcie wierszy serwisu testowego i nieużywanych plików artykułów z pomiaru."""
+        domain = site_domain(site)
+        SiteProfile.objects.filter(domain=domain).delete()
+        SelectorStat.objects.filter(domain=domain).delete()
+        removed = sum(
+            lifecycle.remove_unreferenced(artifact)
+            for artifact in Artifact.objects.filter(sha256__in=artifacts, ref_count=0)
+        )
+        self.stdout.write(f"removed benchmark data for {domain} ({removed} files)")
+
+    def run_searches(self, site, config, options, artifacts):
+        """
+        Wykonanie wyszukiwań z licznikami poleceń WebDrivera i czasów artykułów.
+        Skróty zapisanych plików są dodawane do artifacts (sprzątanie po pomiarze).
+        """
+        calls = Counter()
+        durations = []
+        lock = threading.Lock()
+        execute = WebDriver.execute
+        process_article = selenium_client.process_article
+
+        def counted_execute(driver, command, params=None):
+            with lock:
+                calls["webdriver"] += 1
+            return execute(driver, command, params)
+
+        def timed_process_article(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return process_article(*args, **kwargs)
+            finally:
+                durations.append(time.perf_counter() - started)
+
+        def new_driver():
+            if options["local_chrome"]:
+                return webdriver.Chrome(options=selenium_client.build_chrome_options())
+            return webdriver.Remote(
+                command_executor=selenium_client.SELENIUM_URL,
+                options=selenium_client.build_chrome_options(),
+            )
+
+        run_id = uuid.uuid4().hex[:6]
+        round_trips, downloaded, elapsed = [], 0, []
+        with patch.object(WebDriver, "execute", counted_execute), \
+                patch.object(selenium_client, "process_article", timed_process_article), \
+                patch.object(selenium_client, "create_driver", new_driver):
+            try:
+                driver = new_driver()
+            except WebDriverException as exc:
+                if options["local_chrome"]:
+                    raise CommandError(
+                        "Could not start local Chrome (the backend image does not include it); "
+                        f"run without --local-chrome to use SELENIUM_URL: {exc.msg}"
+                    )
+                raise CommandError(f"Could not connect to Selenium at {selenium_client.SELENIUM_URL}: {exc.msg}")
+            try:
+                for number in range(options["searches"]):
+                    # Nowe zapytanie to nowe adresy artykułów (bez pamięci podręcznej renderów)
+                    query = f"benchmark {run_id} {number}"
+                    before = calls["webdriver"]
+                    started = time.perf_counter()
+                    found = selenium_client.search_and_find_pdfs(
+                        query, site, max_results=options["results"], driver=driver,
+                        concurrency=options["concurrency"], render_mode=options["render_mode"],
+                    )
+                    elapsed.append(time.perf_counter() - started)
+                    round_trips.append(calls["webdriver"] - before)
+                    downloaded += sum(1 for article in found if article["downloaded"])
+                    artifacts.update(article["artifact"] for article in found if article.get("artifact"))
+                    self.stdout.write(
+                        f"search {number + 1}: {len(found)} articles in {elapsed[-1]:.2f}s, "
+                        f"{round_trips[-1]} WebDriver commands"
+                    )
+            finally:
+                driver.quit()
+
+        return {
+            "elapsed": elapsed,
+            "durations": durations,
+            "round_trips": round_trips,
+            "downloaded": downloaded,
+        }
+
+    def print_report(self, report, config, options):
+        total = sum(report["elapsed"])
+        durations = report["durations"]
+        searches = len(report["elapsed"])
+        self.stdout.write("")
+        self.stdout.write(f"searches/minute:           {searches / total * 60:.2f}")
+        self.stdout.write(f"mean search time:          {total / searches:.2f}s")
+        self.stdout.write(
+            f"article latency p50/p95/max: {percentile(durations, 0.5):.3f}s / "
+            f"{percentile(durations, 0.95):.3f}s / {max(durations, default=0):.3f}s"
+        )
+        self.stdout.write(f"WebDriver commands/search: {statistics.mean(report['round_trips']):.1f}")
+        self.stdout.write(f"articles downloaded:       {report['downloaded']} / {len(durations)}")
+        self.stdout.write(
+            "fixture requests:          "
+            + ", ".join(f"{kind}={count}" for kind, count in sorted(config.hits.items()))
+        )
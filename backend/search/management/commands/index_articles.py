@@ -0,0 +1,32 @@
+"""
+Komenda indeksująca tekst zapisanych plików, które nie trafiły jeszcze
+do lokalnego indeksu pełnotekstowego (np. pliki sprzed wprowadzenia
+indeksu albo zapisane, gdy worker Celery był niedostępny).
+
+Przykład:
+    python manage.py index_articles --limit 500
+"""
+
+from django.core.management.base import BaseCommand
+
+from search.library import index_artifact, unindexed_artifacts
+
+
+class Command(BaseCommand):
+    help = "Indeksowanie tekstu zapisanych artykułów w lokalnej bibliotece"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--limit", type=int, default=0, help="Największa liczba plików (0 = wszystkie)")
+
+    def handle(self, *args, **options):
+        artifacts = unindexed_artifacts()
+        if options["limit"]:
+            artifacts = artifacts[:options["limit"]]
+
+        indexed = skipped = 0
+        for artifact in artifacts.iterator():
+            if index_artifact(artifact) is None:
+                skipped += 1
+            else:
+                indexed += 1
+        self.stdout.write(f"Indexed {indexed} files, skipped {skipped}")
@@ -0,0 +1,127 @@
+"""
+Moduł metryk aplikacji.
+Liczniki są przechowywane w Redis, dzięki czemu sumują się ze wszystkich
+procesów (workery Celery, serwer WWW). Błędy Redis nigdy nie przerywają
+głównego przetwarzania - metryka jest wtedy pomijana. Endpoint /metrics
+(config/views.py) udostępnia wszystkie metryki w formacie tekstowym
+Prometheus (exposition).
+"""
+
+import json
+import logging
+
+from redis.exceptions import RedisError
+
+from .redis_client import get_redis
+
+# Konfiguracja loggera dla tego modułu
+logger = logging.getLogger(__name__)
+
+# Hash Redis z licznikami: pole = nazwa metryki + etykiety w JSON
+COUNTERS_KEY = "metrics:counters"
+
+
+def metric_field(name, labels):
+    """Pole hasha dla metryki z etykietami, np. 'render_cache_hits_total|{}'."""
+    return f"{name}|{json.dumps(labels, sort_keys=True)}"
+
+
+def incr(name, amount=1, **labels):
+    """Zwiększenie licznika."""
+    try:
+        get_redis().hincrby(COUNTERS_KEY, metric_field(name, labels), amount)
+    except RedisError as exc:
+        logger.debug("Metric %s not recorded: %s", name, exc)
+
+
+def get_counter(name, **labels):
+    """Bieżąca wartość licznika (0, gdy brak danych lub Redis jest niedostępny)."""
+    try:
+        value = get_redis().hget(COUNTERS_KEY, metric_field(name, labels))
+    except RedisError:
+        return 0
+    return int(value or 0)
+
+
+# Domyślne przedziały histogramów czasu w sekundach
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def observe(name, value, buckets=DEFAULT_BUCKETS, **labels):
+    """
+    Zapisanie obserwacji w histogramie (skumulowane przedziały jak w Prometheus:
+    <name>_bucket z etykietą le, <name>_sum i <name>_count). Kwantyle, np. p99,
+    wylicza się z przedziałów.
+    """
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for bound in buckets:
+            # Przyrost 0 tworzy pusty przedział - eksport ma zawsze komplet przedziałów
+            pipe.hincrby(
+                COUNTERS_KEY, metric_field(f"{name}_bucket", {**labels, "le": str(bound)}), int(value <= bound)
+            )
+        pipe.hincrby(COUNTERS_KEY, metric_field(f"{name}_bucket", {**labels, "le": "+Inf"}), 1)
+        pipe.hincrbyfloat(COUNTERS_KEY, metric_field(f"{name}_sum", labels), value)
+        pipe.hincrby(COUNTERS_KEY, metric_field(f"{name}_count", labels), 1)
+        pipe.execute()
+    except RedisError as exc:
+        logger.debug("Metric %s not recorded: %s", name, exc)
+
+
+# Typ zawartości formatu tekstowego Prometheus
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Kolejność serii histogramu w eksporcie
+HISTOGRAM_SUFFIXES = ("_bucket", "_sum", "_count")
+
+
+def format_labels(labels):
+    """Etykiety w składni Prometheus, np. {site="rp.pl",stage="print"}."""
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in sorted(labels.items()):
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+def exposition():
+    """
+    Wszystkie metryki z hasha COUNTERS_KEY w formacie tekstowym Prometheus.
+    Serie <nazwa>_bucket/_sum/_count tworzą histogram, nazwy zakończone
+    _total są licznikami. Zgłasza RedisError, gdy Redis jest niedostępny.
+    """
+    samples = []
+    for field, value in get_redis().hgetall(COUNTERS_KEY).items():
+        field = field.decode() if isinstance(field, bytes) else field
+        value = value.decode() if isinstance(value, bytes) else value
+        name, _, labels = field.partition("|")
+        samples.append((name, json.loads(labels or "{}"), value))
+
+    histograms = {name[:-len("_bucket")] for name, _, _ in samples if name.endswith("_bucket")}
+
+    def family(name):
+        for suffix in HISTOGRAM_SUFFIXES:
+            if name.endswith(suffix) and name[:-len(suffix)] in histograms:
+                return name[:-len(suffix)], HISTOGRAM_SUFFIXES.index(suffix)
+        return name, 0
+
+    def sort_key(sample):
+        name, labels, _ = sample
+        base, order = family(name)
+        le = labels.get("le")
+        other = sorted((key, value) for key, value in labels.items() if key != "le")
+        bound = float("inf") if le == "+Inf" else float(le) if le is not None else 0.0
+        return base, other, order, bound
+
+    lines = []
+    current = None
+    for name, labels, value in sorted(samples, key=sort_key):
+        base, _ = family(name)
+        if base != current:
+            current = base
+            kind = "histogram" if base in histograms else "counter" if base.endswith("_total") else "untyped"
+            lines.append(f"# TYPE {base} {kind}")
+        lines.append(f"{name}{format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n" if lines else ""
@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0002_alter_foundarticle_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchquery',
+            name='concurrency',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='foundarticle',
+            name='position',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterModelOptions(
+            name='foundarticle',
+            options={'ordering': ['position', 'id']},
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0003_searchquery_concurrency_foundarticle_position'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SiteProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('domain', models.CharField(max_length=200, unique=True)),
+                ('fetch_strategy', models.CharField(choices=[('auto', 'auto'), ('http', 'http'), ('selenium', 'selenium')], default='auto', max_length=20)),
+                ('js_only', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0005_artifact_foundarticle_artifact'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchquery',
+            name='search_key',
+            field=models.CharField(blank=True, db_index=True, default='', max_length=40),
+        ),
+        migrations.AddField(
+            model_name='searchquery',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
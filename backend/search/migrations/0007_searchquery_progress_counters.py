@@ -0,0 +1,26 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0006_searchquery_search_key_finished_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchquery',
+            name='links_found',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='searchquery',
+            name='articles_processed',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='searchquery',
+            name='articles_downloaded',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
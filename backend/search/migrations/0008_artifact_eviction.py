@@ -0,0 +1,27 @@
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0007_searchquery_progress_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='artifact',
+            name='last_accessed_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='artifact',
+            name='evicted',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='foundarticle',
+            name='evicted',
+            field=models.BooleanField(default=False),
+        ),
+    ]
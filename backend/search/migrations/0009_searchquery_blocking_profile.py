@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0008_artifact_eviction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchquery',
+            name='blocking_profile',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+    ]
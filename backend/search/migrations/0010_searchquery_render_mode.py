@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0009_searchquery_blocking_profile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchquery',
+            name='render_mode',
+            field=models.CharField(blank=True, default='', max_length=10),
+        ),
+    ]
@@ -0,0 +1,50 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0010_searchquery_render_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='siteprofile',
+            name='search_url',
+            field=models.CharField(blank=True, default='', max_length=500),
+        ),
+        migrations.AddField(
+            model_name='siteprofile',
+            name='result_selectors',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='siteprofile',
+            name='next_page_selector',
+            field=models.CharField(blank=True, default='', max_length=300),
+        ),
+        migrations.AddField(
+            model_name='siteprofile',
+            name='consent_selector',
+            field=models.CharField(blank=True, default='', max_length=300),
+        ),
+        migrations.AddField(
+            model_name='siteprofile',
+            name='search_input_selector',
+            field=models.CharField(blank=True, default='', max_length=300),
+        ),
+        migrations.CreateModel(
+            name='SelectorStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('domain', models.CharField(max_length=200)),
+                ('selector', models.CharField(max_length=300)),
+                ('hits', models.PositiveIntegerField(default=0)),
+                ('misses', models.PositiveIntegerField(default=0)),
+                ('last_hit_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'unique_together': {('domain', 'selector')},
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0011_site_adapters_selectorstat'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchquery',
+            name='max_results',
+            field=models.PositiveSmallIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='siteprofile',
+            name='page_url',
+            field=models.CharField(blank=True, default='', max_length=500),
+        ),
+    ]
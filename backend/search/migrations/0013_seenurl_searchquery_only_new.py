@@ -0,0 +1,27 @@
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0012_searchquery_max_results_siteprofile_page_url'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='searchquery',
+            name='only_new',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='SeenUrl',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url_hash', models.CharField(max_length=40, unique=True)),
+                ('url', models.CharField(max_length=1000)),
+                ('first_seen_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_seen_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+        ),
+    ]
@@ -0,0 +1,28 @@
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0013_seenurl_searchquery_only_new'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleText',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(blank=True, default='', max_length=500)),
+                ('content', models.TextField(blank=True, default='')),
+                ('search_vector', django.contrib.postgres.search.SearchVectorField(blank=True, null=True)),
+                ('indexed_at', models.DateTimeField(auto_now=True)),
+                ('artifact', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='text', to='search.artifact')),
+            ],
+            options={
+                'indexes': [django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='articletext_vector_gin')],
+            },
+        ),
+    ]
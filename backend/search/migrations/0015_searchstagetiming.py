@@ -0,0 +1,27 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('search', '0014_articletext'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchStageTiming',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stage', models.CharField(max_length=30)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total_seconds', models.FloatField(default=0)),
+                ('max_seconds', models.FloatField(default=0)),
+                ('search', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timings', to='search.searchquery')),
+            ],
+            options={
+                'ordering': ['-total_seconds'],
+                'unique_together': {('search', 'stage')},
+            },
+        ),
+    ]
@@ -3,7 +3,10 @@ Moduł modeli bazy danych dla aplikacji wyszukiwania.
 Zawiera definicje modeli SearchQuery i FoundArticle.
 """
 
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.db import models
+from django.utils import timezone
 
 
 class SearchQuery(models.Model):
@@ -11,19 +14,119 @@ class SearchQuery(models.Model):
     Model reprezentujący zapytanie wyszukiwania.
     Przechowuje informacje o słowie kluczowym, stronie i statusie wyszukiwania.
     """
+    # Statusy kończące wyszukiwanie
+    FINISHED_STATUSES = ("done", "error")
+
     # Słowo kluczowe wyszukiwania
     query = models.CharField(max_length=200)
     # Strona internetowa do przeszukania
     site = models.CharField(max_length=200)
     # Status wyszukiwania (pending, running, done, error)
     status = models.CharField(max_length=20, default="pending")
+    # Liczba artykułów przetwarzanych równolegle (puste = wartość z ustawień)
+    concurrency = models.PositiveSmallIntegerField(blank=True, null=True)
+    # Profil blokowania zasobów stron artykułów (puste = profil serwisu lub domyślny)
+    blocking_profile = models.CharField(max_length=20, blank=True, default="")
+    # Liczba artykułów do zebrania (puste = SEARCH_DEFAULT_RESULTS)
+    max_results = models.PositiveSmallIntegerField(blank=True, null=True)
+    # Czy pomijać artykuły znalezione już we wcześniejszych wyszukiwaniach
+    only_new = models.BooleanField(default=False)
+    # Tryb generowania PDF ze stron artykułów: reader lub full (puste = tryb serwisu lub domyślny)
+    render_mode = models.CharField(max_length=10, blank=True, default="")
+    # Klucz znormalizowanej pary (zapytanie, serwis) do łączenia identycznych wyszukiwań
+    search_key = models.CharField(max_length=40, blank=True, default="", db_index=True)
     # Data i czas utworzenia zapytania
     created_at = models.DateTimeField(auto_now_add=True)
+    # Data i czas zakończenia wyszukiwania (done lub error)
+    finished_at = models.DateTimeField(blank=True, null=True)
+    # Liczba znalezionych linków do artykułów
+    links_found = models.PositiveIntegerField(default=0)
+    # Liczba przetworzonych (zapisanych) artykułów
+    articles_processed = models.PositiveIntegerField(default=0)
+    # Liczba artykułów z pobranym plikiem
+    articles_downloaded = models.PositiveIntegerField(default=0)
 
     def __str__(self):
         return f"{self.query} @ {self.site} ({self.status})"
 
 
+class SearchStageTiming(models.Model):
+    """
+    Model reprezentujący łączny czas etapu wyszukiwania (search/timing.py).
+    Zadania jednego wyszukiwania (także fan-out) dodają swoje pomiary.
+    """
+    # Powiązanie z zapytaniem wyszukiwania
+    search = models.ForeignKey(SearchQuery, related_name="timings", on_delete=models.CASCADE)
+    # Nazwa etapu (session, search_page, consent, extract_links, article_page, print, download, search)
+    stage = models.CharField(max_length=30)
+    # Liczba pomiarów etapu
+    count = models.PositiveIntegerField(default=0)
+    # Łączny czas etapu w sekundach
+    total_seconds = models.FloatField(default=0)
+    # Najdłuższy pojedynczy pomiar w sekundach
+    max_seconds = models.FloatField(default=0)
+
+    class Meta:
+        unique_together = [("search", "stage")]
+        ordering = ["-total_seconds"]
+
+    def __str__(self):
+        return f"{self.search_id} {self.stage}: {self.total_seconds:.2f}s"
+
+
+class Artifact(models.Model):
+    """
+    Model reprezentujący plik w magazynie adresowanym treścią.
+    Plik jest identyfikowany skrótem SHA-256 i współdzielony przez wszystkie
+    artykuły o tej samej treści; ref_count liczy odwołania z FoundArticle.
+    """
+    # Skrót SHA-256 treści pliku (szesnastkowo)
+    sha256 = models.CharField(max_length=64, unique=True)
+    # Rozszerzenie pliku (pdf, html)
+    ext = models.CharField(max_length=10)
+    # Rozmiar pliku w bajtach
+    size = models.BigIntegerField(default=0)
+    # Liczba artykułów wskazujących na ten plik
+    ref_count = models.PositiveIntegerField(default=0)
+    # Data i czas zapisania pliku
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Data i czas ostatniego użycia pliku (pobranie, ponowne użycie) - podstawa eviction LRU
+    last_accessed_at = models.DateTimeField(default=timezone.now, db_index=True)
+    # Czy plik został usunięty z dysku przez limit miejsca (rekord i odwołania zostają)
+    evicted = models.BooleanField(default=False)
+
+    @property
+    def name(self):
+        """Nazwa obiektu w magazynie, używana w adresach /api/files/."""
+        return f"{self.sha256}.{self.ext}"
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+
+
+class ArticleText(models.Model):
+    """
+    Model reprezentujący tekst pliku artefaktu w lokalnym indeksie
+    pełnotekstowym (search/library.py).
+    """
+    # Plik, z którego wyodrębniono tekst
+    artifact = models.OneToOneField(Artifact, related_name="text", on_delete=models.CASCADE)
+    # Tytuł artykułu (waga A w wektorze dokumentu)
+    title = models.CharField(max_length=500, blank=True, default="")
+    # Tekst dokumentu (waga B w wektorze dokumentu)
+    content = models.TextField(blank=True, default="")
+    # Wektor dokumentu do wyszukiwania pełnotekstowego
+    search_vector = SearchVectorField(blank=True, null=True)
+    # Data i czas indeksowania
+    indexed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [GinIndex(fields=["search_vector"], name="articletext_vector_gin")]
+
+    def __str__(self):
+        return self.title or str(self.artifact)
+
+
 class FoundArticle(models.Model):
     """
     Model reprezentujący znaleziony artykuł.
@@ -35,12 +138,106 @@ class FoundArticle(models.Model):
     title = models.CharField(max_length=500)
     # Adres URL artykułu
     url = models.URLField(max_length=1000)
-    # Nazwa pliku PDF (jeśli został pobrany)
+    # Plik artykułu w magazynie adresowanym treścią
+    artifact = models.ForeignKey(
+        Artifact, related_name="articles", on_delete=models.SET_NULL, blank=True, null=True
+    )
+    # Nazwa pliku PDF w płaskim katalogu media/articles (tylko starsze rekordy)
     pdf_filename = models.CharField(max_length=500, blank=True, null=True)
     # Czy artykuł został pobrany
     downloaded = models.BooleanField(default=False)
+    # Czy plik artykułu został usunięty z dysku (można go pobrać ponownie)
+    evicted = models.BooleanField(default=False)
+    # Pozycja artykułu na liście wyników wyszukiwania
+    position = models.PositiveIntegerField(default=0)
     # Data i czas znalezienia artykułu
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        ordering = ["position", "id"]
+
     def __str__(self):
         return f"{self.title} - {self.url}"
+
+
+class SiteProfile(models.Model):
+    """
+    Model reprezentujący profil przeszukiwanego serwisu.
+    Przechowuje strategię pobierania wyników, która ostatnio dała wyniki.
+    """
+    # Strategia jeszcze nieustalona - najpierw próbowane jest HTTP
+    AUTO = "auto"
+    # Wyniki dostępne w statycznym HTML (requests + BeautifulSoup)
+    HTTP = "http"
+    # Wyniki wymagają przeglądarki
+    SELENIUM = "selenium"
+    FETCH_STRATEGIES = [
+        (AUTO, "auto"),
+        (HTTP, "http"),
+        (SELENIUM, "selenium"),
+    ]
+
+    # Domena serwisu (małe litery, bez "www.")
+    domain = models.CharField(max_length=200, unique=True)
+    # Strategia pobierania wyników wyszukiwania
+    fetch_strategy = models.CharField(max_length=20, choices=FETCH_STRATEGIES, default=AUTO)
+    # Serwis oznaczony ręcznie jako wymagający JavaScriptu
+    js_only = models.BooleanField(default=False)
+    # Szablon adresu wyszukiwania z polem {query} (puste = adapter wbudowany lub z ustawień)
+    search_url = models.CharField(max_length=500, blank=True, default="")
+    # Szablon adresu kolejnych stron wyników z polami {query} i {page}
+    page_url = models.CharField(max_length=500, blank=True, default="")
+    # Selektory CSS odnośników do artykułów, po jednym w wierszu
+    result_selectors = models.TextField(blank=True, default="")
+    # Selektor CSS odnośnika do następnej strony wyników
+    next_page_selector = models.CharField(max_length=300, blank=True, default="")
+    # Selektor CSS przycisku zgody na cookies
+    consent_selector = models.CharField(max_length=300, blank=True, default="")
+    # Selektor CSS pola wyszukiwania (serwisy bez wyszukiwania przez adres)
+    search_input_selector = models.CharField(max_length=300, blank=True, default="")
+    # Data i czas ostatniej zmiany strategii
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.domain} ({self.fetch_strategy})"
+
+
+class SelectorStat(models.Model):
+    """
+    Model reprezentujący skuteczność selektora wyników w danym serwisie.
+    Selektory z trafieniami są sprawdzane jako pierwsze przy kolejnych wyszukiwaniach.
+    """
+    # Domena serwisu (małe litery, bez "www.")
+    domain = models.CharField(max_length=200)
+    # Selektor CSS odnośników do artykułów
+    selector = models.CharField(max_length=300)
+    # Liczba wyszukiwań, w których selektor dał prawidłowe linki
+    hits = models.PositiveIntegerField(default=0)
+    # Liczba kolejnych wyszukiwań, w których wyuczony selektor nie dał linków
+    misses = models.PositiveIntegerField(default=0)
+    # Data i czas ostatniego trafienia
+    last_hit_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        unique_together = [("domain", "selector")]
+
+    def __str__(self):
+        return f"{self.domain}: {self.selector} ({self.hits} hits)"
+
+
+class SeenUrl(models.Model):
+    """
+    Model reprezentujący adres artykułu widziany w dowolnym wyszukiwaniu.
+    Adres jest przechowywany w postaci kanonicznej (search/canonical.py).
+    """
+    # Skrót SHA-1 postaci kanonicznej adresu
+    url_hash = models.CharField(max_length=40, unique=True)
+    # Postać kanoniczna adresu
+    url = models.CharField(max_length=1000)
+    # Data i czas pierwszego znalezienia artykułu
+    first_seen_at = models.DateTimeField(default=timezone.now)
+    # Data i czas ostatniego znalezienia artykułu
+    last_seen_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return self.url
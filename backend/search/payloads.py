@@ -0,0 +1,47 @@
+"""
+Moduł budowania odpowiedzi JSON o stanie wyszukiwania.
+Ta sama postać danych jest zwracana przez endpoint statusu i wysyłana
+w zdarzeniach strumienia SSE.
+"""
+
+import urllib.parse
+
+from .models import FoundArticle
+
+
+def article_payload(fa):
+    """Słownik opisujący znaleziony artykuł wraz z adresem pobrania pliku."""
+    file_url = None
+    # Generowanie URL do pobrania pliku (magazyn artefaktów lub starszy plik)
+    if fa.downloaded and fa.artifact and not fa.evicted:
+        file_url = f"/api/files/{fa.artifact.name}"
+    elif fa.downloaded and fa.pdf_filename:
+        file_url = f"/api/files/{urllib.parse.quote(fa.pdf_filename)}"
+    return {
+        "id": fa.id,
+        "title": fa.title,
+        "url": fa.url,
+        "downloaded": fa.downloaded,
+        "evicted": fa.evicted,
+        "file_url": file_url,
+    }
+
+
+def progress_payload(search):
+    """Liczniki postępu wyszukiwania."""
+    return {
+        "links_found": search.links_found,
+        "processed": search.articles_processed,
+        "downloaded": search.articles_downloaded,
+    }
+
+
+def status_payload(search):
+    """Pełny stan wyszukiwania: status, postęp i lista wyników."""
+    results = FoundArticle.objects.filter(search=search).select_related("artifact")
+    return {
+        "search_id": search.id,
+        "status": search.status,
+        "progress": progress_payload(search),
+        "results": [article_payload(fa) for fa in results],
+    }
@@ -0,0 +1,196 @@
+"""
+Moduł ograniczania tempa żądań do serwisów (token bucket w Redis).
+Limit jest wspólny dla wszystkich workerów i obejmuje zarówno otwieranie stron
+w przeglądarce, jak i pobieranie plików i stron przez HTTP. Stawki można
+ustawić osobno dla serwisów (SITE_RATE_LIMITS). Po odpowiedzi 429/503 albo
+wykryciu strony blokady (captcha) tempo dla domeny jest adaptacyjnie
+zmniejszane, a nagłówek Retry-After wstrzymuje żądania do wskazanego czasu.
+Gdy Redis jest niedostępny, żądania nie są ograniczane.
+"""
+
+import time
+import logging
+import urllib.parse
+
+from bs4 import BeautifulSoup
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from . import metrics
+from .redis_client import get_redis
+
+# Konfiguracja loggera dla tego modułu
+logger = logging.getLogger(__name__)
+
+# Fragmenty tytułu strony świadczące o zablokowaniu (małe litery)
+BLOCK_TITLE_MARKERS = (
+    "captcha",
+    "unusual traffic",
+    "access denied",
+    "too many requests",
+    "attention required",
+    "just a moment",
+    "are you a robot",
+    "nie jesteś robotem",
+)
+
+# Elementy strony wyzwania (Cloudflare, formularz captcha zamiast treści);
+# zwykły skrypt lub widżet reCAPTCHA na stronie wyników nie jest blokadą
+CHALLENGE_SELECTORS = (
+    "form#challenge-form",
+    "#challenge-running",
+    "#cf-challenge-running",
+    "form#captcha-form",
+    "form[action*='captcha']",
+    "#px-captcha",
+)
+
+# Kody odpowiedzi oznaczające, że serwis ogranicza nasze żądania
+BLOCK_STATUSES = {429, 503}
+
+# Maksymalne spowolnienie tempa po kolejnych blokadach
+MAX_PENALTY = 32
+
+# Skrypt token bucket: zwraca czas oczekiwania w ms (0 = token pobrany).
+# KEYS: kubełek, mnożnik kary, blokada do czasu; ARGV: tokeny/s, pojemność
+TOKEN_BUCKET_SCRIPT = """
+local blocked = redis.call('PTTL', KEYS[3])
+if blocked > 0 then
+  return blocked
+end
+local penalty = tonumber(redis.call('GET', KEYS[2])) or 1
+local rate = tonumber(ARGV[1]) / penalty
+local burst = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local data = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(data[1]) or burst
+local ts = tonumber(data[2]) or now
+tokens = math.min(burst, tokens + (now - ts) * rate / 1000)
+local wait = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+else
+  wait = math.ceil((1 - tokens) * 1000 / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(burst * 1000 / rate) + 1000)
+return wait
+"""
+
+_script = None
+
+
+class BlockedError(Exception):
+    """Serwis zwrócił stronę blokady (captcha) zamiast treści."""
+
+
+def rate_domain(url):
+    """
+    Domena, której dotyczy limit: skonfigurowany serwis, do którego należy
+    host (np. wiadomosci.onet.pl -> onet.pl), albo sam host bez www.
+    """
+    host = (urllib.parse.urlparse(url).hostname or "").lower()
+    for site in settings.SITE_RATE_LIMITS:
+        if host == site or host.endswith("." + site):
+            return site
+    return host[4:] if host.startswith("www.") else host
+
+
+def site_rate(domain):
+    """(tokeny na sekundę, pojemność kubełka) dla domeny."""
+    return settings.SITE_RATE_LIMITS.get(
+        domain, (settings.RATE_LIMIT_DEFAULT_RATE, settings.RATE_LIMIT_DEFAULT_BURST)
+    )
+
+
+def _keys(domain):
+    return [f"ratelimit:{domain}", f"ratelimit:{domain}:penalty", f"ratelimit:{domain}:blocked"]
+
+
+def acquire(url, max_wait=None):
+    """
+    Oczekiwanie na token dla domeny adresu url; zwraca czas oczekiwania w sekundach.
+    Po max_wait sekundach żądanie jest wpuszczane mimo braku tokenu.
+    """
+    global _script
+    max_wait = settings.RATE_LIMIT_MAX_WAIT if max_wait is None else max_wait
+    domain = rate_domain(url)
+    if not domain:
+        return 0.0
+    rate, burst = site_rate(domain)
+
+    started = time.monotonic()
+    try:
+        if _script is None:
+            _script = get_redis().register_script(TOKEN_BUCKET_SCRIPT)
+        while True:
+            wait_ms = _script(keys=_keys(domain), args=[rate, burst])
+            waited = time.monotonic() - started
+            if not wait_ms:
+                break
+            if waited + wait_ms / 1000 > max_wait:
+                logger.warning("Rate limit wait for %s exceeded %ss, proceeding", domain, max_wait)
+                break
+            time.sleep(wait_ms / 1000)
+    except RedisError as exc:
+        logger.debug("Rate limiter unavailable: %s", exc)
+        return 0.0
+
+    waited = time.monotonic() - started
+    if waited:
+        metrics.observe("rate_limit_wait_seconds", waited, domain=domain)
+    return waited
+
+
+def report_block(url, retry_after=None):
+    """
+    Zgłoszenie odpowiedzi 429/503 lub strony blokady: tempo dla domeny jest
+    zmniejszane dwukrotnie (do MAX_PENALTY) na RATE_LIMIT_PENALTY_TTL sekund,
+    a Retry-After wstrzymuje wszystkie żądania do domeny.
+    """
+    domain = rate_domain(url)
+    _, penalty_key, blocked_key = _keys(domain)
+    try:
+        client = get_redis()
+        penalty = min(int(client.get(penalty_key) or 1) * 2, MAX_PENALTY)
+        client.set(penalty_key, penalty, ex=settings.RATE_LIMIT_PENALTY_TTL)
+        seconds = parse_retry_after(retry_after)
+        if seconds:
+            client.set(blocked_key, 1, px=int(seconds * 1000))
+    except RedisError as exc:
+        logger.debug("Rate limiter unavailable: %s", exc)
+        return
+
+    metrics.incr("rate_limit_blocks_total", domain=domain)
+    logger.warning("Blocked by %s, slowing down %dx", domain, penalty)
+
+
+def parse_retry_after(value):
+    """Liczba sekund z nagłówka Retry-After (tylko postać liczbowa) albo None."""
+    try:
+        return min(float(value), settings.RATE_LIMIT_MAX_WAIT)
+    except (TypeError, ValueError):
+        return None
+
+
+def is_block_page(title, challenge=False, query=""):
+    """
+    Czy strona jest blokadą lub captcha: zawiera element wyzwania albo jej
+    tytuł ma znacznik blokady. Treść zapytania powtórzona w tytule strony
+    wyników (np. "Wyniki: captcha") jest pomijana.
+    """
+    if challenge:
+        return True
+    title = (title or "").lower()
+    if query:
+        title = title.replace(query.lower(), " ")
+    return any(marker in title for marker in BLOCK_TITLE_MARKERS)
+
+
+def is_block_html(html, query=""):
+    """is_block_page dla pobranego kodu HTML (tytuł i elementy wyzwania, bez skryptów)."""
+    soup = BeautifulSoup(html or "", "html.parser")
+    title = soup.title.get_text() if soup.title else ""
+    challenge = any(soup.select_one(selector) for selector in CHALLENGE_SELECTORS)
+    return is_block_page(title, challenge, query)
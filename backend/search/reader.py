@@ -0,0 +1,318 @@
+"""
+Moduł trybu czytania (reader mode).
+Z HTML wyrenderowanej strony wybierana jest główna treść artykułu - tytuł,
+autor, akapity i ilustracje - bez nawigacji, paneli bocznych, reklam
+i komentarzy. Z czystego HTML weasyprint tworzy zwięzły PDF, który jest
+znacznie mniejszy i szybszy do wygenerowania niż wydruk całej strony.
+Tryb wybiera się dla wyszukiwania, serwisu (SITE_RENDER_MODES) albo
+globalnie (SEARCH_RENDER_MODE); "full" oznacza wydruk całej strony.
+Ilustracje są pobierane przez fetch_resource: tylko publiczne adresy
+http(s), z limitem tempa i profilem blokowania zasobów serwisu.
+"""
+
+import html
+import re
+import socket
+import fnmatch
+import ipaddress
+import urllib.parse
+from collections import namedtuple
+
+from bs4 import BeautifulSoup
+from django.conf import settings
+
+from . import blocking, downloader, ratelimit
+
+# Dostępne tryby generowania PDF
+READER = "reader"
+FULL = "full"
+RENDER_MODES = (READER, FULL)
+
+# Schematy adresów ilustracji pobieranych do PDF
+RESOURCE_SCHEMES = ("http", "https")
+
+# Maksymalna liczba przekierowań przy pobieraniu ilustracji
+RESOURCE_MAX_REDIRECTS = 3
+
+# Treść artykułu wybrana ze strony
+ReaderArticle = namedtuple("ReaderArticle", ["title", "byline", "body", "images", "url"])
+
+# Elementy usuwane w całości przed wyborem treści
+NOISE_TAGS = (
+    "script", "style", "noscript", "template", "iframe", "object", "embed", "svg", "canvas",
+    "form", "button", "input", "select", "textarea", "nav", "aside", "footer", "header",
+)
+
+# Klasy i identyfikatory elementów, które nie są treścią artykułu
+NOISE_RE = re.compile(
+    r"\b(ad|ads|advert\w*|reklam\w*|banner|sponsor\w*|promo\w*|sidebar|widget|related|"
+    r"recommend\w*|polecane|newsletter|share|sharing|social|comment\w*|komentarz\w*|"
+    r"cookie\w*|consent|breadcrumbs?|tags|paywall|popup|modal)\b",
+    re.IGNORECASE,
+)
+
+# Selektory autora, w kolejności zaufania
+BYLINE_SELECTORS = (
+    "[itemprop=author]", "[rel=author]", ".byline", ".author", ".article-author",
+)
+
+# Elementy zachowywane w treści (pozostałe są rozpakowywane do zawartości)
+KEEP_TAGS = {
+    "p", "h2", "h3", "h4", "ul", "ol", "li", "blockquote", "figure", "figcaption", "img",
+    "a", "strong", "em", "b", "i", "br", "table", "thead", "tbody", "tr", "th", "td",
+}
+
+# Atrybuty zachowywane w treści
+KEEP_ATTRS = {"a": ("href",), "img": ("src", "alt")}
+
+# Atrybuty z adresem obrazka ładowanego leniwie
+LAZY_SRC_ATTRS = ("data-src", "data-original", "data-lazy-src")
+
+# Arkusz stylów wydruku w trybie czytania
+READER_CSS = """
+@page { size: A4; margin: 18mm 16mm; }
+body { font-family: "DejaVu Serif", Georgia, serif; font-size: 11pt; line-height: 1.5; color: #111; }
+h1 { font-size: 20pt; line-height: 1.2; margin: 0 0 4pt; }
+.byline { color: #555; font-size: 9.5pt; margin: 0 0 2pt; }
+.source { color: #555; font-size: 8.5pt; margin: 0 0 14pt; word-break: break-all; }
+img { max-width: 100%; height: auto; }
+figure { margin: 8pt 0; }
+figcaption { color: #555; font-size: 9pt; }
+blockquote { margin: 8pt 0 8pt 12pt; padding-left: 8pt; border-left: 2pt solid #ccc; }
+a { color: inherit; text-decoration: none; }
+"""
+
+
+def mode_for(site, mode=None):
+    """Tryb generowania PDF: wybrany dla wyszukiwania, dla serwisu albo domyślny."""
+    if mode:
+        return mode
+    domain = site.lower().strip().replace("www.", "")
+    return settings.SITE_RENDER_MODES.get(domain, settings.SEARCH_RENDER_MODE)
+
+
+def _text_length(node):
+    return len(node.get_text(" ", strip=True))
+
+
+def _paragraph_score(node):
+    """Długość tekstu akapitów w elemencie (miara, czy element jest treścią)."""
+    return sum(_text_length(p) for p in node.find_all("p"))
+
+
+def _is_noise(node):
+    names = " ".join(node.get("class") or []) + " " + (node.get("id") or "")
+    return bool(NOISE_RE.search(names))
+
+
+def _remove_noise(soup):
+    """
+    Usunięcie elementów, które nie są treścią (reklamy, panele, komentarze).
+    Element oznaczony jako szum zostaje, jeśli zawiera większość tekstu strony
+    (np. kontener "page-with-sidebar" obejmujący cały artykuł).
+    """
+    for node in soup.find_all(NOISE_TAGS):
+        node.decompose()
+    total = _paragraph_score(soup)
+    for node in soup.find_all(True):
+        if node.decomposed or node.name in ("html", "body"):
+            continue
+        if _is_noise(node) and _paragraph_score(node) * 2 < total:
+            node.decompose()
+
+
+def _meta(soup, *names):
+    for name in names:
+        tag = soup.find("meta", attrs={"property": name}) or soup.find("meta", attrs={"name": name})
+        if tag and tag.get("content", "").strip():
+            return tag["content"].strip()
+    return ""
+
+
+def _find_title(soup):
+    title = _meta(soup, "og:title", "twitter:title")
+    if title:
+        return title
+    h1 = soup.find("h1")
+    if h1 and h1.get_text(strip=True):
+        return h1.get_text(" ", strip=True)
+    if soup.title and soup.title.string:
+        return soup.title.string.strip()
+    return ""
+
+
+def _find_byline(soup):
+    byline = _meta(soup, "author", "article:author")
+    if byline and not byline.startswith("http"):
+        return byline
+    for selector in BYLINE_SELECTORS:
+        node = soup.select_one(selector)
+        if node:
+            text = node.get_text(" ", strip=True)
+            if text and len(text) < 120:
+                return text
+    return ""
+
+
+def _find_content(soup):
+    """
+    Kontener treści: element z największą ilością tekstu w bezpośrednio
+    zawartych akapitach, rozszerzony do obejmującego go <article> lub
+    [itemprop=articleBody] (aby zachować ilustracje i śródtytuły spoza
+    bloku akapitów).
+    """
+    scores = {}
+    for paragraph in soup.find_all("p"):
+        parent = paragraph.parent
+        node, score = scores.get(id(parent), (parent, 0))
+        scores[id(parent)] = (node, score + _text_length(paragraph))
+    if not scores:
+        return None
+    best = max(scores.values(), key=lambda item: item[1])[0]
+    for node in [best, *best.parents]:
+        if node.name == "article" or node.get("itemprop") == "articleBody":
+            return node
+    return best
+
+
+def _image_src(img, base_url):
+    src = img.get("src") or ""
+    if not src or src.startswith("data:"):
+        src = next((img[attr] for attr in LAZY_SRC_ATTRS if img.get(attr)), "")
+    if not src or src.startswith("data:"):
+        return ""
+    src = urllib.parse.urljoin(base_url, src)
+    return src if urllib.parse.urlparse(src).scheme in RESOURCE_SCHEMES else ""
+
+
+def _clean(content, base_url):
+    """Pozostawienie w treści tylko znaczników czytelnego tekstu i ilustracji."""
+    images = []
+    for node in content.find_all(True):
+        if node.decomposed:
+            continue
+        if node.name == "img":
+            src = _image_src(node, base_url)
+            if not src:
+                node.decompose()
+                continue
+            node["src"] = src
+            images.append(src)
+        elif node.name == "a" and node.get("href"):
+            node["href"] = urllib.parse.urljoin(base_url, node["href"])
+        elif node.name == "h1":
+            node.name = "h2"
+        if node.name not in KEEP_TAGS:
+            node.unwrap()
+            continue
+        keep = KEEP_ATTRS.get(node.name, ())
+        node.attrs = {name: value for name, value in node.attrs.items() if name in keep}
+
+    # Puste akapity i listy po usunięciu szumu
+    for node in content.find_all(["p", "li", "figure", "blockquote"]):
+        if not node.get_text(strip=True) and not node.find("img"):
+            node.decompose()
+    return images
+
+
+def extract_article(page_html, base_url):
+    """
+    Wybór treści artykułu ze strony. Zwraca ReaderArticle albo None, gdy na
+    stronie nie ma wystarczająco dużo tekstu (np. galeria lub strona
+    z paywallem) - wtedy właściwy jest wydruk całej strony.
+    """
+    soup = BeautifulSoup(page_html, "html.parser")
+    title = _find_title(soup)
+    byline = _find_byline(soup)
+
+    _remove_noise(soup)
+    content = _find_content(soup)
+    if content is None or _paragraph_score(content) < settings.READER_MIN_TEXT_LENGTH:
+        return None
+
+    # Tytuł i autor są w nagłówku dokumentu - bez powtórzeń w treści
+    for heading in content.find_all("h1"):
+        if heading.get_text(" ", strip=True) == title:
+            heading.decompose()
+    if byline:
+        for node in content.select(", ".join(BYLINE_SELECTORS)):
+            if not node.decomposed and node.get_text(" ", strip=True) == byline:
+                node.decompose()
+
+    images = _clean(content, base_url)
+    body = content.decode_contents().strip()
+    return ReaderArticle(title, byline, body, images, base_url)
+
+
+def reader_html(article):
+    """Samodzielny dokument HTML z treścią artykułu."""
+    parts = [
+        "<!DOCTYPE html>",
+        '<html><head><meta charset="utf-8">',
+        f"<title>{html.escape(article.title)}</title>",
+        f"<style>{READER_CSS}</style>",
+        "</head><body>",
+        f"<h1>{html.escape(article.title)}</h1>",
+    ]
+    if article.byline:
+        parts.append(f'<p class="byline">{html.escape(article.byline)}</p>')
+    if article.url:
+        parts.append(f'<p class="source">{html.escape(article.url)}</p>')
+    parts.append(article.body)
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+
+def is_public_url(url):
+    """
+    Czy adres http(s) wskazuje na host publiczny - nie na adres prywatny,
+    pętli zwrotnej ani usługę sieci wewnętrznej (redis, db, selenium).
+    """
+    parsed = urllib.parse.urlparse(url)
+    if parsed.scheme not in RESOURCE_SCHEMES or not parsed.hostname:
+        return False
+    try:
+        addresses = socket.getaddrinfo(parsed.hostname, parsed.port or 443, proto=socket.IPPROTO_TCP)
+    except (OSError, ValueError):
+        return False
+    return all(ipaddress.ip_address(info[4][0].split("%")[0]).is_global for info in addresses)
+
+
+def resource_fetcher(site):
+    """
+    url_fetcher dla weasyprint: ilustracje artykułu pobierane przez wspólną
+    sesję HTTP z limitem tempa. Adresy spoza publicznego internetu (także po
+    przekierowaniu) i zasoby z profilu blokowania serwisu są odrzucane.
+    """
+    blocked = blocking.blocked_urls(site)
+
+    def fetch_resource(url, timeout=10, **kwargs):
+        for _ in range(RESOURCE_MAX_REDIRECTS + 1):
+            if not is_public_url(url):
+                raise ValueError(f"Resource not allowed: {url}")
+            if any(fnmatch.fnmatchcase(url, pattern) for pattern in blocked):
+                raise ValueError(f"Resource blocked: {url}")
+            ratelimit.acquire(url)
+            resp = downloader.get_session().get(url, timeout=timeout, allow_redirects=False)
+            if resp.is_redirect:
+                url = urllib.parse.urljoin(url, resp.headers["Location"])
+                continue
+            resp.raise_for_status()
+            return {
+                "string": resp.content,
+                "mime_type": resp.headers.get("Content-Type", "").split(";")[0].strip() or None,
+                "redirected_url": url,
+            }
+        raise ValueError(f"Too many redirects: {url}")
+
+    return fetch_resource
+
+
+def render_pdf(article):
+    """PDF z treści artykułu (weasyprint); zwraca bajty dokumentu."""
+    from weasyprint import HTML
+
+    site = urllib.parse.urlparse(article.url or "").hostname or ""
+    return HTML(
+        string=reader_html(article), base_url=article.url, url_fetcher=resource_fetcher(site)
+    ).write_pdf()
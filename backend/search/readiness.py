@@ -0,0 +1,207 @@
+"""
+Moduł oczekiwania na gotowość strony.
+Zastępuje stałe opóźnienia (time.sleep) warunkami sprawdzanymi cyklicznie:
+każde oczekiwanie kończy się, gdy tylko warunek jest spełniony, i nigdy nie
+trwa dłużej niż jego limit czasu.
+"""
+
+import json
+import time
+import logging
+
+from django.conf import settings
+from selenium.common.exceptions import (
+    JavascriptException,
+    StaleElementReferenceException,
+    TimeoutException,
+    WebDriverException,
+)
+from selenium.webdriver.support.ui import WebDriverWait
+
+# Konfiguracja loggera dla tego modułu
+logger = logging.getLogger(__name__)
+
+# Częstotliwość sprawdzania warunków w sekundach
+POLL_INTERVAL = 0.2
+
+# Selektory kontenerów z wynikami wyszukiwania używane przez warunek results_present
+RESULT_CONTAINER_SELECTORS = [
+    ".gsc-results",
+    ".gsc-webResult",
+    ".search-results",
+    ".search-result",
+    "[class*='result'] a",
+    "article a",
+    "main h2 a",
+    "main h3 a",
+]
+
+# Rejestr fabryk warunków: nazwa -> callable(**params) zwracający warunek(driver) -> bool
+CONDITIONS = {}
+
+
+def register_condition(name):
+    """Dekorator rejestrujący fabrykę warunku pod podaną nazwą."""
+    def decorator(factory):
+        CONDITIONS[name] = factory
+        return factory
+    return decorator
+
+
+@register_condition("dom_ready")
+def dom_ready(states=("interactive", "complete")):
+    """Warunek: document.readyState osiągnął jeden z podanych stanów."""
+    def condition(driver):
+        return driver.execute_script("return document.readyState") in states
+    return condition
+
+
+@register_condition("element_present")
+def element_present(selectors):
+    """Warunek: w DOM istnieje element pasujący do któregokolwiek z selektorów CSS."""
+    if isinstance(selectors, str):
+        selectors = [selectors]
+
+    def condition(driver):
+        return driver.execute_script(
+            "return arguments[0].some(function (s) {"
+            "  try { return !!document.querySelector(s); } catch (e) { return false; }"
+            "});",
+            list(selectors),
+        )
+    return condition
+
+
+@register_condition("results_present")
+def results_present(selectors=None):
+    """Warunek: na stronie wyszukiwania pojawił się kontener z wynikami."""
+    return element_present(selectors or RESULT_CONTAINER_SELECTORS)
+
+
+@register_condition("element_gone")
+def element_gone(element):
+    """Warunek: element (np. baner zgody na cookies) zniknął lub został odłączony od DOM."""
+    def condition(driver):
+        try:
+            return not element.is_displayed()
+        except WebDriverException:
+            return True
+    return condition
+
+
+class NetworkIdle:
+    """
+    Warunek bezczynności sieci.
+    Śledzi żądania w toku na podstawie zdarzeń Network.* z logu wydajności
+    Chrome (CDP); gdy log jest niedostępny, porównuje liczbę wpisów Resource Timing.
+    """
+
+    def __init__(self, idle_time=0.5, max_inflight=0):
+        self.idle_time = idle_time
+        self.max_inflight = max_inflight
+        self.inflight = set()
+        self.last_activity = time.monotonic()
+        self.use_log = True
+        self.resource_count = None
+
+    def _read_log(self, driver):
+        for entry in driver.get_log("performance"):
+            message = json.loads(entry["message"])["message"]
+            method = message.get("method")
+            request_id = message.get("params", {}).get("requestId")
+            if method == "Network.requestWillBeSent":
+                self.inflight.add(request_id)
+            elif method in ("Network.loadingFinished", "Network.loadingFailed"):
+                self.inflight.discard(request_id)
+            else:
+                continue
+            self.last_activity = time.monotonic()
+
+    def _read_resource_timing(self, driver):
+        count = driver.execute_script("return performance.getEntriesByType('resource').length")
+        if count != self.resource_count:
+            self.resource_count = count
+            self.last_activity = time.monotonic()
+
+    def __call__(self, driver):
+        if self.use_log:
+            try:
+                self._read_log(driver)
+            except Exception:
+                self.use_log = False
+        if not self.use_log:
+            self._read_resource_timing(driver)
+
+        if len(self.inflight) > self.max_inflight:
+            return False
+        return time.monotonic() - self.last_activity >= self.idle_time
+
+
+register_condition("network_idle")(NetworkIdle)
+
+
+# Domyślne etapy oczekiwania: lista kroków (warunek, parametry, limit czasu w sekundach).
+# Kroki są wykonywane po kolei, każdy z osobnym limitem czasu.
+DEFAULT_READINESS = {
+    "search": [
+        ("dom_ready", {}, 10),
+        ("results_present", {}, 6),
+        ("network_idle", {"idle_time": 0.5, "max_inflight": 2}, 2),
+    ],
+    "article": [
+        ("dom_ready", {}, 10),
+        ("network_idle", {"idle_time": 0.5, "max_inflight": 2}, 2),
+    ],
+}
+
+# Nadpisania dla poszczególnych stron (klucz dopasowywany jak w search/sites.py)
+SITE_READINESS = {
+    # Wyniki onet.pl ładowane są przez Google Custom Search już po zdarzeniu load
+    "onet.pl": {
+        "search": [
+            ("dom_ready", {}, 10),
+            ("results_present", {"selectors": [".gsc-results", ".gsc-webResult", ".gs-title"]}, 8),
+        ],
+    },
+}
+
+
+def get_readiness_steps(site, stage):
+    """Zwraca kroki oczekiwania dla strony i etapu (ustawienia > nadpisania strony > domyślne)."""
+    site_lower = (site or "").lower().replace('www.', '')
+    overrides = dict(getattr(settings, "SEARCH_READINESS", {}))
+    for known_site, stages in SITE_READINESS.items():
+        overrides.setdefault(known_site, stages)
+
+    for known_site, stages in overrides.items():
+        if known_site in site_lower and stage in stages:
+            return stages[stage]
+    return DEFAULT_READINESS.get(stage, [])
+
+
+def wait_for(driver, condition, timeout, poll=POLL_INTERVAL):
+    """Oczekiwanie na warunek; zwraca True, gdy został spełniony przed upływem limitu."""
+    try:
+        WebDriverWait(
+            driver, timeout, poll_frequency=poll,
+            ignored_exceptions=(JavascriptException, StaleElementReferenceException),
+        ).until(condition)
+        return True
+    except TimeoutException:
+        return False
+
+
+def wait_until_ready(driver, site, stage):
+    """
+    Oczekiwanie na gotowość strony na danym etapie ("search", "article").
+    Zwraca True, jeśli wszystkie kroki zostały spełnione w swoich limitach czasu.
+    """
+    ready = True
+    started = time.monotonic()
+    for name, params, timeout in get_readiness_steps(site, stage):
+        condition = CONDITIONS[name](**params)
+        if not wait_for(driver, condition, timeout):
+            logger.debug("Readiness step %s timed out after %ss (%s)", name, timeout, stage)
+            ready = False
+    logger.debug("Page ready for %s in %.2fs", stage, time.monotonic() - started)
+    return ready
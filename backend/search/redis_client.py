@@ -0,0 +1,26 @@
+"""
+Moduł współdzielonego klienta Redis.
+Redis pełni już rolę brokera Celery; aplikacja używa go też do blokad,
+liczników metryk i publikowania zdarzeń.
+"""
+
+import threading
+
+import redis
+from django.conf import settings
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_redis():
+    """Klient Redis procesu (pula połączeń jest współdzielona między wątkami)."""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = redis.Redis.from_url(
+                settings.REDIS_URL,
+                socket_connect_timeout=2,
+                socket_timeout=5,
+            )
+        return _client
@@ -0,0 +1,71 @@
+"""
+Moduł pamięci podręcznej wyrenderowanych artykułów.
+Kluczem jest kanoniczny adres URL artykułu razem z efektywnym trybem
+generowania PDF (search/reader.py), wartością skrót SHA-256 pliku
+w magazynie artefaktów. Trafienie pozwala dołączyć istniejący plik do nowego
+wyniku wyszukiwania bez otwierania przeglądarki.
+"""
+
+import os
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+
+from . import metrics, storage
+from .canonical import canonicalize_url
+from .models import Artifact
+
+# Konfiguracja loggera dla tego modułu
+logger = logging.getLogger(__name__)
+
+
+def cache_key(url, mode):
+    """Klucz pamięci podręcznej dla adresu artykułu wyrenderowanego w trybie mode."""
+    canonical = canonicalize_url(url)
+    return f"render:{mode}:" + hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+def lookup(url, mode):
+    """
+    Zwraca Artifact zapisany wcześniej dla artykułu w trybie mode albo None.
+    Wpis wskazujący na nieistniejący plik jest usuwany i liczony jako chybienie.
+    """
+    key = cache_key(url, mode)
+    try:
+        sha256 = cache.get(key)
+    except Exception as exc:
+        logger.warning("Render cache unavailable: %s", exc)
+        sha256 = None
+
+    artifact = None
+    if sha256:
+        artifact = Artifact.objects.filter(sha256=sha256).first()
+        if artifact is None or not os.path.exists(storage.blob_path(artifact.sha256, artifact.ext)):
+            _delete(key)
+            artifact = None
+
+    if artifact is None:
+        metrics.incr("render_cache_misses_total")
+        return None
+
+    storage.touch(artifact.id)
+    metrics.incr("render_cache_hits_total")
+    logger.info("Render cache hit for %s -> %s", url, artifact.name)
+    return artifact
+
+
+def store(url, artifact, mode):
+    """Zapamiętanie pliku wyrenderowanego dla artykułu w trybie mode na RENDER_CACHE_TTL sekund."""
+    try:
+        cache.set(cache_key(url, mode), artifact.sha256, timeout=settings.RENDER_CACHE_TTL)
+    except Exception as exc:
+        logger.warning("Render cache unavailable: %s", exc)
+
+
+def _delete(key):
+    try:
+        cache.delete(key)
+    except Exception as exc:
+        logger.warning("Render cache unavailable: %s", exc)
@@ -0,0 +1,126 @@
+"""
+Moduł globalnego indeksu widzianych adresów artykułów.
+Każdy zapisany artykuł trafia do tabeli SeenUrl (unikalny indeks na skrócie
+postaci kanonicznej adresu) oraz do filtra Blooma w Redis (bitmapa
+SETBIT/GETBIT). Sprawdzenie, czy adres był już widziany, to kilka odczytów
+bitów w jednym potoku Redis; do bazy trafiają tylko adresy, które filtr
+uznał za możliwie widziane (filtr nie daje fałszywie ujemnych odpowiedzi).
+Gdy Redis jest niedostępny, sprawdzenie odbywa się wyłącznie w bazie.
+"""
+
+import logging
+
+from django.conf import settings
+from django.utils import timezone
+from redis.exceptions import RedisError
+
+from .canonical import canonicalize_url, url_hash
+from .models import SeenUrl
+from .redis_client import get_redis
+
+# Konfiguracja loggera dla tego modułu
+logger = logging.getLogger(__name__)
+
+# Bitmapa filtra Blooma
+BLOOM_KEY = "seen-urls:bloom"
+# Znacznik kompletnego filtra (brak = filtr trzeba odbudować z bazy)
+READY_KEY = "seen-urls:bloom-ready"
+# Blokada odbudowy filtra
+REBUILD_LOCK_KEY = "seen-urls:bloom-rebuild"
+# Liczba skrótów zapisywanych w jednym potoku przy odbudowie
+REBUILD_BATCH = 5000
+
+
+def bit_positions(digest):
+    """Pozycje bitów adresu w filtrze (podwójne haszowanie skrótu SHA-1)."""
+    value = int(digest, 16)
+    h1 = value & 0xFFFFFFFFFFFFFFFF
+    h2 = (value >> 64) | 1
+    size = settings.SEEN_BLOOM_BITS
+    return [(h1 + i * h2) % size for i in range(settings.SEEN_BLOOM_HASHES)]
+
+
+def rebuild_bloom(client=None):
+    """
+    Odbudowa filtra z tabeli SeenUrl (np. po utracie danych Redis).
+    Zwraca False, gdy odbudowę wykonuje już inny proces.
+    """
+    client = client or get_redis()
+    if not client.set(REBUILD_LOCK_KEY, 1, nx=True, ex=600):
+        return False
+    try:
+        pipe = client.pipeline(transaction=False)
+        hashes = SeenUrl.objects.values_list("url_hash", flat=True).iterator(chunk_size=REBUILD_BATCH)
+        for count, digest in enumerate(hashes, start=1):
+            for position in bit_positions(digest):
+                pipe.setbit(BLOOM_KEY, position, 1)
+            if count % REBUILD_BATCH == 0:
+                pipe.execute()
+        pipe.set(READY_KEY, 1)
+        pipe.execute()
+        logger.info("Rebuilt seen-URL Bloom filter")
+        return True
+    finally:
+        client.delete(REBUILD_LOCK_KEY)
+
+
+def _bloom_candidates(client, digests):
+    """Skróty, które filtr uznaje za możliwie widziane, albo None (filtr niegotowy)."""
+    if not client.exists(READY_KEY) and not rebuild_bloom(client):
+        return None
+    hashes = settings.SEEN_BLOOM_HASHES
+    pipe = client.pipeline(transaction=False)
+    for digest in digests:
+        for position in bit_positions(digest):
+            pipe.getbit(BLOOM_KEY, position)
+    bits = pipe.execute()
+    return {
+        digest for index, digest in enumerate(digests)
+        if all(bits[index * hashes:(index + 1) * hashes])
+    }
+
+
+def unseen(urls):
+    """Adresy spośród urls, których nie ma w indeksie (kolejność zachowana)."""
+    digests = {url: url_hash(url) for url in urls}
+    candidates = list(set(digests.values()))
+    if not candidates:
+        return []
+
+    try:
+        maybe_seen = _bloom_candidates(get_redis(), candidates)
+        if maybe_seen is not None:
+            candidates = list(maybe_seen)
+    except RedisError as exc:
+        logger.warning("Seen-URL Bloom filter unavailable: %s", exc)
+
+    known = set()
+    if candidates:
+        known = set(SeenUrl.objects.filter(url_hash__in=candidates).values_list("url_hash", flat=True))
+    return [url for url in urls if digests[url] not in known]
+
+
+def mark_seen(urls):
+    """Dodanie adresów do indeksu (w bazie i w filtrze); znane adresy dostają nowe last_seen_at."""
+    now = timezone.now()
+    rows = {}
+    for url in urls:
+        digest = url_hash(url)
+        rows[digest] = SeenUrl(
+            url_hash=digest, url=canonicalize_url(url)[:1000], first_seen_at=now, last_seen_at=now
+        )
+    if not rows:
+        return
+    SeenUrl.objects.bulk_create(
+        list(rows.values()), update_conflicts=True, unique_fields=["url_hash"],
+        update_fields=["last_seen_at"],
+    )
+
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for digest in rows:
+            for position in bit_positions(digest):
+                pipe.setbit(BLOOM_KEY, position, 1)
+        pipe.execute()
+    except RedisError as exc:
+        logger.warning("Could not update seen-URL Bloom filter: %s", exc)
@@ -7,10 +7,15 @@ wyszukiwania artykułów i zapisywania ich jako pliki PDF.
 # Importy standardowych bibliotek Pythona
 import os
 import re
-import time
 import base64
+import hashlib
+import itertools
 import urllib.parse
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from datetime import timedelta
 
 # Importy Selenium do automatyzacji przeglądarki
 from selenium import webdriver
@@ -23,6 +28,15 @@ from selenium.common.exceptions import TimeoutException, WebDriverException
 # Importy do obsługi żądań HTTP i konfiguracji Django
 import requests
 from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+from . import blocking, downloader, ratelimit, reader, render_cache, seen, sites, storage, timing
+from .canonical import url_hash
+from .extraction import extract_links, extract_links_from_html, find_pdf_link
+from .models import SiteProfile
+from .readiness import element_gone, wait_for, wait_until_ready
+from .sites import site_domain
 
 # Konfiguracja loggera dla tego modułu
 logger = logging.getLogger(__name__)
@@ -30,16 +44,15 @@ logger = logging.getLogger(__name__)
 # URL serwera Selenium (zdalny WebDriver)
 SELENIUM_URL = os.environ.get("SELENIUM_URL", "http://selenium:4444/wd/hub")
 
-# Ustawienie katalogu głównego dla mediów
-try:
-    MEDIA_ROOT = getattr(settings, 'MEDIA_ROOT', str(settings.BASE_DIR / "media"))
-except Exception:
-    MEDIA_ROOT = os.environ.get("MEDIA_ROOT", "/app/media")
-
-# Katalog do przechowywania pobranych artykułów
-ARTICLES_DIR = os.path.join(MEDIA_ROOT, "articles")
-os.makedirs(ARTICLES_DIR, exist_ok=True)
-
+# Parametry wydruku strony przez CDP Page.printToPDF
+PRINT_OPTIONS = {
+    'format': 'A4',
+    'printBackground': True,
+    'marginTop': 0.4,
+    'marginBottom': 0.4,
+    'marginLeft': 0.4,
+    'marginRight': 0.4,
+}
 
 def sanitize_filename(name):
     safe = "".join(c for c in name if c.isalnum() or c in " .-_()")
@@ -47,96 +60,180 @@ def sanitize_filename(name):
     return safe[:200]
 
 
-def download_pdf(url, filename=None, timeout=30):
+@timing.span("download")
+def download_pdf(url, timeout=30):
+    """Pobranie pliku PDF do magazynu artefaktów; zwraca Artifact lub None."""
+    dest = storage.temp_path(".pdf")
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        resp = requests.get(url, stream=True, timeout=timeout, headers=headers)
-        resp.raise_for_status()
-        
-        if not filename:
-            parsed = urllib.parse.urlparse(url)
-            filename = os.path.basename(parsed.path) or f"article_{int(time.time())}.pdf"
-        
-        filename = sanitize_filename(filename)
-        if not filename.endswith('.pdf'):
-            filename += '.pdf'
-            
-        dest = os.path.join(ARTICLES_DIR, filename)
-        with open(dest, "wb") as f:
-            for chunk in resp.iter_content(8192):
-                if chunk:
-                    f.write(chunk)
-        return filename
-    except Exception as exc:
-        logger.exception("Failed to download PDF from %s", url)
+        if downloader.download(url, dest, timeout=timeout):
+            return storage.put_file(dest, "pdf")
         return None
+    finally:
+        if os.path.exists(dest):
+            os.remove(dest)
 
 
-def save_page_as_pdf(driver, title, url=None):
-    """Generowanie PDF z bieżącej strony za pomocą print_page() lub zapisanie HTML."""
+def print_page_to_file(driver, dest, chunk_size=None):
+    """
+    Wydruk bieżącej strony do pliku dest przez CDP Page.printToPDF w trybie
+    strumieniowym (transferMode ReturnAsStream). Dokument jest odczytywany
+    fragmentami IO.read i dekodowany na bieżąco, więc w pamięci jest naraz
+    tylko jeden fragment, niezależnie od rozmiaru PDF. Zwraca skrót SHA-256.
+    """
+    chunk_size = chunk_size or settings.PRINT_CHUNK_SIZE
+    result = execute_cdp(driver, 'Page.printToPDF', dict(PRINT_OPTIONS, transferMode='ReturnAsStream'))
+    handle = result['stream']
+    digest = hashlib.sha256()
     try:
-        title_safe = sanitize_filename(title or "article")
-        filename = f"{title_safe}_{int(time.time())}.pdf"
-        dest = os.path.join(ARTICLES_DIR, filename)
-        
+        with open(dest, "wb") as fh:
+            while True:
+                chunk = execute_cdp(driver, 'IO.read', {'handle': handle, 'size': chunk_size})
+                data = chunk.get('data', '')
+                data = base64.b64decode(data) if chunk.get('base64Encoded') else data.encode("utf-8")
+                fh.write(data)
+                digest.update(data)
+                if chunk.get('eof'):
+                    break
+    finally:
         try:
-            pdf_data = driver.execute_cdp_cmd('Page.printToPDF', {
-                'format': 'A4',
-                'printBackground': True,
-                'marginTop': 0.4,
-                'marginBottom': 0.4,
-                'marginLeft': 0.4,
-                'marginRight': 0.4,
-            })
-            pdf_content = base64.b64decode(pdf_data['data'])
-            with open(dest, "wb") as f:
-                f.write(pdf_content)
-            logger.info("Generated PDF using CDP: %s", filename)
-            return filename
+            execute_cdp(driver, 'IO.close', {'handle': handle})
+        except Exception:
+            logger.debug("Could not close PDF stream %s", handle)
+    return digest.hexdigest()
+
+
+def print_page_to_storage(driver):
+    """Wydruk bieżącej strony (print_page_to_file) do magazynu artefaktów."""
+    path = storage.temp_path(".pdf")
+    try:
+        sha256 = print_page_to_file(driver, path)
+        return storage.put_file(path, "pdf", sha256)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def save_reader_pdf(driver, url=None):
+    """
+    Zapisanie samej treści artykułu (tryb czytania, search/reader.py) jako
+    PDF. Zwraca Artifact albo None, gdy treści nie udało się wyodrębnić.
+    """
+    try:
+        article = reader.extract_article(driver.page_source, url or driver.current_url)
+        if article is None:
+            logger.info("No readable content found, printing full page")
+            return None
+        artifact = storage.put_bytes(reader.render_pdf(article), "pdf")
+        logger.info("Generated reader PDF: %s", artifact.name)
+        return artifact
+    except ImportError:
+        logger.warning("weasyprint not available, printing full page")
+    except Exception as e:
+        logger.warning("Reader PDF failed: %s, printing full page", str(e))
+    return None
+
+
+@timing.span("print")
+def save_page_as_pdf(driver, title, url=None, mode=reader.FULL):
+    """
+    Generowanie PDF z bieżącej strony za pomocą print_page() lub zapisanie HTML.
+    W trybie reader.READER najpierw zapisywana jest sama treść artykułu;
+    wydruk całej strony jest wtedy tylko zapasowym wariantem.
+    Wynik trafia do magazynu artefaktów; zwraca Artifact lub None.
+    """
+    if mode == reader.READER:
+        artifact = save_reader_pdf(driver, url)
+        if artifact:
+            return artifact
+
+    try:
+        try:
+            artifact = print_page_to_storage(driver)
+            logger.info("Generated PDF using CDP: %s", artifact.name)
+            return artifact
         except Exception as e:
             logger.warning("CDP printToPDF failed: %s, trying print_page", str(e))
         
         try:
             pdf_base64 = driver.print_page()
-            pdf_content = base64.b64decode(pdf_base64)
-            with open(dest, "wb") as f:
-                f.write(pdf_content)
-            logger.info("Generated PDF using print_page: %s", filename)
-            return filename
+            artifact = storage.put_bytes(base64.b64decode(pdf_base64), "pdf")
+            logger.info("Generated PDF using print_page: %s", artifact.name)
+            return artifact
         except Exception as e:
             logger.warning("print_page failed: %s, saving as HTML", str(e))
         
+        page_source = driver.page_source
+        
         try:
             from weasyprint import HTML
-            html_doc = HTML(string=page_source)
-            html_doc.write_pdf(dest)
-            logger.info("Generated PDF using weasyprint: %s", filename)
-            return filename
+            html_doc = HTML(string=page_source, base_url=url)
+            artifact = storage.put_bytes(html_doc.write_pdf(), "pdf")
+            logger.info("Generated PDF using weasyprint: %s", artifact.name)
+            return artifact
         except ImportError:
             logger.warning("weasyprint not available")
         except Exception as e:
             logger.warning("weasyprint failed: %s", str(e))
         
-        html_filename = f"{title_safe}_{int(time.time())}.html"
-        html_dest = os.path.join(ARTICLES_DIR, html_filename)
-        
-        page_source = driver.page_source
-        with open(html_dest, "w", encoding="utf-8") as f:
-            f.write(page_source)
+        artifact = storage.put_bytes(page_source.encode("utf-8"), "html")
         
-        logger.info("Saved HTML: %s (PDF generation failed)", html_filename)
+        logger.info("Saved HTML: %s (PDF generation failed)", artifact.name)
         
-        return html_filename
+        return artifact
         
     except Exception as exc:
         logger.exception("Failed to save page: %s", str(exc))
         return None
 
 
-def handle_cookie_consent(driver):
-    """Próba zaakceptowania wyskakujących okienek zgody na pliki cookie."""
+def build_chrome_options():
+    """Opcje Chrome wspólne dla wszystkich sesji (także tych z puli)."""
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36")
+    # Log wydajności dostarcza zdarzenia CDP Network.* dla warunku network_idle
+    options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+    return options
+
+
+def create_driver():
+    """Utworzenie nowej sesji zdalnego WebDrivera na serwerze Selenium."""
+    return webdriver.Remote(command_executor=SELENIUM_URL, options=build_chrome_options())
+
+
+def execute_cdp(driver, cmd, params=None):
+    """Wykonanie polecenia Chrome DevTools Protocol, także przez zdalny WebDriver."""
+    if hasattr(driver, "execute_cdp_cmd"):
+        return driver.execute_cdp_cmd(cmd, params or {})
+    # webdriver.Remote nie rejestruje endpointu CDP udostępnianego przez chromedrivera
+    driver.command_executor._commands.setdefault(
+        "executeCdpCommand", ("POST", "/session/$sessionId/goog/cdp/execute")
+    )
+    return driver.execute("executeCdpCommand", {"cmd": cmd, "params": params or {}})["value"]
+
+
+@timing.span("consent")
+def handle_cookie_consent(driver, timeout=2, selector=""):
+    """
+    Próba zaakceptowania wyskakujących okienek zgody na pliki cookie.
+    Selektor z adaptera serwisu jest sprawdzany przed ogólnymi wzorcami.
+    Po kliknięciu czeka (najwyżej timeout sekund), aż przycisk zniknie.
+    """
+    if selector:
+        try:
+            for elem in driver.find_elements(By.CSS_SELECTOR, selector):
+                if elem.is_displayed():
+                    elem.click()
+                    logger.info("Clicked consent button: %s", selector)
+                    wait_for(driver, element_gone(elem), timeout)
+                    return True
+        except Exception:
+            logger.debug("Site consent selector failed: %s", selector)
+    
     consent_xpaths = [
         "//button[contains(text(), 'Akceptuję')]",
         "//button[contains(text(), 'AKCEPTUJĘ')]",
@@ -158,7 +255,7 @@ def handle_cookie_consent(driver):
                 if elem.is_displayed():
                     elem.click()
                     logger.info("Clicked consent button: %s", xpath)
-                    time.sleep(1)
+                    wait_for(driver, element_gone(elem), timeout)
                     return True
         except Exception:
             continue
@@ -172,7 +269,7 @@ def handle_cookie_consent(driver):
                     if btn.is_displayed():
                         btn.click()
                         logger.info("Clicked button: %s", btn.text)
-                        time.sleep(1)
+                        wait_for(driver, element_gone(btn), timeout)
                         return True
             except Exception:
                 continue
@@ -182,229 +279,684 @@ def handle_cookie_consent(driver):
     return False
 
 
+# Fragmenty adresów, które nie prowadzą do artykułów (wyszukiwarka, tagi, konta, reklamy)
+EXCLUDED_URL_PATTERNS = [
+    '/szukaj', '/search', '/wyszukiwanie',
+    '/tag/', '/kategoria/', '/category/',
+    '/autor/', '/author/',
+    '/login', '/register', '/rejestracja',
+    '/kontakt', '/contact',
+    '/regulamin', '/polityka',
+    '/reklama', '/newsletter', '/rss',
+    'javascript:', '#',
+    '/cdn-cgi/',
+    'google.com',
+    'doubleclick',
+]
+
+# Wszystkie wzorce w jednym wyrażeniu (jedno przejście po adresie zamiast pętli)
+EXCLUDED_URL_RE = re.compile("|".join(re.escape(pattern) for pattern in EXCLUDED_URL_PATTERNS))
+
+
 def is_valid_article_url(url, site):
     """Sprawdzenie, czy URL jest prawidłowym artykułem z docelowej strony."""
     if not url:
         return False
     
-    site_lower = site.lower().replace('www.', '')
-    
     url_lower = url.lower()
     
-    if site_lower not in url_lower:
+    if site_domain(site) not in url_lower:
         return False
     
-    exclude_patterns = [
-        '/szukaj', '/search', '/wyszukiwanie',
-        '/tag/', '/kategoria/', '/category/',
-        '/autor/', '/author/',
-        '/login', '/register', '/rejestracja',
-        '/kontakt', '/contact',
-        '/regulamin', '/polityka',
-        '/reklama', '/newsletter', '/rss',
-        'javascript:', '#',
-        '/cdn-cgi/',
-        'google.com',
-        'doubleclick',
-    ]
+    return EXCLUDED_URL_RE.search(url_lower) is None
+
+
+# Ogólne selektory CSS odnośników do artykułów na stronach wyników wyszukiwania
+# (dla serwisów bez selektorów w adapterze i bez wyuczonych selektorów)
+RESULT_SELECTORS = [
+    ".gsc-result a.gs-title",
+    ".gsc-webResult a",
+    ".gs-title a",
+    ".gsc-thumbnail-inside a",
+    "article a",
+    "article h2 a",
+    "article h3 a",
+    ".search-results a",
+    ".search-result a",
+    "[class*='search'] article a",
+    "[class*='result'] a",
+    ".teaser a",
+    ".teaser__title a",
+    "[class*='teaser'] a",
+    "[class*='article'] h2 a",
+    "[class*='article'] h3 a",
+    "main article a",
+    "main h2 a",
+    "main h3 a",
+    ".content h2 a",
+    ".content h3 a",
+]
+
+# Teksty odnośników nawigacyjnych pomijanych przy skanowaniu wszystkich <a>
+NAV_WORDS = ['menu', 'serwisy', 'zaloguj', 'subskrybuj', 'newsletter',
+             'kontakt', 'regulamin', 'reklama', 'strona główna', 'więcej',
+             'opinie', 'home', 'login']
+
+
+# Skrypt zwracający tytuł strony i obecność elementu wyzwania (wykrywanie stron blokady)
+BLOCK_CHECK_SCRIPT = """
+return [document.title, !!document.querySelector(arguments[0])];
+"""
+
+
+def open_page(driver, url):
+    """Otwarcie strony w przeglądarce z zachowaniem limitu tempa dla domeny."""
+    ratelimit.acquire(url)
+    driver.get(url)
+
+
+def check_block_page(driver, url, query=""):
+    """
+    Zgłasza ratelimit.BlockedError, jeśli serwis wyświetlił stronę blokady
+    (captcha) - taka strona nie może zostać zapisana jako artykuł.
+    """
+    title, challenge = driver.execute_script(BLOCK_CHECK_SCRIPT, ", ".join(ratelimit.CHALLENGE_SELECTORS))
+    if ratelimit.is_block_page(title, challenge, query):
+        ratelimit.report_block(url)
+        raise ratelimit.BlockedError(f"Blocked page at {url}")
+
+
+def browser_result_pages(driver, query, site, adapter):
+    """
+    Generator kolejnych stron wyników wyszukiwania w przeglądarce. Każdy
+    element to funkcja extract(selectors) dla bieżącej strony; następna
+    strona jest otwierana dopiero, gdy konsument poprosi o kolejny element.
+    """
+    wait = WebDriverWait(driver, 20)
+    search_url = adapter.build_search_url(query)
+    
+    logger.info("Searching on site: %s", search_url)
+    
+    try:
+        with timing.span("search_page"):
+            open_page(driver, search_url)
+            wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+            wait_until_ready(driver, site, "search")
+            check_block_page(driver, search_url, query)
+        
+        handle_cookie_consent(driver, selector=adapter.consent_selector)
+        
+        if adapter.search_input_selector:
+            search_inputs = driver.find_elements(By.CSS_SELECTOR, adapter.search_input_selector)
+            for inp in search_inputs:
+                try:
+                    if inp.is_displayed():
+                        inp.clear()
+                        inp.send_keys(query)
+                        inp.send_keys(Keys.RETURN)
+                        logger.info("Entered query in search box")
+                        with timing.span("search_page"):
+                            wait_until_ready(driver, site, "search")
+                        break
+                except Exception:
+                    continue
+        
+    except TimeoutException:
+        logger.warning("Timeout loading search page")
+        return
+
+    def extract(selectors):
+        return extract_links(driver, selectors)
+
+    yield extract
     
-    for pattern in exclude_patterns:
-        if pattern in url_lower:
+    for page in range(2, settings.SEARCH_MAX_PAGES + 1):
+        try:
+            if not open_next_page(driver, query, site, adapter, page):
+                return
+        except TimeoutException:
+            logger.warning("Timeout loading search results page %d", page)
+            return
+        yield extract
+
+
+def open_next_page(driver, query, site, adapter, page):
+    """
+    Przejście do strony wyników o numerze page: według szablonu adresu
+    adaptera albo przez odnośnik następnej strony (przejście pod jego adres
+    lub kliknięcie, gdy stronicowanie działa w JavaScripcie). Zwraca False,
+    gdy następnej strony nie ma.
+    """
+    url = adapter.build_page_url(query, page)
+    if not url:
+        nodes = [
+            node for node in driver.find_elements(By.CSS_SELECTOR, adapter.next_page_selector)
+            if node.tag_name == "link" or node.is_displayed()
+        ]
+        if not nodes:
             return False
+        href = nodes[0].get_attribute("href")
+        if not href or href.startswith("javascript:") or href.endswith("#"):
+            # Stronicowanie w JavaScripcie podmienia wyniki bez nawigacji - strona
+            # jest gotowa, gdy odnośnik lub pierwszy wynik zniknie z dokumentu
+            results = driver.find_elements(
+                By.CSS_SELECTOR, ", ".join(adapter.result_selectors or RESULT_SELECTORS)
+            )
+            replaced = [EC.staleness_of(element) for element in [nodes[0], *results[:1]]]
+            nodes[0].click()
+            logger.info("Clicked next results page %d", page)
+            with timing.span("search_page"):
+                WebDriverWait(driver, 20).until(EC.any_of(*replaced))
+                wait_until_ready(driver, site, "search")
+            return True
+        url = href
     
+    logger.info("Opening results page %d: %s", page, url)
+    with timing.span("search_page"):
+        open_page(driver, url)
+        WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+        wait_until_ready(driver, site, "search")
+        check_block_page(driver, url, query)
     return True
 
 
-def get_site_search_url(site, query):
-    """Pobieranie URL wyszukiwania dla określonej strony."""
-    site_lower = site.lower().replace('www.', '')
+def iter_article_links(pages, site, adapter, only_new=False, crawled=None, fallback=True):
+    """
+    Strumień (tytuł, url) artykułów z kolejnych stron wyników. Strona, która
+    nie wnosi nowych linków, kończy przeglądanie; konsument, który ma już
+    dość linków, po prostu przestaje pobierać elementy, więc kolejne strony
+    nie są otwierane. Linki są porównywane w postaci kanonicznej; przy
+    only_new pomijane są artykuły z globalnego indeksu widzianych adresów
+    (search/seen.py). crawled zbiera skróty wszystkich znalezionych adresów.
+    fallback jak w select_article_links.
+    """
+    crawled = set() if crawled is None else crawled
+    for page, extract in enumerate(pages, start=1):
+        new_links = []
+        with timing.span("extract_links"):
+            selected = select_article_links(extract, site, None, adapter, fallback)
+        for text, href in selected:
+            digest = url_hash(href)
+            if digest not in crawled:
+                crawled.add(digest)
+                new_links.append((text, href))
+        if not new_links:
+            logger.info("Results page %d of %s added no new links, stopping", page, site)
+            return
+        if only_new:
+            fresh = set(seen.unseen([href for _, href in new_links]))
+            logger.info("Skipping %d already seen links on page %d", len(new_links) - len(fresh), page)
+            new_links = [(text, href) for text, href in new_links if href in fresh]
+        yield from new_links
+
+
+def collect_article_links(driver, query, site, max_results=10, adapter=None, only_new=False,
+                          crawled=None):
+    """
+    Otwiera stronę wyszukiwania serwisu i zwraca listę (tytuł, url) artykułów
+    (co najwyżej max_results, w razie potrzeby z kolejnych stron wyników).
+    """
+    adapter = adapter or sites.get_adapter(site)
+    pages = browser_result_pages(driver, query, site, adapter)
+    links = list(itertools.islice(
+        iter_article_links(pages, site, adapter, only_new, crawled), max_results
+    ))
+    logger.info("Collected %d article links from %s", len(links), site)
+    return links
+
+
+def result_links(extracted, site):
+    """Widoczne odnośniki do artykułów serwisu z opisowym tekstem."""
+    return [
+        link for link in extracted
+        if link.href and is_valid_article_url(link.href, site)
+        and link.visible and link.text and len(link.text) > 15
+    ]
+
+
+def learned_result_links(extract, site):
+    """
+    Odnośniki z selektorów wyuczonych dla serwisu, a gdy nie dały wyników -
+    z ogólnej listy RESULT_SELECTORS. Selektory, które dały prawidłowe
+    linki, są zapisywane (sites.record_selector_results).
+    """
+    learned = sites.learned_selectors(site)
+    if learned:
+        links = result_links(extract(learned), site)
+        productive = {link.selector for link in links}
+        sites.record_selector_results(site, productive, set(learned) - productive)
+        if links:
+            return links
+        logger.info("Learned selectors found nothing on %s, trying all selectors", site)
+    
+    links = result_links(extract([s for s in RESULT_SELECTORS if s not in learned]), site)
+    sites.record_selector_results(site, {link.selector for link in links})
+    return links
+
+
+def select_article_links(extract, site, max_results=10, adapter=None, fallback=True):
+    """
+    Wybór linków do artykułów spośród elementów zwróconych przez extract(selectors).
+    Kolejno: selektory adaptera serwisu, selektory wyuczone lub ogólne, wszystkie <a>
+    (tylko przy fallback=True). Wspólne dla ścieżki Selenium i ścieżki HTTP;
+    zwraca listę (tytuł, url).
+    """
+    adapter = adapter or sites.get_adapter(site)
+    extracted = []
+    if adapter.result_selectors:
+        extracted = result_links(extract(list(adapter.result_selectors)), site)
+    if not extracted:
+        extracted = learned_result_links(extract, site)
     
-    search_urls = {
-        'rzeczpospolita.pl': f'https://www.rzeczpospolita.pl/szukaj?q={urllib.parse.quote_plus(query)}',
-        'rp.pl': f'https://www.rp.pl/szukaj?q={urllib.parse.quote_plus(query)}',
-        'wp.pl': f'https://szukaj.wp.pl/?q={urllib.parse.quote_plus(query)}',
-        'onet.pl': f'https://szukaj.onet.pl/?q={urllib.parse.quote_plus(query)}',
-        'gazeta.pl': f'https://szukaj.gazeta.pl/szukaj/0,0.html?q={urllib.parse.quote_plus(query)}',
-        'tvn24.pl': f'https://tvn24.pl/szukaj?query={urllib.parse.quote_plus(query)}',
-        'polsatnews.pl': f'https://www.polsatnews.pl/szukaj/?query={urllib.parse.quote_plus(query)}',
-        'interia.pl': f'https://www.interia.pl/szukaj?q={urllib.parse.quote_plus(query)}',
-    }
+    links = []
+    for link in extracted:
+        links.append((link.text, link.href))
+        logger.debug("Found link: %s -> %s", link.text[:50], link.href)
     
-    for known_site, url_template in search_urls.items():
-        if known_site in site_lower:
-            return url_template
+    if not links and fallback:
+        logger.info("No results with specific selectors, trying all links")
+        for link in extract(["a"]):
+            if link.href and is_valid_article_url(link.href, site):
+                text = link.text if link.visible else ""
+                if text and len(text) > 20:
+                    if not any(nav in text.lower() for nav in NAV_WORDS):
+                        links.append((text, link.href))
     
-    return f'https://www.{site}/szukaj?q={urllib.parse.quote_plus(query)}'
+    unique = set()
+    unique_links = []
+    for text, href in links:
+        digest = url_hash(href)
+        if digest not in unique:
+            unique.add(digest)
+            unique_links.append((text, href))
+    
+    links = unique_links[:max_results]
+    logger.info("Found %d article links to process", len(links))
+    return links
 
 
-def search_and_find_pdfs(query, site, max_results=10):
+def http_result_pages(query, site, adapter, timeout=15):
     """
-    Wyszukiwanie artykułów na określonej stronie za pomocą własnej wyszukiwarki.
-    Otwiera znalezione artykuły i zapisuje je jako pliki PDF.
+    Generator kolejnych stron wyników pobieranych zwykłym żądaniem HTTP
+    (bez przeglądarki); elementy jak w browser_result_pages.
     """
-    options = webdriver.ChromeOptions()
-    options.add_argument("--headless=new")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--window-size=1920,1080")
-    options.add_argument("--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36")
+    url = adapter.build_search_url(query)
+    
+    for page in range(1, settings.SEARCH_MAX_PAGES + 1):
+        logger.info("Searching over HTTP: %s", url)
+        try:
+            with timing.span("search_page"):
+                ratelimit.acquire(url)
+                resp = downloader.get_session().get(url, timeout=timeout)
+            if resp.status_code in ratelimit.BLOCK_STATUSES:
+                ratelimit.report_block(url, resp.headers.get("Retry-After"))
+            resp.raise_for_status()
+        except requests.RequestException as exc:
+            logger.info("HTTP search failed for %s: %s", site, str(exc))
+            return
+        
+        html, base_url = resp.text, resp.url
+        if ratelimit.is_block_html(html, query):
+            ratelimit.report_block(url)
+            logger.info("HTTP search blocked by %s", site)
+            return
+        yield lambda selectors, html=html, base_url=base_url: (
+            extract_links_from_html(html, base_url, selectors)
+        )
+        
+        url = adapter.build_page_url(query, page + 1)
+        if not url:
+            next_links = extract_links_from_html(html, base_url, [adapter.next_page_selector])
+            url = next((link.href for link in next_links if link.href), None)
+        if not url:
+            return
 
-    driver = None
-    found = []
+
+def collect_article_links_http(query, site, max_results=10, timeout=15, adapter=None, only_new=False,
+                               crawled=None, fallback=True):
+    """
+    Szybka ścieżka bez przeglądarki: pobranie stron wyszukiwania przez requests
+    i wybór linków z HTML renderowanego po stronie serwera.
+    """
+    adapter = adapter or sites.get_adapter(site)
+    pages = http_result_pages(query, site, adapter, timeout)
+    return list(itertools.islice(
+        iter_article_links(pages, site, adapter, only_new, crawled, fallback), max_results
+    ))
+
+
+def get_fetch_strategy(site, adapter=None):
+    """
+    Strategia pobierania wyników dla serwisu: "http", "selenium" albo "auto".
+    Strategia "selenium" wyuczona automatycznie jest ponownie sprawdzana po
+    SEARCH_STRATEGY_RECHECK_DAYS dniach; flaga js_only adaptera serwisu
+    blokuje ścieżkę HTTP na stałe.
+    """
+    profile = SiteProfile.objects.filter(domain=site_domain(site)).first()
+    adapter = adapter or sites.get_adapter(site, profile)
+    if adapter.js_only:
+        return SiteProfile.SELENIUM
+    if profile is None:
+        return SiteProfile.AUTO
+    if profile.fetch_strategy == SiteProfile.SELENIUM:
+        recheck_after = timedelta(days=settings.SEARCH_STRATEGY_RECHECK_DAYS)
+        if timezone.now() - profile.updated_at > recheck_after:
+            return SiteProfile.AUTO
+    return profile.fetch_strategy
+
+
+def record_fetch_strategy(site, strategy):
+    """Zapamiętanie strategii, która dała wyniki, dla kolejnych wyszukiwań."""
+    SiteProfile.objects.update_or_create(
+        domain=site_domain(site), defaults={"fetch_strategy": strategy}
+    )
+
+
+def find_article_links(query, site, max_results=10, open_driver=None, only_new=False, adapter=None):
+    """
+    Warstwa strategii pobierania: najpierw requests + BeautifulSoup, a Selenium
+    dopiero gdy statyczny HTML nie zawiera prawidłowych linków lub serwis
+    wymaga JavaScriptu. open_driver() zwraca menedżer kontekstu z WebDriverem
+    i jest wywoływane tylko wtedy, gdy przeglądarka jest potrzebna.
+    Przy only_new zwracane są tylko artykuły niewidziane we wcześniejszych wyszukiwaniach.
+    """
+    adapter = adapter or sites.get_adapter(site)
+    strategy = get_fetch_strategy(site, adapter)
+    
+    if strategy != SiteProfile.SELENIUM:
+        # Ścieżka HTTP działa, jeśli selektory wyników znalazły jakiekolwiek linki
+        # (także już widziane); odnośniki ze skanowania wszystkich <a> to zwykle
+        # nawigacja strony, której wyniki renderuje JavaScript
+        crawled = set()
+        links = collect_article_links_http(
+            query, site, max_results, adapter=adapter, only_new=only_new, crawled=crawled,
+            fallback=False,
+        )
+        if links or crawled:
+            if strategy != SiteProfile.HTTP:
+                record_fetch_strategy(site, SiteProfile.HTTP)
+            return links
+        if strategy == SiteProfile.HTTP:
+            # Wyuczona strategia przestała działać - ustalana jest od nowa
+            record_fetch_strategy(site, SiteProfile.AUTO)
+        logger.info("No links in static HTML for %s, escalating to Selenium", site)
     
+    crawled = set()
+    with (open_driver or _temporary_driver)() as driver:
+        links = collect_article_links(driver, query, site, max_results, adapter, only_new, crawled)
+    
+    if (links or crawled) and strategy != SiteProfile.SELENIUM:
+        record_fetch_strategy(site, SiteProfile.SELENIUM)
+    return links
+
+
+def new_article(title, article_url):
+    """Słownik wyniku przetwarzania artykułu z wartościami początkowymi."""
+    return {
+        "title": title or article_url,
+        "url": article_url,
+        "artifact": None,
+        "downloaded": False
+    }
+
+
+def apply_blocking_profile(driver, site, profile=None):
+    """
+    Ustawienie blokowanych adresów zasobów (CDP Network.setBlockedURLs) dla
+    profilu. Lista jest wysyłana tylko przy zmianie względem poprzedniej
+    strony w tej sesji; reset_session w puli ją czyści.
+    """
+    urls = blocking.blocked_urls(site, profile)
+    if getattr(driver, "_blocked_urls", None) == urls:
+        return
     try:
-        driver = webdriver.Remote(command_executor=SELENIUM_URL, options=options)
-        wait = WebDriverWait(driver, 20)
+        execute_cdp(driver, "Network.enable", {})
+        execute_cdp(driver, "Network.setBlockedURLs", {"urls": urls})
+        driver._blocked_urls = urls
+    except Exception as exc:
+        logger.warning("Could not apply resource blocking profile: %s", exc)
+
+
+def find_article_pdf_link(driver, article_url, site, profile=None, adapter=None):
+    """
+    Otwiera artykuł, obsługuje zgodę na cookies i zwraca bezwzględny adres
+    podlinkowanego pliku .pdf albo None. Zasoby z profilu blokowania nie są pobierane.
+    adapter to adapter serwisu ustalony raz dla wyszukiwania (domyślnie odczytywany).
+    """
+    logger.info("Processing article: %s", article_url)
+    apply_blocking_profile(driver, site, profile)
+    with timing.span("article_page"):
+        open_page(driver, article_url)
+        WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+        wait_until_ready(driver, site, "article")
+        check_block_page(driver, article_url)
+    
+    adapter = adapter or sites.get_adapter(site)
+    handle_cookie_consent(driver, selector=adapter.consent_selector)
+    
+    href, current_url = find_pdf_link(driver)
+    if href:
+        return urllib.parse.urljoin(current_url, href)
+    return None
+
+
+def cached_article(title, article_url, mode):
+    """
+    Wynik artykułu zbudowany z pamięci podręcznej renderów (bez otwierania
+    przeglądarki) albo None, gdy artykuł nie był jeszcze przetwarzany w trybie mode.
+    """
+    artifact = render_cache.lookup(article_url, mode)
+    if artifact is None:
+        return None
+    article = new_article(title, article_url)
+    article["artifact"] = artifact.sha256
+    article["downloaded"] = True
+    return article
+
 
-        search_url = get_site_search_url(site, query)
+def process_article(driver, title, article_url, site, defer_download=False, profile=None,
+                    render_mode=None, adapter=None):
+    """
+    Otwiera artykuł i zapisuje go jako PDF (pobiera podlinkowany plik .pdf
+    albo drukuje stronę). Zwraca słownik z wynikiem przetwarzania.
+    Przy defer_download=True link do PDF jest tylko zapisywany pod kluczem
+    "pdf_link", a pobranie wykonuje wywołujący (patrz download_deferred_pdf).
+    profile to nazwa profilu blokowania zasobów, a render_mode tryb
+    generowania PDF ze strony (search/reader.py); domyślnie według serwisu.
+    """
+    mode = reader.mode_for(site, render_mode)
+    cached = cached_article(title, article_url, mode)
+    if cached:
+        return cached
+
+    article = new_article(title, article_url)
+    
+    try:
+        pdf_link = find_article_pdf_link(driver, article_url, site, profile, adapter)
         
-        logger.info("Searching on site: %s", search_url)
+        if pdf_link and defer_download:
+            article["pdf_link"] = pdf_link
+        elif pdf_link:
+            artifact = download_pdf(pdf_link)
+            if artifact:
+                article["artifact"] = artifact.sha256
+                article["downloaded"] = True
+                logger.info("Downloaded PDF: %s", artifact.name)
+        else:
+            artifact = save_page_as_pdf(driver, title, article_url, mode)
+            if artifact:
+                article["artifact"] = artifact.sha256
+                article["downloaded"] = True
         
+    except TimeoutException:
+        logger.warning("Timeout loading article: %s", article_url)
+    except Exception as exc:
+        logger.exception("Error processing article %s: %s", article_url, str(exc))
+    
+    return article
+
+
+@contextmanager
+def _temporary_driver():
+    """Jednorazowa sesja WebDriver zamykana po użyciu."""
+    driver = create_driver()
+    try:
+        yield driver
+    finally:
         try:
-            driver.get(search_url)
-            wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-            time.sleep(3)
-            
-            handle_cookie_consent(driver)
-            time.sleep(2)
-            
-            site_lower = site.lower()
-            if 'onet.pl' in site_lower:
-                search_inputs = driver.find_elements(By.CSS_SELECTOR, "input[type='text'], input[name='q'], input[class*='search']")
-                for inp in search_inputs:
-                    try:
-                        if inp.is_displayed():
-                            inp.clear()
-                            inp.send_keys(query)
-                            inp.send_keys(Keys.RETURN)
-                            logger.info("Entered query in search box")
-                            time.sleep(4)
-                            break
-                    except Exception:
-                        continue
-            
-        except TimeoutException:
-            logger.warning("Timeout loading search page")
-            return found
+            driver.quit()
+        except Exception:
+            logger.exception("Error closing WebDriver")
 
-        links = []
-        
-        result_selectors = [
-            ".gsc-result a.gs-title",
-            ".gsc-webResult a",
-            ".gs-title a",
-            ".gsc-thumbnail-inside a",
-            "article a",
-            "article h2 a",
-            "article h3 a",
-            ".search-results a",
-            ".search-result a",
-            "[class*='search'] article a",
-            "[class*='result'] a",
-            ".teaser a",
-            ".teaser__title a",
-            "[class*='teaser'] a",
-            "[class*='article'] h2 a",
-            "[class*='article'] h3 a",
-            "main article a",
-            "main h2 a",
-            "main h3 a",
-            ".content h2 a",
-            ".content h3 a",
-        ]
-        
-        for selector in result_selectors:
-            try:
-                elements = driver.find_elements(By.CSS_SELECTOR, selector)
-                for elem in elements:
-                    try:
-                        href = elem.get_attribute("href")
-                        text = elem.text.strip()
-                        
-                        if href and is_valid_article_url(href, site):
-                            if text and len(text) > 15:
-                                links.append((text, href))
-                                logger.debug("Found link: %s -> %s", text[:50], href)
-                    except Exception:
-                        continue
-            except Exception:
-                continue
-        
-        if not links:
-            logger.info("No results with specific selectors, trying all links")
-            all_anchors = driver.find_elements(By.TAG_NAME, "a")
-            for a in all_anchors:
-                try:
-                    href = a.get_attribute("href")
-                    text = a.text.strip()
-                    
-                    if href and is_valid_article_url(href, site):
-                        nav_words = ['menu', 'serwisy', 'zaloguj', 'subskrybuj', 'newsletter', 
-                                   'kontakt', 'regulamin', 'reklama', 'strona główna', 'więcej',
-                                   'opinie', 'home', 'login']
-                        if text and len(text) > 20:
-                            if not any(nav in text.lower() for nav in nav_words):
-                                links.append((text, href))
-                except Exception:
-                    continue
-        
-        seen = set()
-        unique_links = []
-        for text, href in links:
-            if href not in seen:
-                seen.add(href)
-                unique_links.append((text, href))
-        
-        links = unique_links[:max_results]
-        logger.info("Found %d article links to process", len(links))
-
-        for title, article_url in links:
-            article = {
-                "title": title or article_url,
-                "url": article_url,
-                "pdf_filename": None,
-                "downloaded": False
-            }
-            
-            try:
-                logger.info("Processing article: %s", article_url)
-                driver.get(article_url)
-                wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
-                time.sleep(2)
-                
-                handle_cookie_consent(driver)
-                time.sleep(1)
-                
-                pdf_link = None
-                page_anchors = driver.find_elements(By.TAG_NAME, "a")
-                for pa in page_anchors:
-                    try:
-                        href = pa.get_attribute("href")
-                        if href and ".pdf" in href.lower():
-                            pdf_link = urllib.parse.urljoin(driver.current_url, href)
-                            break
-                    except Exception:
-                        continue
-                
-                if pdf_link:
-                    filename = download_pdf(pdf_link, title)
-                    if filename:
-                        article["pdf_filename"] = filename
-                        article["downloaded"] = True
-                        logger.info("Downloaded PDF: %s", filename)
-                else:
-                    filename = save_page_as_pdf(driver, title, article_url)
-                    if filename:
-                        article["pdf_filename"] = filename
-                        article["downloaded"] = True
-                
-            except TimeoutException:
-                logger.warning("Timeout loading article: %s", article_url)
-            except Exception as exc:
-                logger.exception("Error processing article %s: %s", article_url, str(exc))
-            
-            found.append(article)
+
+def process_articles(driver, links, site, concurrency=1, pool=None, on_result=None, profile=None,
+                     render_mode=None, adapter=None):
+    """
+    Przetwarza artykuły równolegle w co najwyżej `concurrency` ścieżkach.
+    Pierwsza ścieżka używa przekazanego drivera, kolejne wypożyczają sesje z puli
+    (bez czekania - przy wyczerpanej puli ścieżek jest mniej) lub tworzą własne.
+    Pliki PDF podlinkowane w artykułach są pobierane w tle, bez blokowania przeglądarki.
+    Każdy gotowy artykuł jest od razu przekazywany do on_result(indeks, artykuł)
+    (wywoływane z różnych wątków). Wyniki zachowują kolejność listy links.
+    """
+    results = [None] * len(links)
+    processed = [False] * len(links)
+    lanes = max(1, min(concurrency, len(links)))
+    indexes = iter(range(len(links)))
+    indexes_lock = threading.Lock()
+    downloads = ThreadPoolExecutor(max_workers=settings.DOWNLOAD_CONCURRENCY)
+
+    def next_index():
+        with indexes_lock:
+            return next(indexes, None)
+
+    def complete(index, article):
+        results[index] = article
+        if on_result is not None:
+            on_result(index, article)
+
+    def finish_download(index, article):
+        try:
+            download_deferred_pdf(article)
+        except Exception:
+            logger.exception("Error storing PDF for %s", article["url"])
+            article.pop("pdf_link", None)
+        finally:
+            # Połączenie z bazą otwarte przez magazyn artefaktów w tym wątku
+            connection.close()
+        complete(index, article)
+
+    def handle(lane_driver, index):
+        title, article_url = links[index]
+        article = process_article(
+            lane_driver, title, article_url, site, defer_download=True, profile=profile,
+            render_mode=render_mode, adapter=adapter,
+        )
+        processed[index] = True
+        if article.get("pdf_link"):
+            timing.submit(downloads, finish_download, index, article)
+        else:
+            complete(index, article)
+
+    def run_lane(lane_driver):
+        while True:
+            index = next_index()
+            if index is None:
+                return
+            handle(lane_driver, index)
+
+    def run_extra_lane():
+        # Import lokalny: driver_pool importuje ten moduł
+        from .driver_pool import PoolExhausted
+
+        try:
+            session = pool.session(timeout=0) if pool is not None else _temporary_driver()
+            with session as lane_driver:
+                run_lane(lane_driver)
+        except PoolExhausted:
+            logger.info("No spare WebDriver session, running with fewer lanes")
+        except Exception:
+            # Pozostałe artykuły przetworzą inne ścieżki
+            logger.exception("Article lane failed")
+        finally:
+            # Połączenie z bazą otwarte przez magazyn artefaktów w tym wątku
+            connection.close()
+
+    try:
+        if lanes == 1:
+            run_lane(driver)
+        else:
+            with ThreadPoolExecutor(max_workers=lanes - 1) as executor:
+                futures = [timing.submit(executor, run_extra_lane) for _ in range(lanes - 1)]
+                run_lane(driver)
+                for future in futures:
+                    future.result()
+
+            # Artykuły porzucone przez ścieżkę, która uległa awarii
+            for index, done in enumerate(processed):
+                if not done:
+                    handle(driver, index)
+    finally:
+        # Oczekiwanie na pobrania w tle
+        downloads.shutdown(wait=True)
+
+    return results
+
+
+@timing.span("download")
+def download_deferred_pdf(article):
+    """
+    Pobranie pliku PDF odłożonego przez process_article(defer_download=True)
+    do magazynu artefaktów. Przeglądarka nie czeka na transfer.
+    """
+    pdf_link = article.pop("pdf_link")
+    path = storage.temp_path(".pdf")
+    try:
+        if downloader.download(pdf_link, path):
+            artifact = storage.put_file(path, "pdf")
+            article["artifact"] = artifact.sha256
+            article["downloaded"] = True
+            logger.info("Downloaded PDF: %s", artifact.name)
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def search_and_find_pdfs(query, site, max_results=10, driver=None, concurrency=1, pool=None,
+                         on_links=None, on_result=None, profile=None, render_mode=None,
+                         only_new=False):
+    """
+    Wyszukiwanie artykułów na określonej stronie za pomocą własnej wyszukiwarki.
+    Otwiera znalezione artykuły i zapisuje je jako pliki PDF.
+
+    Jeśli przekazano driver (np. wypożyczony z puli), jest on używany i nie jest
+    zamykany; w przeciwnym razie tworzona jest jednorazowa sesja. Przy
+    concurrency > 1 artykuły przetwarzane są równolegle (patrz process_articles).
+    on_links(links) jest wywoływane po zebraniu linków, a on_result(pozycja,
+    artykuł) po przetworzeniu każdego artykułu, aby wyniki można było zapisywać
+    na bieżąco. profile wybiera profil blokowania zasobów (search/blocking.py),
+    a render_mode tryb generowania PDF (search/reader.py). Przy only_new
+    pomijane są artykuły znalezione już we wcześniejszych wyszukiwaniach.
+    """
+    owns_driver = driver is None
+    found = []
+    
+    try:
+        if owns_driver:
+            with timing.span("session"):
+                driver = create_driver()
+
+        # Adapter serwisu ustalany raz dla całego wyszukiwania (bez zapytań per artykuł)
+        adapter = sites.get_adapter(site)
+        links = find_article_links(
+            query, site, max_results, lambda: nullcontext(driver), only_new=only_new, adapter=adapter
+        )
+        if on_links is not None:
+            on_links(links)
+        found = process_articles(
+            driver, links, site, concurrency=concurrency, pool=pool, on_result=on_result,
+            profile=profile, render_mode=render_mode, adapter=adapter,
+        )
         
     except WebDriverException as exc:
         logger.exception("Selenium WebDriver error: %s", str(exc))
@@ -413,7 +965,7 @@ def search_and_find_pdfs(query, site, max_results=10):
         logger.exception("Unexpected error in search: %s", str(exc))
         raise
     finally:
-        if driver:
+        if owns_driver and driver:
             try:
                 driver.quit()
             except Exception:
@@ -0,0 +1,191 @@
+"""
+Moduł rejestru adapterów serwisów.
+Adapter opisuje, jak przeszukiwać dany serwis: szablon adresu wyszukiwania,
+selektory wyników, stronicowanie (szablon adresu kolejnych stron wyników
+albo selektor odnośnika do następnej strony), selektor przycisku
+zgody na cookies, pole wyszukiwania (serwisy bez wyszukiwania przez adres)
+i wymaganie JavaScriptu. Adaptery wbudowane mogą być nadpisane w ustawieniach
+(SITE_ADAPTERS) oraz w bazie danych (pola SiteProfile edytowane w panelu
+admina), więc zmiana serwisu nie wymaga wdrożenia.
+
+Dla serwisów bez skonfigurowanych selektorów zapisywane są statystyki
+selektorów (SelectorStat): selektory, które dały prawidłowe linki, są przy
+kolejnym wyszukiwaniu sprawdzane jako pierwsze, a pełna lista ogólnych
+selektorów jest używana dopiero wtedy, gdy nie dały wyników.
+"""
+
+import urllib.parse
+from dataclasses import dataclass, field, replace
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .models import SelectorStat, SiteProfile
+
+# Pola adaptera, które można nadpisać w SITE_ADAPTERS i w SiteProfile
+ADAPTER_FIELDS = (
+    "search_url", "page_url", "result_selectors", "next_page_selector", "consent_selector",
+    "search_input_selector", "js_only",
+)
+
+
+@dataclass(frozen=True)
+class SiteAdapter:
+    """Opis sposobu przeszukiwania serwisu."""
+    # Domena serwisu (małe litery, bez "www.")
+    domain: str
+    # Szablon adresu wyszukiwania z polem {query} (zapytanie zakodowane do adresu)
+    search_url: str = ""
+    # Szablon adresu kolejnych stron wyników z polami {query} i {page} (numer strony od 1)
+    page_url: str = ""
+    # Selektory CSS odnośników do artykułów (puste = selektory wyuczone i ogólne)
+    result_selectors: tuple = ()
+    # Selektor CSS odnośnika do następnej strony wyników (domyślnie standardowe rel="next")
+    next_page_selector: str = "a[rel='next'], link[rel='next']"
+    # Selektor CSS przycisku zgody na cookies (sprawdzany przed ogólnymi wzorcami)
+    consent_selector: str = ""
+    # Selektor CSS pola, w które wpisywane jest zapytanie po otwarciu strony wyszukiwania
+    search_input_selector: str = ""
+    # Czy wyniki wyszukiwania wymagają JavaScriptu
+    js_only: bool = False
+    # Źródła konfiguracji adaptera (builtin, settings, database)
+    sources: tuple = field(default=(), compare=False)
+
+    def build_search_url(self, query):
+        """Adres strony wyników wyszukiwania dla zapytania."""
+        template = self.search_url or f"https://www.{self.domain}/szukaj?q={{query}}"
+        return template.format(query=urllib.parse.quote_plus(query))
+
+    def build_page_url(self, query, page):
+        """Adres strony wyników o numerze page albo "" (serwis bez szablonu stron)."""
+        if not self.page_url:
+            return ""
+        return self.page_url.format(query=urllib.parse.quote_plus(query), page=page)
+
+
+# Adaptery wbudowane (klucz dopasowywany jako fragment domeny serwisu)
+BUILTIN_ADAPTERS = {
+    "rzeczpospolita.pl": {"search_url": "https://www.rzeczpospolita.pl/szukaj?q={query}"},
+    "rp.pl": {"search_url": "https://www.rp.pl/szukaj?q={query}"},
+    "wp.pl": {"search_url": "https://szukaj.wp.pl/?q={query}"},
+    "onet.pl": {
+        "search_url": "https://szukaj.onet.pl/?q={query}",
+        "result_selectors": (".gsc-result a.gs-title", ".gsc-webResult a", ".gs-title a"),
+        "next_page_selector": ".gsc-cursor-current-page + .gsc-cursor-page",
+        "search_input_selector": "input[type='text'], input[name='q'], input[class*='search']",
+        "js_only": True,
+    },
+    "gazeta.pl": {"search_url": "https://szukaj.gazeta.pl/szukaj/0,0.html?q={query}"},
+    "tvn24.pl": {"search_url": "https://tvn24.pl/szukaj?query={query}"},
+    "polsatnews.pl": {"search_url": "https://www.polsatnews.pl/szukaj/?query={query}"},
+    "interia.pl": {"search_url": "https://www.interia.pl/szukaj?q={query}"},
+}
+
+
+# Etykieta metryk dla serwisów bez adaptera
+OTHER_SITE = "other"
+
+
+def site_domain(site):
+    """Znormalizowana domena serwisu używana jako klucz profilu strony."""
+    return site.lower().strip().replace('www.', '')
+
+
+def metric_site(site):
+    """
+    Etykieta serwisu w metrykach: klucz adaptera wbudowanego lub z SITE_ADAPTERS,
+    domena z adapterem zapisanym w SiteProfile albo "other". Dowolne domeny
+    podane w wyszukiwaniach nie tworzą nowych serii metryk.
+    """
+    domain = site_domain(site)
+    for config in (BUILTIN_ADAPTERS, getattr(settings, "SITE_ADAPTERS", {})):
+        if domain in config:
+            return domain
+        for known_site in config:
+            if known_site in domain:
+                return known_site
+    # Profil bez adresu wyszukiwania powstaje dla każdego serwisu (strategia pobierania)
+    if SiteProfile.objects.filter(domain=domain).exclude(search_url="").exists():
+        return domain
+    return OTHER_SITE
+
+
+def _match(config, domain):
+    """Konfiguracja dla domeny: dokładne dopasowanie albo fragment domeny."""
+    if domain in config:
+        return config[domain]
+    for known_site, values in config.items():
+        if known_site in domain:
+            return values
+    return None
+
+
+def _profile_overrides(profile):
+    """Niepuste pola adaptera zapisane w SiteProfile."""
+    overrides = {}
+    selectors = tuple(line.strip() for line in profile.result_selectors.splitlines() if line.strip())
+    if selectors:
+        overrides["result_selectors"] = selectors
+    for name in ("search_url", "page_url", "next_page_selector", "consent_selector", "search_input_selector"):
+        if getattr(profile, name):
+            overrides[name] = getattr(profile, name)
+    if profile.js_only:
+        overrides["js_only"] = True
+    return overrides
+
+
+def get_adapter(site, profile=None):
+    """
+    Adapter serwisu: wbudowany, nadpisany przez SITE_ADAPTERS, a następnie
+    przez niepuste pola SiteProfile (baza danych ma pierwszeństwo).
+    """
+    domain = site_domain(site)
+    adapter = SiteAdapter(domain=domain)
+    layers = [
+        ("builtin", _match(BUILTIN_ADAPTERS, domain)),
+        ("settings", _match(getattr(settings, "SITE_ADAPTERS", {}), domain)),
+    ]
+    if profile is None:
+        profile = SiteProfile.objects.filter(domain=domain).first()
+    if profile is not None:
+        layers.append(("database", _profile_overrides(profile)))
+
+    for source, values in layers:
+        if not values:
+            continue
+        values = {name: value for name, value in values.items() if name in ADAPTER_FIELDS}
+        if "result_selectors" in values:
+            values["result_selectors"] = tuple(values["result_selectors"])
+        adapter = replace(adapter, sources=adapter.sources + (source,), **values)
+    return adapter
+
+
+def learned_selectors(site):
+    """
+    Selektory, które dały prawidłowe linki w tym serwisie, od najskuteczniejszych.
+    Selektor po SELECTOR_MAX_MISSES kolejnych chybieniach jest pomijany
+    (np. po zmianie układu strony), aż pełne skanowanie znów go potwierdzi.
+    """
+    return list(
+        SelectorStat.objects.filter(
+            domain=site_domain(site), hits__gt=0, misses__lt=settings.SELECTOR_MAX_MISSES,
+        ).order_by("-hits", "misses").values_list("selector", flat=True)[:settings.SELECTOR_LEARNED_LIMIT]
+    )
+
+
+def record_selector_results(site, hits, misses=()):
+    """
+    Zapisanie wyniku selektorów: trafienie zeruje licznik kolejnych chybień,
+    chybienie go zwiększa.
+    """
+    domain = site_domain(site)
+    now = timezone.now()
+    for selector in hits:
+        stat, created = SelectorStat.objects.get_or_create(
+            domain=domain, selector=selector, defaults={"hits": 1, "last_hit_at": now}
+        )
+        if not created:
+            SelectorStat.objects.filter(id=stat.id).update(hits=F("hits") + 1, misses=0, last_hit_at=now)
+    if misses:
+        SelectorStat.objects.filter(domain=domain, selector__in=list(misses)).update(misses=F("misses") + 1)
@@ -0,0 +1,92 @@
+"""
+Moduł buforowanych migawek stanu wyszukiwania.
+Każde wyszukiwanie ma w Redis wersję - niepowtarzalny token zmieniany przy
+każdym zapisie (status, postęp, nowe wyniki). Gotowa odpowiedź JSON endpointu statusu jest
+przechowywana w pamięci podręcznej razem z wersją i ETag; dopóki wersja się
+nie zmieni, odpowiedź (lub 304) jest wydawana bez zapytań do Postgres.
+"""
+
+import json
+import uuid
+import hashlib
+import logging
+
+from django.conf import settings
+from django.core.cache import cache
+from redis.exceptions import RedisError
+
+from .models import SearchQuery
+from .payloads import status_payload
+from .redis_client import get_redis
+
+# Konfiguracja loggera dla tego modułu
+logger = logging.getLogger(__name__)
+
+
+def version_key(search_id):
+    return f"search-version:{search_id}"
+
+
+def snapshot_key(search_id):
+    return f"search-snapshot:{search_id}"
+
+
+def new_version():
+    """Token wersji, który nigdy się nie powtarza (w odróżnieniu od licznika po wygaśnięciu klucza)."""
+    return uuid.uuid4().hex
+
+
+def current_version(search_id):
+    """
+    Bieżąca wersja stanu wyszukiwania. Gdy klucza nie ma (brak zapisu albo
+    wygasł), zapisywany jest nowy token - żadna buforowana migawka do niego
+    nie pasuje, więc migawka jest budowana od nowa.
+    """
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.set(version_key(search_id), new_version(), nx=True, ex=settings.SEARCH_SNAPSHOT_TTL)
+    pipe.get(version_key(search_id))
+    return pipe.execute()[1]
+
+
+def invalidate(search_id):
+    """Nowa wersja po zapisie - buforowana migawka przestaje obowiązywać."""
+    try:
+        get_redis().set(version_key(search_id), new_version(), ex=settings.SEARCH_SNAPSHOT_TTL)
+    except RedisError as exc:
+        logger.warning("Snapshot of search %s not invalidated: %s", search_id, exc)
+
+
+def build_snapshot(search_id, version):
+    """Migawka z bazy danych: {"version", "etag", "body"} albo None dla nieznanego wyszukiwania."""
+    search = SearchQuery.objects.filter(id=search_id).first()
+    if search is None:
+        return None
+    body = json.dumps(status_payload(search))
+    etag = '"%s"' % hashlib.sha1(body.encode("utf-8")).hexdigest()[:20]
+    return {"version": version, "etag": etag, "body": body}
+
+
+def get_snapshot(search_id):
+    """
+    Zwraca (migawka albo None, czy trafienie w pamięci podręcznej).
+    Wersja jest odczytywana przed bazą danych, więc zapis w trakcie budowania
+    migawki jedynie wymusi jej przebudowanie przy następnym żądaniu.
+    Bez Redis migawka jest zawsze budowana z bazy.
+    """
+    try:
+        version = current_version(search_id)
+        cached = cache.get(snapshot_key(search_id))
+    except RedisError as exc:
+        logger.warning("Snapshot cache unavailable: %s", exc)
+        return build_snapshot(search_id, None), False
+
+    if cached and cached["version"] == version:
+        return cached, True
+
+    snapshot = build_snapshot(search_id, version)
+    if snapshot is not None:
+        try:
+            cache.set(snapshot_key(search_id), snapshot, timeout=settings.SEARCH_SNAPSHOT_TTL)
+        except RedisError as exc:
+            logger.warning("Snapshot cache unavailable: %s", exc)
+    return snapshot, False
@@ -0,0 +1,199 @@
+"""
+Moduł strumienia zdarzeń wyszukiwania (Server-Sent Events).
+Aplikacja ASGI obsługuje GET /api/search/<id>/events/: wysyła stan początkowy
+(tę samą migawkę co endpoint statusu, search/snapshots.py), a następnie
+przekazuje zdarzenia z Redis pub/sub aż do zakończenia wyszukiwania. Każdy proces serwera utrzymuje jedną
+subskrypcję Redis (EventHub) współdzieloną przez wszystkich obserwatorów,
+więc kolejni klienci nie generują zapytań do bazy ani nowych połączeń z Redis.
+"""
+
+import re
+import json
+import asyncio
+import logging
+from collections import defaultdict
+
+import redis.asyncio as aioredis
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from redis.exceptions import RedisError
+
+from . import snapshots
+from .events import CHANNEL_PREFIX
+from .models import SearchQuery
+
+# Konfiguracja loggera dla tego modułu
+logger = logging.getLogger(__name__)
+
+# Ścieżka strumienia zdarzeń wyszukiwania
+EVENTS_PATH_RE = re.compile(r"^/api/search/(\d+)/events/?$")
+
+# Maksymalna liczba zdarzeń oczekujących dla jednego klienta (wolni klienci tracą nadmiar)
+QUEUE_SIZE = 256
+# Czas oczekiwania na subskrypcję Redis w sekundach
+SUBSCRIBE_TIMEOUT = 2
+# Opóźnienie ponownego połączenia z Redis po błędzie w sekundach
+RECONNECT_DELAY = 1
+
+
+class EventHub:
+    """
+    Jedna subskrypcja wzorca kanałów wyszukiwań na proces; zdarzenia są
+    rozdzielane do kolejek obserwatorów danego wyszukiwania.
+    """
+
+    def __init__(self):
+        self._watchers = defaultdict(set)
+        self._task = None
+        self._ready = None
+
+    async def subscribe(self, search_id):
+        """Kolejka zdarzeń wyszukiwania; zgłasza wyjątek, gdy Redis jest niedostępny."""
+        if self._task is None or self._task.done():
+            self._ready = asyncio.Event()
+            self._task = asyncio.ensure_future(self._listen())
+        await asyncio.wait_for(self._ready.wait(), SUBSCRIBE_TIMEOUT)
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self._watchers[search_id].add(queue)
+        return queue
+
+    def unsubscribe(self, search_id, queue):
+        """Usunięcie kolejki obserwatora."""
+        watchers = self._watchers.get(search_id)
+        if watchers is not None:
+            watchers.discard(queue)
+            if not watchers:
+                del self._watchers[search_id]
+
+    def dispatch(self, channel, data):
+        """Przekazanie wiadomości z kanału do kolejek obserwatorów."""
+        try:
+            search_id = int(channel[len(CHANNEL_PREFIX):])
+            message = json.loads(data)
+        except ValueError:
+            return
+        for queue in list(self._watchers.get(search_id, ())):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                logger.warning("Dropping event for slow watcher of search %s", search_id)
+
+    async def _listen(self):
+        while True:
+            client = aioredis.from_url(settings.REDIS_URL, decode_responses=True)
+            try:
+                async with client.pubsub() as pubsub:
+                    await pubsub.psubscribe(f"{CHANNEL_PREFIX}*")
+                    self._ready.set()
+                    async for message in pubsub.listen():
+                        if message["type"] == "pmessage":
+                            self.dispatch(message["channel"], message["data"])
+            except (RedisError, OSError) as exc:
+                self._ready.clear()
+                logger.warning("Search event subscription lost: %s", exc)
+                await asyncio.sleep(RECONNECT_DELAY)
+            finally:
+                await client.aclose()
+
+
+hub = EventHub()
+
+
+def load_snapshot(search_id):
+    """
+    Stan początkowy wyszukiwania albo None, gdy wyszukiwanie nie istnieje.
+    To ta sama buforowana migawka, którą wydaje endpoint statusu.
+    """
+    snapshot, _ = snapshots.get_snapshot(search_id)
+    return json.loads(snapshot["body"]) if snapshot is not None else None
+
+
+def format_event(event, data):
+    """Zdarzenie w formacie text/event-stream."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+
+
+async def wait_for_disconnect(receive):
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+
+
+async def stream_events(queue, receive, send):
+    """Przekazywanie zdarzeń z kolejki do klienta do końca wyszukiwania lub rozłączenia."""
+    disconnect = asyncio.ensure_future(wait_for_disconnect(receive))
+    try:
+        while True:
+            get = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait(
+                {get, disconnect},
+                timeout=settings.SSE_HEARTBEAT_INTERVAL,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if disconnect in done:
+                get.cancel()
+                return
+            if get not in done:
+                # Komentarz podtrzymujący połączenie przez proxy
+                get.cancel()
+                await send({"type": "http.response.body", "body": b": keep-alive\n\n", "more_body": True})
+                continue
+
+            message = get.result()
+            await send({
+                "type": "http.response.body",
+                "body": format_event(message["event"], message["data"]),
+                "more_body": True,
+            })
+            if message["event"] == "status" and message["data"]["status"] in SearchQuery.FINISHED_STATUSES:
+                break
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        disconnect.cancel()
+
+
+async def search_events_app(scope, receive, send):
+    """Aplikacja ASGI strumienia zdarzeń wyszukiwania."""
+    search_id = int(EVENTS_PATH_RE.match(scope["path"]).group(1))
+
+    # Subskrypcja przed odczytem stanu - żadne zdarzenie nie zginie pomiędzy
+    queue = None
+    try:
+        queue = await hub.subscribe(search_id)
+    except (RedisError, OSError, asyncio.TimeoutError) as exc:
+        logger.warning("Search events unavailable, sending snapshot only: %s", exc)
+
+    try:
+        snapshot = await sync_to_async(load_snapshot)(search_id)
+        if snapshot is None:
+            await send({
+                "type": "http.response.start",
+                "status": 404,
+                "headers": [(b"content-type", b"application/json")],
+            })
+            await send({"type": "http.response.body", "body": b'{"error": "search not found"}'})
+            return
+
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/event-stream"),
+                (b"cache-control", b"no-cache"),
+                (b"x-accel-buffering", b"no"),
+            ],
+        })
+        await send({
+            "type": "http.response.body",
+            "body": format_event("snapshot", snapshot),
+            "more_body": True,
+        })
+        if queue is None or snapshot["status"] in SearchQuery.FINISHED_STATUSES:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        await stream_events(queue, receive, send)
+    finally:
+        if queue is not None:
+            hub.unsubscribe(search_id, queue)
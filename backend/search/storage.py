@@ -0,0 +1,249 @@
+"""
+Moduł magazynu artefaktów adresowanego treścią.
+Pliki artykułów (PDF, HTML) są zapisywane pod nazwą skrótu SHA-256 treści
+w podkatalogach media/articles/ab/cd/, więc ten sam dokument znaleziony przez
+wiele wyszukiwań jest przechowywany tylko raz. Rekord Artifact liczy odwołania
+z FoundArticle; po usunięciu ostatniego odwołania plik jest kasowany.
+
+Zmiany licznika odwołań, deduplikacja i usuwanie odbywają się pod blokadą
+wiersza Artifact (select_for_update). Plik jest kasowany dopiero po
+zatwierdzeniu transakcji i tylko wtedy, gdy w międzyczasie żaden zapis nie
+przywrócił artefaktu o tej samej treści (remove_blob_on_commit).
+"""
+
+import os
+import re
+import hashlib
+import logging
+import tempfile
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import snapshots
+from .models import Artifact, FoundArticle
+
+# Konfiguracja loggera dla tego modułu
+logger = logging.getLogger(__name__)
+
+# Ustawienie katalogu głównego dla mediów
+try:
+    MEDIA_ROOT = getattr(settings, 'MEDIA_ROOT', str(settings.BASE_DIR / "media"))
+except Exception:
+    MEDIA_ROOT = os.environ.get("MEDIA_ROOT", "/app/media")
+
+# Katalog do przechowywania pobranych artykułów
+ARTICLES_DIR = os.path.join(MEDIA_ROOT, "articles")
+os.makedirs(ARTICLES_DIR, exist_ok=True)
+
+# Katalog plików tymczasowych (ten sam system plików co magazyn - rename jest atomowy)
+TMP_DIR = os.path.join(ARTICLES_DIR, ".tmp")
+os.makedirs(TMP_DIR, exist_ok=True)
+
+# Nazwa obiektu w magazynie: <sha256>.<rozszerzenie>
+BLOB_NAME_RE = re.compile(r"^([0-9a-f]{64})\.(pdf|html)$")
+
+# Typy zawartości dla obsługiwanych rozszerzeń
+CONTENT_TYPES = {
+    "pdf": "application/pdf",
+    "html": "text/html; charset=utf-8",
+}
+
+
+def blob_path(sha256, ext):
+    """Ścieżka pliku w magazynie, np. articles/ab/cd/abcd...ef.pdf."""
+    return os.path.join(ARTICLES_DIR, sha256[:2], sha256[2:4], f"{sha256}.{ext}")
+
+
+def parse_blob_name(name):
+    """Zwraca (sha256, rozszerzenie) dla nazwy obiektu z magazynu albo None."""
+    match = BLOB_NAME_RE.match(name or "")
+    return match.groups() if match else None
+
+
+def temp_path(suffix=""):
+    """Nowa ścieżka pliku tymczasowego w katalogu magazynu."""
+    fd, path = tempfile.mkstemp(dir=TMP_DIR, suffix=suffix)
+    os.close(fd)
+    return path
+
+
+def hash_file(path, chunk_size=1024 * 1024):
+    """Skrót SHA-256 zawartości pliku."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _lock_artifact(sha256, ext, size):
+    """
+    Rekord Artifact dla treści, zablokowany do końca transakcji (tworzony w razie
+    potrzeby). Rekord usunięty równolegle przez release_reference jest tworzony od nowa.
+    """
+    while True:
+        artifact, created = Artifact.objects.get_or_create(
+            sha256=sha256, defaults={"ext": ext, "size": size}
+        )
+        locked = Artifact.objects.select_for_update().filter(id=artifact.id).first()
+        if locked is not None:
+            return locked, created
+
+
+def put_file(path, ext, sha256=None):
+    """
+    Przeniesienie gotowego pliku do magazynu i zwrócenie rekordu Artifact.
+    Jeśli identyczna treść już istnieje, nowy plik jest usuwany (deduplikacja).
+    Plik jest umieszczany po zatwierdzeniu rekordu - usuwanie odłożone przez
+    remove_blob_on_commit widzi wtedy dostępny artefakt i pliku nie kasuje.
+    """
+    sha256 = sha256 or hash_file(path)
+    size = os.path.getsize(path)
+    dest = blob_path(sha256, ext)
+
+    with transaction.atomic():
+        artifact, created = _lock_artifact(sha256, ext, size)
+        search_ids = restore_artifact(artifact) if artifact.evicted else set()
+
+    if os.path.exists(dest):
+        os.remove(path)
+    else:
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        os.replace(path, dest)
+
+    for search_id in search_ids:
+        snapshots.invalidate(search_id)
+    if not created and not search_ids:
+        logger.info("Deduplicated artifact %s", artifact.name)
+    return artifact
+
+
+def restore_artifact(artifact):
+    """
+    Oznaczenie usuniętego wcześniej (evicted) artefaktu jako ponownie dostępnego
+    (wywoływane pod blokadą wiersza). Zwraca ID wyszukiwań do odświeżenia.
+    """
+    Artifact.objects.filter(id=artifact.id).update(evicted=False, last_accessed_at=timezone.now())
+    articles = FoundArticle.objects.filter(artifact_id=artifact.id, evicted=True)
+    search_ids = set(articles.values_list("search_id", flat=True))
+    articles.update(evicted=False, downloaded=True)
+    artifact.evicted = False
+    logger.info("Restored evicted artifact %s", artifact.name)
+    return search_ids
+
+
+def touch(artifact_id):
+    """
+    Zapisanie użycia artefaktu (dla eviction LRU). Aktualizacja odbywa się
+    najwyżej raz na ARTICLES_ACCESS_RESOLUTION sekund, więc częste pobrania
+    nie generują zapisów.
+    """
+    now = timezone.now()
+    Artifact.objects.filter(
+        id=artifact_id,
+        last_accessed_at__lt=now - timedelta(seconds=settings.ARTICLES_ACCESS_RESOLUTION),
+    ).update(last_accessed_at=now)
+
+
+def put_bytes(data, ext):
+    """Zapisanie danych w magazynie (przez plik tymczasowy) i zwrócenie rekordu Artifact."""
+    path = temp_path()
+    try:
+        with open(path, "wb") as fh:
+            fh.write(data)
+        return put_file(path, ext, hashlib.sha256(data).hexdigest())
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def remove_blob_on_commit(sha256, ext):
+    """
+    Usunięcie pliku po zatwierdzeniu bieżącej transakcji, o ile żaden
+    dostępny (nie evicted) artefakt o tej treści go nie używa.
+    """
+    def remove():
+        with transaction.atomic():
+            if Artifact.objects.select_for_update().filter(sha256=sha256, evicted=False).exists():
+                logger.info("Artifact %s.%s is in use again, keeping file", sha256, ext)
+                return
+            path = blob_path(sha256, ext)
+            if os.path.exists(path):
+                os.remove(path)
+
+    transaction.on_commit(remove)
+
+
+def add_reference(artifact_id, count=1):
+    """Zwiększenie licznika odwołań do artefaktu (pod blokadą wiersza)."""
+    with transaction.atomic():
+        if Artifact.objects.select_for_update().filter(id=artifact_id).exists():
+            Artifact.objects.filter(id=artifact_id).update(ref_count=F("ref_count") + count)
+
+
+def release_reference(artifact_id):
+    """
+    Zmniejszenie licznika odwołań; artefakt bez odwołań jest usuwany,
+    a jego plik kasowany po zatwierdzeniu transakcji.
+    """
+    with transaction.atomic():
+        artifact = Artifact.objects.select_for_update().filter(id=artifact_id).first()
+        if artifact is None:
+            return
+        artifact.ref_count = max(artifact.ref_count - 1, 0)
+        if artifact.ref_count:
+            artifact.save(update_fields=["ref_count"])
+            return
+        artifact.delete()
+        remove_blob_on_commit(artifact.sha256, artifact.ext)
+    logger.info("Removed unreferenced artifact %s", artifact.name)
+
+
+def import_legacy_files():
+    """
+    Przeniesienie plików sprzed magazynu adresowanego treścią (płaskie
+    articles/<pdf_filename>) do magazynu. Artykuły dostają Artifact z odwołaniami,
+    więc pliki są liczone do limitu miejsca i podlegają eviction. Stary plik jest
+    usuwany dopiero po zatwierdzeniu zmian. Zwraca liczbę przeniesionych plików.
+    """
+    legacy = {}
+    articles = FoundArticle.objects.filter(
+        artifact__isnull=True, pdf_filename__isnull=False
+    ).exclude(pdf_filename="")
+    for article_id, filename in articles.values_list("id", "pdf_filename"):
+        legacy.setdefault(os.path.basename(filename), []).append(article_id)
+
+    imported = 0
+    for name, article_ids in legacy.items():
+        path = os.path.join(ARTICLES_DIR, name)
+        ext = os.path.splitext(name)[1].lstrip(".").lower()
+        if ext not in CONTENT_TYPES or not os.path.isfile(path):
+            logger.warning("Legacy file %s not found or unsupported, skipping", name)
+            continue
+
+        copy = temp_path()
+        with open(path, "rb") as src, open(copy, "wb") as dst:
+            for chunk in iter(lambda: src.read(1024 * 1024), b""):
+                dst.write(chunk)
+        artifact = put_file(copy, ext)
+
+        with transaction.atomic():
+            FoundArticle.objects.filter(id__in=article_ids).update(artifact=artifact, pdf_filename=None)
+            add_reference(artifact.id, len(article_ids))
+            transaction.on_commit(lambda path=path: os.remove(path) if os.path.exists(path) else None)
+        imported += 1
+        logger.info("Imported legacy file %s as %s", name, artifact.name)
+    return imported
+
+
+@receiver(post_delete, sender=FoundArticle)
+def _release_artifact_on_delete(sender, instance, **kwargs):
+    """Zwolnienie odwołania przy usuwaniu artykułu (także kaskadowo z wyszukiwaniem)."""
+    if instance.artifact_id:
+        release_reference(instance.artifact_id)
@@ -1,11 +1,189 @@
 """
 Moduł zadań asynchronicznych Celery dla aplikacji wyszukiwania.
 Zawiera zadania do wykonywania wyszukiwań w tle.
+
+Przy włączonym SEARCH_FAN_OUT wyszukiwanie jest dzielone na zadania w osobnych
+kolejkach: perform_search (kolejka "discovery") zbiera linki i tworzy po jednym
+zadaniu na artykuł - render_article (kolejka "render", przeglądarka) albo
+download_article (kolejka "download", zwykłe HTTP). Chord po zakończeniu
+wszystkich artykułów uruchamia finalize_search, które oznacza wyszukiwanie
+jako zakończone.
 """
 
-from celery import shared_task
-from .selenium_client import search_and_find_pdfs
-from .models import SearchQuery, FoundArticle
+import time
+import logging
+import threading
+import urllib.parse
+from collections import Counter
+
+from celery import chord, shared_task
+from django.conf import settings
+from django.db import connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from selenium.common.exceptions import TimeoutException
+
+from .selenium_client import (
+    cached_article,
+    download_pdf,
+    find_article_links,
+    find_article_pdf_link,
+    new_article,
+    process_article,
+    save_page_as_pdf,
+    search_and_find_pdfs,
+)
+from .driver_pool import get_pool
+from . import events, library, lifecycle, reader, render_cache, seen, snapshots, storage, timing
+from .models import Artifact, SearchQuery, FoundArticle
+
+# Konfiguracja loggera dla tego modułu
+logger = logging.getLogger(__name__)
+
+
+def search_render_mode(search_id):
+    """Efektywny tryb generowania PDF wyszukiwania (klucz pamięci podręcznej renderów)."""
+    search = SearchQuery.objects.filter(id=search_id).only("site", "render_mode").first()
+    if search is None:
+        return reader.mode_for("")
+    return reader.mode_for(search.site, search.render_mode or None)
+
+
+def save_found_articles(search_id, items):
+    """
+    Zapisanie partii wyników przetwarzania artykułów jednym bulk_create.
+    items to pary (pozycja, artykuł); artykuł wskazuje na plik w magazynie
+    (article["artifact"] to skrót SHA-256). Liczniki postępu wyszukiwania
+    i odwołania do artefaktów są aktualizowane w tej samej transakcji;
+    adresy pobranych artykułów trafiają do indeksu widzianych adresów
+    (search/seen.py), a nowe pliki - do lokalnego indeksu pełnotekstowego
+    (search/library.py).
+    """
+    shas = {article["artifact"] for _, article in items if article.get("artifact")}
+    artifacts = Artifact.objects.in_bulk(shas, field_name="sha256")
+
+    rows = []
+    for position, article in items:
+        artifact = artifacts.get(article.get("artifact"))
+        rows.append(FoundArticle(
+            search_id=search_id,
+            position=position,
+            title=article.get("title") or "(no title)",
+            url=article.get("url"),
+            artifact=artifact,
+            downloaded=article.get("downloaded", False) and artifact is not None,
+        ))
+
+    with transaction.atomic():
+        FoundArticle.objects.bulk_create(rows)
+        references = Counter(row.artifact_id for row in rows if row.artifact_id)
+        for artifact_id, count in references.items():
+            storage.add_reference(artifact_id, count)
+        SearchQuery.objects.filter(id=search_id).update(
+            articles_processed=F("articles_processed") + len(rows),
+            articles_downloaded=F("articles_downloaded") + sum(row.downloaded for row in rows),
+        )
+        unindexed = Artifact.objects.filter(id__in=list(references), text__isnull=True)
+        for artifact_id in unindexed.values_list("id", flat=True):
+            transaction.on_commit(lambda artifact_id=artifact_id: index_article_text.delay(artifact_id))
+
+    mode = search_render_mode(search_id)
+    for row in rows:
+        if row.artifact is not None:
+            render_cache.store(row.url, row.artifact, mode)
+    # Artykuły niepobrane (błąd, przekroczony czas) zostaną spróbowane ponownie przy only_new
+    seen.mark_seen([row.url for row in rows if row.downloaded])
+    snapshots.invalidate(search_id)
+    events.publish_results(search_id, rows)
+    events.publish_progress(search_id)
+    return rows
+
+
+def save_found_article(search_id, position, article):
+    """Zapisanie wyniku przetwarzania pojedynczego artykułu w bazie danych."""
+    return save_found_articles(search_id, [(position, article)])[0]
+
+
+class ResultWriter:
+    """
+    Bufor wyników wyszukiwania zapisywanych partiami w trakcie przetwarzania.
+    Partia trafia do bazy po zebraniu SEARCH_RESULT_BATCH_SIZE artykułów albo
+    gdy od poprzedniego zapisu minęło SEARCH_RESULT_FLUSH_INTERVAL sekund,
+    więc pierwszy gotowy artykuł jest zapisywany od razu. Artykuł pozostawiony
+    w buforze zapisuje timer po upływie tego czasu, także gdy kolejne artykuły
+    nie nadchodzą. Metoda add może być wywoływana z wielu wątków.
+    """
+
+    def __init__(self, search_id, batch_size=None, flush_interval=None):
+        self.search_id = search_id
+        self.batch_size = batch_size or settings.SEARCH_RESULT_BATCH_SIZE
+        self.flush_interval = (
+            settings.SEARCH_RESULT_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        )
+        self._pending = []
+        self._last_flush = None
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def add(self, position, article):
+        """Dodanie gotowego artykułu; zapisuje partię, gdy nadszedł jej czas."""
+        with self._lock:
+            self._pending.append((position, article))
+            due = (
+                self._last_flush is None
+                or len(self._pending) >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval
+            )
+            if due:
+                self._flush()
+            elif self._timer is None:
+                delay = self._last_flush + self.flush_interval - time.monotonic()
+                self._timer = threading.Timer(delay, self._flush_on_timer)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Zapisanie wszystkich buforowanych artykułów."""
+        with self._lock:
+            self._flush()
+
+    def _flush_on_timer(self):
+        try:
+            with self._lock:
+                self._timer = None
+                self._flush()
+        except Exception:
+            logger.exception("Could not save buffered results of search %s", self.search_id)
+        finally:
+            # Połączenie z bazą otwarte w wątku timera
+            connections.close_all()
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+        batch, self._pending = self._pending, []
+        self._last_flush = time.monotonic()
+        save_found_articles(self.search_id, batch)
+
+
+def set_links_found(search_id, count):
+    """Zapisanie liczby znalezionych linków (licznik postępu wyszukiwania)."""
+    SearchQuery.objects.filter(id=search_id).update(links_found=count)
+    snapshots.invalidate(search_id)
+    events.publish_progress(search_id)
+
+
+def set_search_status(search_id, status):
+    """Aktualizacja statusu wyszukiwania bez pobierania całego obiektu."""
+    fields = {"status": status}
+    if status in SearchQuery.FINISHED_STATUSES:
+        fields["finished_at"] = timezone.now()
+    SearchQuery.objects.filter(id=search_id).update(**fields)
+    snapshots.invalidate(search_id)
+    events.publish_status(search_id, status)
 
 
 @shared_task
@@ -13,34 +191,207 @@ def perform_search(search_id):
     """
     Asynchroniczne zadanie do wyszukiwania artykułów.
     Wykonuje wyszukiwanie za pomocą Selenium i zapisuje wyniki w bazie danych.
-    
+
     Args:
         search_id: ID zapytania wyszukiwania w bazie danych
     """
     try:
         # Pobranie obiektu wyszukiwania i aktualizacja statusu
         search = SearchQuery.objects.get(id=search_id)
-        search.status = "running"
-        search.save()
-
-        # Wykonanie wyszukiwania za pomocą klienta Selenium
-        results = search_and_find_pdfs(search.query, search.site)
-        
-        # Zapisanie znalezionych artykułów w bazie danych
-        for r in results:
-            FoundArticle.objects.create(
-                search=search,
-                title=r.get("title") or "(no title)",
-                url=r.get("url"),
-                pdf_filename=r.get("pdf_filename"),
-                downloaded=r.get("downloaded", False),
-            )
-        
-        # Aktualizacja statusu na zakończone
-        search.status = "done"
-        search.save()
+        # Czasy etapów wyszukiwania (search/timing.py)
+        with timing.trace(search.id, search.site, timing.task_queue(perform_search.name)), \
+                timing.span("search"):
+            set_search_status(search.id, "running")
+            max_results = search.max_results or settings.SEARCH_DEFAULT_RESULTS
+
+            if settings.SEARCH_FAN_OUT:
+                # Zebranie linków (przeglądarka tylko gdy HTTP nie wystarcza)
+                # i rozdzielenie artykułów na osobne zadania
+                links = find_article_links(
+                    search.query, search.site, max_results, open_driver=get_pool().session,
+                    only_new=search.only_new,
+                )
+                dispatch_articles(search, links)
+                return
+
+            # Wykonanie wyszukiwania sesją wypożyczoną z puli procesu workera;
+            # dodatkowe sesje dla równoległych artykułów pochodzą z tej samej puli
+            pool = get_pool()
+            concurrency = search.concurrency or settings.SEARCH_ARTICLE_CONCURRENCY
+            # Artykuły są zapisywane w bazie danych na bieżąco, partiami
+            writer = ResultWriter(search.id)
+            try:
+                with pool.session() as driver:
+                    search_and_find_pdfs(
+                        search.query, search.site, max_results=max_results, driver=driver,
+                        concurrency=concurrency, pool=pool,
+                        on_links=lambda links: set_links_found(search.id, len(links)),
+                        on_result=writer.add,
+                        profile=search.blocking_profile or None,
+                        render_mode=search.render_mode or None,
+                        only_new=search.only_new,
+                    )
+            finally:
+                # Zapisanie ostatniej partii (także po błędzie - gotowe artykuły nie przepadają)
+                writer.flush()
+
+            # Aktualizacja statusu na zakończone
+            set_search_status(search.id, "done")
     except Exception as exc:
         # W przypadku błędu - aktualizacja statusu i ponowne zgłoszenie wyjątku
-        search.status = "error"
-        search.save()
-        raise exc
\ No newline at end of file
+        set_search_status(search_id, "error")
+        raise exc
+
+
+def dispatch_articles(search, links):
+    """
+    Utworzenie zadania dla każdego artykułu i chordu kończącego wyszukiwanie.
+    Linki prowadzące bezpośrednio do plików PDF trafiają od razu do kolejki pobierania.
+    """
+    set_links_found(search.id, len(links))
+    if not links:
+        set_search_status(search.id, "done")
+        return
+
+    header = []
+    for position, (title, url) in enumerate(links):
+        if urllib.parse.urlparse(url).path.lower().endswith(".pdf"):
+            header.append(download_article.si(search.id, position, title, url, url))
+        else:
+            header.append(render_article.si(
+                search.id, position, title, url, search.site, search.blocking_profile or None,
+                search.render_mode or None,
+            ))
+
+    callback = finalize_search.si(search.id)
+    callback.link_error(fail_search.si(search.id))
+    chord(header)(callback)
+    logger.info("Dispatched %d article tasks for search %s", len(header), search.id)
+
+
+@shared_task(bind=True)
+def render_article(self, search_id, position, title, url, site, profile=None, render_mode=None):
+    """
+    Otwarcie artykułu w przeglądarce i zapisanie go jako PDF (sama treść
+    artykułu lub wydruk całej strony, według trybu render_mode).
+    Jeśli artykuł zawiera link do pliku PDF, zadanie jest zastępowane
+    zadaniem download_article w kolejce pobierania (przeglądarka zostaje zwolniona).
+    """
+    mode = reader.mode_for(site, render_mode)
+    cached = cached_article(title, url, mode)
+    if cached:
+        save_found_article(search_id, position, cached)
+        return
+
+    article = new_article(title, url)
+    pdf_link = None
+
+    try:
+        with timing.trace(search_id, site, timing.task_queue(render_article.name)), \
+                get_pool().session() as driver:
+            pdf_link = find_article_pdf_link(driver, url, site, profile)
+            if not pdf_link:
+                artifact = save_page_as_pdf(driver, title, url, mode)
+                if artifact:
+                    article["artifact"] = artifact.sha256
+                    article["downloaded"] = True
+    except TimeoutException:
+        logger.warning("Timeout loading article: %s", url)
+    except Exception as exc:
+        logger.exception("Error processing article %s: %s", url, str(exc))
+
+    if pdf_link:
+        return self.replace(download_article.si(search_id, position, title, url, pdf_link))
+
+    save_found_article(search_id, position, article)
+
+
+@shared_task
+def download_article(search_id, position, title, url, pdf_url):
+    """Pobranie pliku PDF artykułu zwykłym żądaniem HTTP (bez przeglądarki)."""
+    # Link bezpośrednio do pliku PDF; po render_article pamięć podręczna była już sprawdzona
+    if url == pdf_url:
+        cached = cached_article(title, url, search_render_mode(search_id))
+        if cached:
+            save_found_article(search_id, position, cached)
+            return
+
+    article = new_article(title, url)
+
+    site = urllib.parse.urlparse(url).hostname or ""
+    with timing.trace(search_id, site, timing.task_queue(download_article.name)):
+        artifact = download_pdf(pdf_url)
+    if artifact:
+        article["artifact"] = artifact.sha256
+        article["downloaded"] = True
+        logger.info("Downloaded PDF: %s", artifact.name)
+
+    save_found_article(search_id, position, article)
+
+
+@shared_task
+def finalize_search(search_id):
+    """Oznaczenie wyszukiwania jako zakończonego po przetworzeniu wszystkich artykułów."""
+    set_search_status(search_id, "done")
+
+
+@shared_task
+def fail_search(search_id):
+    """Oznaczenie wyszukiwania jako nieudanego, gdy chord zakończył się błędem."""
+    set_search_status(search_id, "error")
+
+
+@shared_task
+def evict_artifacts():
+    """Okresowe pilnowanie limitu miejsca magazynu artefaktów (Celery beat)."""
+    return lifecycle.run_eviction()
+
+
+@shared_task
+def index_article_text(artifact_id):
+    """Wyodrębnienie tekstu zapisanego pliku do lokalnego indeksu pełnotekstowego."""
+    artifact = Artifact.objects.filter(id=artifact_id).first()
+    if artifact is None:
+        return False
+    return library.index_artifact(artifact) is not None
+
+
+@shared_task
+def refetch_article(article_id):
+    """
+    Ponowne pobranie artykułu, którego plik został usunięty (evicted).
+    Przy tej samej treści przywracany jest dotychczasowy artefakt (wraz ze
+    wszystkimi wskazującymi na niego artykułami), przy innej - artykuł
+    dostaje nowy artefakt, a odwołanie do starego jest zwalniane.
+    """
+    found = FoundArticle.objects.select_related("search").filter(id=article_id).first()
+    if found is None or not found.evicted:
+        return
+
+    if urllib.parse.urlparse(found.url).path.lower().endswith(".pdf"):
+        artifact = download_pdf(found.url)
+        sha256 = artifact.sha256 if artifact else None
+    else:
+        with get_pool().session() as driver:
+            sha256 = process_article(
+                driver, found.title, found.url, found.search.site,
+                profile=found.search.blocking_profile or None,
+                render_mode=found.search.render_mode or None,
+            ).get("artifact")
+
+    if not sha256:
+        logger.warning("Refetch of article %s failed", article_id)
+        return
+
+    artifact = Artifact.objects.get(sha256=sha256)
+    old_artifact_id = found.artifact_id
+    if artifact.id != old_artifact_id:
+        with transaction.atomic():
+            FoundArticle.objects.filter(id=found.id).update(
+                artifact=artifact, evicted=False, downloaded=True
+            )
+            storage.add_reference(artifact.id)
+        if old_artifact_id:
+            storage.release_reference(old_artifact_id)
+        snapshots.invalidate(found.search_id)
+    logger.info("Refetched article %s as %s", article_id, artifact.name)
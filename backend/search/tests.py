@@ -3,10 +3,46 @@ Moduł testów jednostkowych dla aplikacji wyszukiwania.
 Zawiera testy dla widoków i funkcjonalności wyszukiwania.
 """
 
+import os
 import json
-from django.test import TestCase, Client
-from unittest.mock import patch
-from .models import SearchQuery, FoundArticle
+import base64
+import hashlib
+import io
+import socket
+import asyncio
+import time
+import tempfile
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import requests
+from asgiref.sync import async_to_sync
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, SimpleTestCase, Client, override_settings
+from django.utils import timezone
+from selenium.common.exceptions import StaleElementReferenceException, WebDriverException
+from unittest import skipUnless
+from unittest.mock import Mock, patch
+from .models import Artifact, SearchQuery, SearchStageTiming, FoundArticle, SeenUrl, SelectorStat, SiteProfile
+from .driver_pool import DriverPool, PoolExhausted
+from .readiness import get_readiness_steps, wait_for
+from .extraction import extract_links, extract_links_from_html
+from .fixture_site import FixtureConfig, FixtureServer
+from . import (
+    blocking, downloader, library, lifecycle, metrics, ratelimit, reader, render_cache, seen, sites, snapshots,
+    storage, timing,
+)
+from .sites import site_domain
+from .sse import hub, search_events_app
+from .canonical import canonicalize_url, url_hash
+from .selenium_client import (
+    apply_blocking_profile, cached_article, check_block_page, find_article_links, open_next_page,
+    process_article, process_articles, collect_article_links_http, download_pdf, print_page_to_file,
+    save_page_as_pdf, select_article_links,
+)
+from .tasks import ResultWriter, perform_search, save_found_articles, set_search_status
+from config.celery import app as celery_app
 
 
 class SearchViewTests(TestCase):
@@ -26,22 +62,1502 @@ class SearchViewTests(TestCase):
         
         # Przygotowanie danych testowych
         payload = {"query": "chopin", "site": "rzeczpospolita.pl"}
+        pdf = Artifact.objects.create(sha256="d" * 64, ext="pdf")
         fake_results = [
-            {"title": "Article 1", "url": "https://rzeczpospolita.pl/article1", "pdf_filename": "a1.pdf", "downloaded": True},
-            {"title": "Article 2", "url": "https://rzeczpospolita.pl/article2", "pdf_filename": None, "downloaded": False},
+            {"title": "Article 1", "url": "https://rzeczpospolita.pl/article1", "artifact": pdf.sha256, "downloaded": True},
+            {"title": "Article 2", "url": "https://rzeczpospolita.pl/article2", "artifact": None, "downloaded": False},
         ]
+
+        def fake_search(query, site, on_links=None, on_result=None, **kwargs):
+            on_links([(article["title"], article["url"]) for article in fake_results])
+            for position, article in enumerate(fake_results):
+                on_result(position, article)
+            return fake_results
         
-        # Mockowanie funkcji wyszukiwania
-        with patch("search.views.search_and_find_pdfs", return_value=fake_results):
-            # Wysłanie żądania POST
+        # Wysłanie żądania POST - widok tylko zleca zadanie Celery
+        with patch("search.views.perform_search.delay") as delay:
             resp = client.post("/api/search/", data=json.dumps(payload), content_type="application/json")
-            
-            # Sprawdzenie odpowiedzi
-            self.assertEqual(resp.status_code, 200)
-            data = resp.json()
-            self.assertIn("results", data)
-            self.assertEqual(len(data["results"]), 2)
-            
-            # Sprawdzenie czy rekordy zostały utworzone w bazie danych
-            self.assertTrue(SearchQuery.objects.filter(query="chopin").exists())
-            self.assertEqual(FoundArticle.objects.filter(search__query="chopin").count(), 2)
+        self.assertEqual(resp.status_code, 200)
+        data = resp.json()
+        self.assertEqual(data["status"], "pending")
+        delay.assert_called_once_with(data["search_id"])
+
+        # Wykonanie zadania z zamockowaną funkcją wyszukiwania
+        pool = DriverPool(factory=FakeDriver, max_size=1, warm_size=0)
+        with override_settings(SEARCH_FAN_OUT=False), \
+                patch("search.tasks.get_pool", return_value=pool), \
+                patch("search.tasks.search_and_find_pdfs", side_effect=fake_search):
+            perform_search(data["search_id"])
+
+        # Sprawdzenie statusu i wyników
+        status = client.get(f"/api/search/{data['search_id']}/").json()
+        self.assertEqual(status["status"], "done")
+        self.assertEqual(len(status["results"]), 2)
+
+        # Sprawdzenie czy rekordy zostały utworzone w bazie danych
+        self.assertTrue(SearchQuery.objects.filter(query="chopin").exists())
+        self.assertEqual(FoundArticle.objects.filter(search__query="chopin").count(), 2)
+
+
+class FakeDriver:
+    """Minimalny zamiennik WebDrivera używany w testach puli sesji."""
+
+    def __init__(self):
+        self.window_handles = ["main"]
+        self.quit_called = False
+        self.switch_to = self
+        self.command_executor = type("Executor", (), {"_commands": {}})()
+
+    def window(self, handle):
+        pass
+
+    def execute_script(self, script):
+        return 1
+
+    def execute(self, command, params):
+        return {"value": {}}
+
+    def get(self, url):
+        pass
+
+    def quit(self):
+        self.quit_called = True
+
+
+def fake_session(*responses):
+    """Sesja HTTP zwracająca kolejno podane odpowiedzi (lub zgłaszająca wyjątki)."""
+    session = Mock()
+    session.get.side_effect = list(responses)
+    return session
+
+
+def FakeDriverContext():
+    """Menedżer kontekstu zwracający FakeDriver (zamiast sesji z puli)."""
+    return contextlib.nullcontext(FakeDriver())
+
+
+class DriverPoolTests(SimpleTestCase):
+    """
+    Testy puli sesji WebDriver.
+    Sprawdza ponowne użycie sesji i politykę odtwarzania.
+    """
+
+    def test_session_is_reused_between_borrows(self):
+        pool = DriverPool(factory=FakeDriver, max_size=1, warm_size=1)
+        pool.warm()
+        with pool.session() as first:
+            pass
+        with pool.session() as second:
+            pass
+        self.assertIs(first, second)
+        self.assertFalse(first.quit_called)
+
+    def test_session_is_recycled_after_max_uses(self):
+        pool = DriverPool(factory=FakeDriver, max_size=1, warm_size=0, max_uses=1)
+        with pool.session() as first:
+            pass
+        with pool.session() as second:
+            pass
+        self.assertIsNot(first, second)
+        self.assertTrue(first.quit_called)
+
+    def test_acquire_times_out_when_pool_is_exhausted(self):
+        pool = DriverPool(factory=FakeDriver, max_size=1, warm_size=0)
+        pool.acquire()
+        with self.assertRaises(PoolExhausted):
+            pool.acquire(timeout=0.01)
+
+
+class ReadinessTests(SimpleTestCase):
+    """
+    Testy oczekiwania na gotowość strony.
+    """
+
+    def test_wait_returns_as_soon_as_condition_holds(self):
+        calls = []
+
+        def condition(driver):
+            calls.append(1)
+            return len(calls) >= 2
+
+        self.assertTrue(wait_for(FakeDriver(), condition, timeout=5, poll=0.01))
+        self.assertEqual(len(calls), 2)
+
+    def test_wait_is_bounded_by_timeout(self):
+        self.assertFalse(wait_for(FakeDriver(), lambda d: False, timeout=0.05, poll=0.01))
+
+    def test_site_override_replaces_default_steps(self):
+        steps = get_readiness_steps("www.onet.pl", "search")
+        self.assertNotIn("network_idle", [name for name, _, _ in steps])
+        self.assertIn("network_idle", [name for name, _, _ in get_readiness_steps("rp.pl", "search")])
+
+
+class ExtractionTests(SimpleTestCase):
+    """
+    Testy hurtowej ekstrakcji odnośników.
+    """
+
+    def test_all_selectors_are_extracted_in_one_script_call(self):
+        driver = FakeDriver()
+        rows = [["article a", "https://rp.pl/a1", "Tytuł artykułu", True]]
+        with patch.object(driver, "execute_script", return_value=rows) as execute_script:
+            links = extract_links(driver, ["article a", "main h2 a"])
+        execute_script.assert_called_once()
+        self.assertEqual(links[0].href, "https://rp.pl/a1")
+        self.assertTrue(links[0].visible)
+
+
+class ProcessArticlesTests(SimpleTestCase):
+    """
+    Testy równoległego przetwarzania artykułów.
+    """
+
+    def test_results_keep_link_order(self):
+        links = [(f"Artykuł {i}", f"https://rp.pl/{i}") for i in range(6)]
+        pool = DriverPool(factory=FakeDriver, max_size=3, warm_size=0)
+
+        def fake_process(driver, title, url, site, **kwargs):
+            # Wcześniejsze artykuły kończą się później niż następne
+            time.sleep(0.01 * (6 - int(url.rsplit("/", 1)[1])))
+            return {"title": title, "url": url}
+
+        with patch("search.selenium_client.process_article", side_effect=fake_process):
+            results = process_articles(FakeDriver(), links, "rp.pl", concurrency=3, pool=pool)
+        self.assertEqual([r["url"] for r in results], [url for _, url in links])
+
+    def test_site_adapter_is_resolved_once_per_search(self):
+        links = [(f"Artykuł {i}", f"https://rp.pl/{i}") for i in range(3)]
+        adapter = sites.SiteAdapter(domain="rp.pl", consent_selector="#accept")
+        with patch("search.selenium_client.sites.get_adapter") as get_adapter, \
+                patch("search.selenium_client.cached_article", return_value=None), \
+                patch("search.selenium_client.open_page"), \
+                patch("search.selenium_client.WebDriverWait"), \
+                patch("search.selenium_client.wait_until_ready"), \
+                patch("search.selenium_client.check_block_page"), \
+                patch("search.selenium_client.handle_cookie_consent") as consent, \
+                patch("search.selenium_client.find_pdf_link", return_value=(None, "")), \
+                patch("search.selenium_client.save_page_as_pdf", return_value=None):
+            process_articles(FakeDriver(), links, "rp.pl", adapter=adapter)
+
+        get_adapter.assert_not_called()
+        self.assertEqual([c.kwargs["selector"] for c in consent.call_args_list], ["#accept"] * 3)
+
+
+class FanOutTests(TestCase):
+    """
+    Testy podziału wyszukiwania na zadania per artykuł (tryb eager Celery).
+    """
+
+    def setUp(self):
+        celery_app.conf.task_always_eager = True
+        self.addCleanup(setattr, celery_app.conf, "task_always_eager", False)
+
+    @override_settings(SEARCH_FAN_OUT=True)
+    def test_articles_are_saved_in_order_and_search_is_finalized(self):
+        search = SearchQuery.objects.create(query="chopin", site="rp.pl")
+        links = [("Artykuł z PDF", "https://rp.pl/a1"), ("Artykuł HTML", "https://rp.pl/a2")]
+        pool = DriverPool(factory=FakeDriver, max_size=1, warm_size=0)
+        pdf = Artifact.objects.create(sha256="a" * 64, ext="pdf")
+        html = Artifact.objects.create(sha256="b" * 64, ext="html")
+
+        with patch("search.tasks.get_pool", return_value=pool), \
+                patch("search.tasks.find_article_links", return_value=links), \
+                patch("search.tasks.find_article_pdf_link",
+                      side_effect=["https://rp.pl/a1.pdf", None]), \
+                patch("search.tasks.download_pdf", return_value=pdf), \
+                patch("search.tasks.save_page_as_pdf", return_value=html):
+            perform_search.delay(search.id)
+
+        search.refresh_from_db()
+        self.assertEqual(search.status, "done")
+        self.assertEqual(
+            list(search.results.values_list("url", "artifact__sha256")),
+            [("https://rp.pl/a1", "a" * 64), ("https://rp.pl/a2", "b" * 64)],
+        )
+
+
+class FetchStrategyTests(TestCase):
+    """
+    Testy warstwy strategii pobierania wyników (HTTP z Selenium jako zapasem).
+    """
+
+    def fake_response(self, html):
+        resp = type("Response", (), {})()
+        resp.status_code = 200
+        resp.text = html
+        resp.url = "https://www.rp.pl/szukaj?q=chopin"
+        resp.raise_for_status = lambda: None
+        return resp
+
+    def test_static_html_is_used_without_browser(self):
+        html = '<main><h2><a href="/kultura/art1-chopin">Chopin w Warszawie - nowa wystawa</a></h2></main>'
+        open_driver = Mock()
+        with patch("search.downloader.get_session", return_value=fake_session(self.fake_response(html))):
+            links = find_article_links("chopin", "rp.pl", open_driver=open_driver)
+        self.assertEqual(links, [("Chopin w Warszawie - nowa wystawa", "https://www.rp.pl/kultura/art1-chopin")])
+        open_driver.assert_not_called()
+        self.assertEqual(SiteProfile.objects.get(domain="rp.pl").fetch_strategy, SiteProfile.HTTP)
+
+    def test_escalates_to_selenium_and_remembers_strategy(self):
+        links = [("Chopin w Warszawie - nowa wystawa", "https://www.rp.pl/art1")]
+        with patch("search.downloader.get_session",
+                   return_value=fake_session(self.fake_response("<html></html>"))), \
+                patch("search.selenium_client.collect_article_links", return_value=links):
+            self.assertEqual(find_article_links("chopin", "rp.pl", open_driver=FakeDriverContext), links)
+        self.assertEqual(SiteProfile.objects.get(domain="rp.pl").fetch_strategy, SiteProfile.SELENIUM)
+
+        with patch("search.downloader.get_session") as get_session, \
+                patch("search.selenium_client.collect_article_links", return_value=links):
+            find_article_links("chopin", "rp.pl", open_driver=FakeDriverContext)
+        get_session.assert_not_called()
+
+    def test_navigation_links_do_not_count_as_http_success(self):
+        SiteProfile.objects.create(domain="rp.pl", fetch_strategy=SiteProfile.HTTP)
+        html = '<nav><a href="https://www.rp.pl/kraj/art1-polityka">Najnowsze wiadomości z kraju i świata</a></nav>'
+        open_driver = Mock(return_value=FakeDriverContext())
+        with patch("search.downloader.get_session", return_value=fake_session(self.fake_response(html))), \
+                patch("search.selenium_client.collect_article_links", return_value=[]):
+            self.assertEqual(find_article_links("chopin", "rp.pl", open_driver=open_driver), [])
+        open_driver.assert_called_once()
+        self.assertEqual(SiteProfile.objects.get(domain="rp.pl").fetch_strategy, SiteProfile.AUTO)
+
+
+class FakeStreamResponse:
+    """Odpowiedź HTTP strumieniująca podane fragmenty, opcjonalnie przerwana błędem."""
+
+    def __init__(self, status_code, chunks, fail_after=None, headers=None):
+        self.status_code = status_code
+        self.chunks = chunks
+        self.fail_after = fail_after
+        self.headers = headers or {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size):
+        for i, chunk in enumerate(self.chunks):
+            if i == self.fail_after:
+                raise requests.exceptions.ChunkedEncodingError("connection reset")
+            yield chunk
+
+
+@override_settings(DOWNLOAD_BACKOFF_BASE=0)
+class DownloaderTests(SimpleTestCase):
+    """
+    Testy silnika pobierania (ponowienia, wznawianie Range, zapis atomowy).
+    """
+
+    def test_interrupted_download_is_resumed_with_range(self):
+        session = fake_session(
+            FakeStreamResponse(200, [b"abc", b"def"], fail_after=1, headers={"ETag": '"v1"'}),
+            FakeStreamResponse(206, [b"def"]),
+        )
+        with tempfile.TemporaryDirectory() as tmp, \
+                patch("search.downloader.get_session", return_value=session):
+            dest = os.path.join(tmp, "a.pdf")
+            self.assertTrue(downloader.download("https://rp.pl/a.pdf", dest))
+            with open(dest, "rb") as fh:
+                self.assertEqual(fh.read(), b"abcdef")
+            self.assertEqual(os.listdir(tmp), ["a.pdf"])
+        resume_headers = session.get.call_args_list[1].kwargs["headers"]
+        self.assertEqual(resume_headers, {"Range": "bytes=3-", "If-Range": '"v1"'})
+
+    def test_failed_download_leaves_no_file(self):
+        session = fake_session(*[FakeStreamResponse(503, []) for _ in range(2)])
+        with tempfile.TemporaryDirectory() as tmp, \
+                patch("search.downloader.get_session", return_value=session):
+            self.assertFalse(downloader.download("https://rp.pl/a.pdf", os.path.join(tmp, "a.pdf"), retries=1))
+            self.assertEqual(os.listdir(tmp), [])
+
+    @override_settings(DOWNLOAD_PER_HOST_LIMIT=1)
+    def test_host_slot_is_free_during_backoff(self):
+        url = "https://backoff.example.pl/a.pdf"
+        session = fake_session(FakeStreamResponse(503, []), FakeStreamResponse(200, [b"%PDF"]))
+        slot_free = []
+
+        def sleep(delay):
+            slot = downloader.host_slot(url)
+            slot_free.append(slot.acquire(blocking=False))
+            if slot_free[-1]:
+                slot.release()
+
+        with tempfile.TemporaryDirectory() as tmp, \
+                patch("search.downloader.get_session", return_value=session), \
+                patch("search.downloader.time.sleep", side_effect=sleep):
+            self.assertTrue(downloader.download(url, os.path.join(tmp, "a.pdf")))
+        self.assertEqual(slot_free, [True])
+
+
+class ArtifactStoreTests(TestCase):
+    """
+    Testy magazynu artefaktów adresowanego treścią.
+    """
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        for name, value in (("ARTICLES_DIR", tmp.name), ("TMP_DIR", tmp.name)):
+            patcher = patch.object(storage, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_identical_content_is_stored_once(self):
+        first = storage.put_bytes(b"%PDF-1.4 same", "pdf")
+        second = storage.put_bytes(b"%PDF-1.4 same", "pdf")
+        self.assertEqual(first.id, second.id)
+        self.assertTrue(os.path.exists(storage.blob_path(first.sha256, "pdf")))
+        self.assertEqual(Artifact.objects.count(), 1)
+
+    def test_blob_is_removed_with_last_reference(self):
+        artifact = storage.put_bytes(b"%PDF-1.4 shared", "pdf")
+        search = SearchQuery.objects.create(query="chopin", site="rp.pl")
+        for i in range(2):
+            FoundArticle.objects.create(search=search, title=f"A{i}", url="https://rp.pl/a", artifact=artifact)
+            storage.add_reference(artifact.id)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            search.results.first().delete()
+        self.assertTrue(os.path.exists(storage.blob_path(artifact.sha256, "pdf")))
+        with self.captureOnCommitCallbacks(execute=True):
+            search.delete()
+        self.assertFalse(os.path.exists(storage.blob_path(artifact.sha256, "pdf")))
+        self.assertFalse(Artifact.objects.exists())
+
+    def test_file_stored_again_before_removal_commits_is_kept(self):
+        artifact = storage.put_bytes(b"%PDF-1.4 race", "pdf")
+        storage.add_reference(artifact.id)
+        with self.captureOnCommitCallbacks() as callbacks:
+            storage.release_reference(artifact.id)
+
+        # Ta sama treść zapisana, zanim usunięcie pliku zostało wykonane
+        again = storage.put_bytes(b"%PDF-1.4 race", "pdf")
+        for callback in callbacks:
+            callback()
+        self.assertNotEqual(again.id, artifact.id)
+        self.assertFalse(again.evicted)
+        self.assertTrue(os.path.exists(storage.blob_path(again.sha256, "pdf")))
+
+
+class RenderCacheTests(TestCase):
+    """
+    Testy pamięci podręcznej wyrenderowanych artykułów.
+    """
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        for name, value in (("ARTICLES_DIR", tmp.name), ("TMP_DIR", tmp.name)):
+            patcher = patch.object(storage, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        patcher = patch("search.render_cache.metrics.incr")
+        self.incr = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(render_cache.cache.clear)
+
+    def test_canonical_url_drops_tracking_params_and_fragment(self):
+        self.assertEqual(
+            canonicalize_url("HTTPS://WWW.Rp.pl:443/a?utm_source=x&b=2&a=1&fbclid=y#top"),
+            "https://www.rp.pl/a?a=1&b=2",
+        )
+
+    def test_cached_article_skips_browser(self):
+        artifact = storage.put_bytes(b"%PDF-1.4 cached", "pdf")
+        render_cache.store("https://rp.pl/a?utm_medium=email", artifact, reader.READER)
+        driver = Mock()
+
+        article = process_article(driver, "A", "https://RP.pl/a#comments", "rp.pl")
+
+        self.assertEqual(article["artifact"], artifact.sha256)
+        self.assertTrue(article["downloaded"])
+        driver.get.assert_not_called()
+        self.incr.assert_called_once_with("render_cache_hits_total")
+
+    def test_entry_for_missing_blob_is_a_miss(self):
+        artifact = storage.put_bytes(b"%PDF-1.4 gone", "pdf")
+        render_cache.store("https://rp.pl/b", artifact, reader.READER)
+        os.remove(storage.blob_path(artifact.sha256, "pdf"))
+
+        self.assertIsNone(render_cache.lookup("https://rp.pl/b", reader.READER))
+        self.incr.assert_called_once_with("render_cache_misses_total")
+
+    @override_settings(SEARCH_RENDER_MODE="reader", SITE_RENDER_MODES={})
+    def test_reader_render_is_not_returned_for_full_mode(self):
+        artifact = storage.put_bytes(b"%PDF-1.4 reader", "pdf")
+        render_cache.store("https://rp.pl/c", artifact, reader.mode_for("rp.pl"))
+
+        self.assertIsNone(cached_article("C", "https://rp.pl/c", reader.FULL))
+        self.assertEqual(cached_article("C", "https://rp.pl/c", reader.READER)["artifact"], artifact.sha256)
+
+
+class CoalescingTests(TestCase):
+    """
+    Testy łączenia identycznych wyszukiwań.
+    """
+
+    def setUp(self):
+        self.client = Client()
+        patcher = patch("search.views.perform_search")
+        self.perform_search = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def post(self, query, site, **options):
+        response = self.client.post(
+            "/api/search/", data=json.dumps({"query": query, "site": site, **options}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_identical_search_in_flight_is_joined(self):
+        first = self.post("Chopin  Konkurs", "rp.pl")
+        second = self.post("chopin konkurs", "https://www.rp.pl/")
+
+        self.assertEqual(second["search_id"], first["search_id"])
+        self.assertTrue(second["reused"])
+        self.perform_search.delay.assert_called_once_with(first["search_id"])
+
+    def test_finished_search_is_served_within_freshness_window(self):
+        first = self.post("chopin", "rp.pl")
+        set_search_status(first["search_id"], "done")
+
+        self.assertEqual(self.post("chopin", "rp.pl")["status"], "done")
+        with override_settings(SEARCH_CACHE_TTL=0):
+            self.assertNotEqual(self.post("chopin", "rp.pl")["search_id"], first["search_id"])
+
+    @override_settings(SEARCH_DEFAULT_RESULTS=20)
+    def test_search_with_smaller_limit_is_not_reused_for_default_limit(self):
+        first = self.post("chopin", "rp.pl", max_results=1)
+        set_search_status(first["search_id"], "done")
+
+        default = self.post("chopin", "rp.pl")
+        self.assertFalse(default["reused"])
+        self.assertNotEqual(default["search_id"], first["search_id"])
+        self.assertEqual(self.post("chopin", "rp.pl", max_results=1)["search_id"], default["search_id"])
+
+    @override_settings(
+        SEARCH_RENDER_MODE="reader", SITE_RENDER_MODES={},
+        SEARCH_BLOCKING_PROFILE="standard", SITE_BLOCKING_PROFILES={},
+    )
+    def test_search_with_other_render_mode_or_blocking_profile_is_not_reused(self):
+        first = self.post("chopin", "rp.pl")
+        set_search_status(first["search_id"], "done")
+
+        full = self.post("chopin", "rp.pl", render_mode="full")
+        self.assertFalse(full["reused"])
+        self.assertNotEqual(full["search_id"], first["search_id"])
+        aggressive = self.post("chopin", "rp.pl", blocking_profile="aggressive")
+        self.assertFalse(aggressive["reused"])
+        # Jawnie podany tryb domyślny daje ten sam wynik co brak trybu
+        self.assertEqual(self.post("chopin", "rp.pl", render_mode="reader")["search_id"], first["search_id"])
+
+
+class IncrementalPersistenceTests(TestCase):
+    """
+    Testy zapisu wyników w trakcie wyszukiwania.
+    """
+
+    @override_settings(SEARCH_FAN_OUT=False, SEARCH_RESULT_BATCH_SIZE=10, SEARCH_RESULT_FLUSH_INTERVAL=60)
+    def test_results_are_persisted_before_search_ends(self):
+        search = SearchQuery.objects.create(query="chopin", site="rp.pl")
+        pdf = Artifact.objects.create(sha256="c" * 64, ext="pdf")
+        seen = []
+
+        def fake_search(query, site, on_links=None, on_result=None, **kwargs):
+            on_links([("A", "https://rp.pl/a"), ("B", "https://rp.pl/b"), ("C", "https://rp.pl/c")])
+            on_result(1, {"title": "B", "url": "https://rp.pl/b", "artifact": pdf.sha256, "downloaded": True})
+            # Pierwszy wynik jest w bazie, zanim przetworzono kolejne artykuły
+            seen.append(search.results.count())
+            on_result(0, {"title": "A", "url": "https://rp.pl/a", "artifact": None, "downloaded": False})
+            raise RuntimeError("worker lost")
+
+        pool = DriverPool(factory=FakeDriver, max_size=1, warm_size=0)
+        with patch("search.tasks.get_pool", return_value=pool), \
+                patch("search.tasks.search_and_find_pdfs", side_effect=fake_search):
+            with self.assertRaises(RuntimeError):
+                perform_search(search.id)
+
+        search.refresh_from_db()
+        self.assertEqual(seen, [1])
+        self.assertEqual(search.status, "error")
+        self.assertEqual(list(search.results.values_list("title", flat=True)), ["A", "B"])
+        self.assertEqual(
+            (search.links_found, search.articles_processed, search.articles_downloaded), (3, 2, 1)
+        )
+        pdf.refresh_from_db()
+        self.assertEqual(pdf.ref_count, 1)
+
+
+class ResultWriterTests(SimpleTestCase):
+    """
+    Testy bufora zapisu wyników wyszukiwania.
+    """
+
+    def test_buffered_result_is_saved_after_interval_without_new_results(self):
+        saved = []
+        with patch("search.tasks.save_found_articles", side_effect=lambda search_id, batch: saved.append(batch)):
+            writer = ResultWriter(1, batch_size=10, flush_interval=0.05)
+            writer.add(0, {"title": "A"})
+            writer.add(1, {"title": "B"})
+            self.assertEqual(len(saved), 1)
+
+            deadline = time.monotonic() + 2
+            while len(saved) < 2 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            writer.flush()
+
+        self.assertEqual(saved, [[(0, {"title": "A"})], [(1, {"title": "B"})]])
+
+
+class SearchEventsTests(TestCase):
+    """
+    Testy strumienia zdarzeń wyszukiwania (SSE).
+    """
+
+    def run_app(self, search_id, events=()):
+        sent = []
+
+        async def run():
+            queue = asyncio.Queue()
+            for event in events:
+                queue.put_nowait(event)
+
+            async def receive():
+                await asyncio.sleep(3600)
+
+            async def send(message):
+                sent.append(message)
+
+            with patch.object(hub, "subscribe", return_value=queue):
+                await search_events_app(
+                    {"type": "http", "path": f"/api/search/{search_id}/events/"}, receive, send
+                )
+
+        async_to_sync(run)()
+        return sent[0]["status"], b"".join(m.get("body", b"") for m in sent[1:]).decode()
+
+    def test_finished_search_sends_snapshot_and_closes(self):
+        search = SearchQuery.objects.create(query="chopin", site="rp.pl", status="done")
+        FoundArticle.objects.create(search=search, title="A", url="https://rp.pl/a")
+
+        status, body = self.run_app(search.id)
+
+        self.assertEqual(status, 200)
+        self.assertTrue(body.startswith("event: snapshot\ndata: "))
+        self.assertEqual(json.loads(body.split("data: ", 1)[1])["results"][0]["title"], "A")
+
+    def test_events_are_forwarded_until_search_finishes(self):
+        search = SearchQuery.objects.create(query="chopin", site="rp.pl", status="running")
+        events = [
+            {"event": "result", "data": {"id": 1, "title": "A"}},
+            {"event": "status", "data": {"status": "done"}},
+            {"event": "result", "data": {"id": 2, "title": "B"}},
+        ]
+
+        status, body = self.run_app(search.id, events)
+
+        self.assertEqual(
+            [line for line in body.splitlines() if line.startswith("event:")],
+            ["event: snapshot", "event: result", "event: status"],
+        )
+
+    def test_snapshot_is_shared_with_status_endpoint(self):
+        self.addCleanup(render_cache.cache.clear)
+        search = SearchQuery.objects.create(query="chopin", site="rp.pl", status="done")
+        with patch("search.snapshots.current_version", return_value=1), patch("search.views.metrics"):
+            polled = Client().get(f"/api/search/{search.id}/").json()
+            with self.assertNumQueries(0):
+                _, body = self.run_app(search.id)
+
+        self.assertEqual(json.loads(body.split("data: ", 1)[1]), polled)
+
+    def test_unknown_search_returns_404(self):
+        status, _ = self.run_app(999999)
+        self.assertEqual(status, 404)
+
+
+class StatusSnapshotTests(TestCase):
+    """
+    Testy buforowanych migawek endpointu statusu.
+    """
+
+    def setUp(self):
+        self.client = Client()
+        self.addCleanup(render_cache.cache.clear)
+        self.version = 1
+        patcher = patch("search.snapshots.current_version", side_effect=lambda search_id: self.version)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = patch("search.views.metrics")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_unchanged_poll_returns_304_without_queries(self):
+        search = SearchQuery.objects.create(query="chopin", site="rp.pl", status="running")
+        url = f"/api/search/{search.id}/"
+        first = self.client.get(url)
+        self.assertEqual(first.status_code, 200)
+
+        with self.assertNumQueries(0):
+            second = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(second.status_code, 304)
+
+        # Zapis zwiększa wersję - migawka jest budowana od nowa
+        FoundArticle.objects.create(search=search, title="A", url="https://rp.pl/a")
+        self.version = 2
+        third = self.client.get(url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(third.status_code, 200)
+        self.assertNotEqual(third["ETag"], first["ETag"])
+        self.assertEqual(third.json()["results"][0]["title"], "A")
+
+
+class FakeKeyRedis:
+    """Minimalny Redis z kluczami tekstowymi (SET NX, GET); wygaśnięcie klucza to jego usunięcie."""
+
+    def __init__(self):
+        self.keys = {}
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.keys:
+            return None
+        self.keys[key] = str(value).encode()
+        return True
+
+    def get(self, key):
+        return self.keys.get(key)
+
+    def pipeline(self, transaction=True):
+        redis = self
+
+        class Pipeline:
+            results = []
+
+            def __getattr__(self, name):
+                return lambda *args, **kwargs: self.results.append(getattr(redis, name)(*args, **kwargs))
+
+            def execute(self):
+                return self.results
+
+        return Pipeline()
+
+
+class SnapshotVersionTests(TestCase):
+    """
+    Testy wersji migawek stanu wyszukiwania.
+    """
+
+    def setUp(self):
+        self.addCleanup(render_cache.cache.clear)
+        self.redis = FakeKeyRedis()
+        patcher = patch("search.snapshots.get_redis", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_expired_version_does_not_serve_stale_snapshot(self):
+        search = SearchQuery.objects.create(query="chopin", site="rp.pl", status="running")
+        snapshots.invalidate(search.id)
+        first, _ = snapshots.get_snapshot(search.id)
+        self.assertTrue(snapshots.get_snapshot(search.id)[1])
+
+        # Klucz wersji wygasa, a migawka nadal jest w pamięci podręcznej
+        del self.redis.keys[snapshots.version_key(search.id)]
+        set_search_status(search.id, "done")
+        snapshot, hit = snapshots.get_snapshot(search.id)
+
+        self.assertFalse(hit)
+        self.assertEqual(json.loads(snapshot["body"])["status"], "done")
+        self.assertNotEqual(snapshot["etag"], first["etag"])
+
+        del self.redis.keys[snapshots.version_key(search.id)]
+        self.assertFalse(snapshots.get_snapshot(search.id)[1])
+
+
+class FileServingTests(TestCase):
+    """
+    Testy wydawania plików artykułów (walidatory, 304, X-Accel-Redirect).
+    """
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        articles_dir = os.path.join(tmp.name, "articles")
+        for name, value in (("ARTICLES_DIR", articles_dir), ("TMP_DIR", tmp.name)):
+            patcher = patch.object(storage, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        media = override_settings(MEDIA_ROOT=tmp.name)
+        media.enable()
+        self.addCleanup(media.disable)
+
+        self.client = Client()
+        self.artifact = storage.put_bytes(b"%PDF-1.4 serve", "pdf")
+        self.url = f"/api/files/{self.artifact.name}"
+
+    def test_django_mode_sends_validators_and_honours_if_none_match(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), b"%PDF-1.4 serve")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertTrue(response.has_header("Last-Modified"))
+
+        cached = self.client.get(self.url, HTTP_IF_NONE_MATCH=response["ETag"])
+        self.assertEqual(cached.status_code, 304)
+
+    @override_settings(FILE_SERVE_MODE="nginx")
+    def test_nginx_mode_delegates_bytes_to_nginx(self):
+        response = self.client.get(self.url)
+        sha = self.artifact.sha256
+        self.assertEqual(
+            response["X-Accel-Redirect"], f"/protected-media/articles/{sha[:2]}/{sha[2:4]}/{sha}.pdf"
+        )
+        self.assertEqual(response.content, b"")
+        self.assertIn("attachment", response["Content-Disposition"])
+
+
+class EvictionTests(TestCase):
+    """
+    Testy limitu miejsca i usuwania plików (LRU).
+    """
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        for name, value in (("ARTICLES_DIR", tmp.name), ("TMP_DIR", tmp.name)):
+            patcher = patch.object(storage, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.search = SearchQuery.objects.create(query="chopin", site="rp.pl")
+
+    def store(self, data, accessed_days_ago):
+        artifact = storage.put_bytes(data, "pdf")
+        Artifact.objects.filter(id=artifact.id).update(
+            last_accessed_at=timezone.now() - timedelta(days=accessed_days_ago)
+        )
+        article = FoundArticle.objects.create(
+            search=self.search, title="A", url="https://rp.pl/a", artifact=artifact, downloaded=True
+        )
+        storage.add_reference(artifact.id)
+        return artifact, article
+
+    @override_settings(ARTICLES_QUOTA_BYTES=150, ARTICLES_EVICTION_TARGET=1.0, ARTICLES_MAX_IDLE_DAYS=0)
+    def test_legacy_files_are_moved_into_storage_and_counted(self):
+        legacy_path = os.path.join(storage.ARTICLES_DIR, "Most_na_Wisle.pdf")
+        with open(legacy_path, "wb") as fh:
+            fh.write(b"%PDF-1.4 " + b"l" * 91)
+        stray_path = os.path.join(storage.ARTICLES_DIR, "stary_plik.pdf")
+        with open(stray_path, "wb") as fh:
+            fh.write(b"%PDF-1.4 stray")
+        os.utime(stray_path, (0, 0))
+        legacy = FoundArticle.objects.create(
+            search=self.search, title="Most", url="https://rp.pl/most",
+            pdf_filename="Most_na_Wisle.pdf", downloaded=True,
+        )
+        self.store(b"z" * 100, accessed_days_ago=1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            lifecycle.run_eviction()
+
+        legacy.refresh_from_db()
+        self.assertIsNone(legacy.pdf_filename)
+        self.assertEqual((legacy.artifact.size, legacy.artifact.ref_count), (100, 1))
+        self.assertFalse(os.path.exists(legacy_path))
+        self.assertFalse(os.path.exists(stray_path))
+        # Przeniesiony plik liczy się do limitu: dwa pliki po 100 B przekraczają 150 B
+        self.assertEqual(Artifact.objects.filter(evicted=True).count(), 1)
+
+    @override_settings(ARTICLES_EVICTION_TARGET=1.0, ARTICLES_MAX_IDLE_DAYS=0)
+    def test_least_recently_used_files_are_evicted_over_quota(self):
+        old, old_article = self.store(b"x" * 100, accessed_days_ago=5)
+        recent, _ = self.store(b"y" * 100, accessed_days_ago=1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(lifecycle.enforce_quota(quota=150), 1)
+
+        old_article.refresh_from_db()
+        self.assertTrue(old_article.evicted)
+        self.assertFalse(os.path.exists(storage.blob_path(old.sha256, "pdf")))
+        self.assertTrue(os.path.exists(storage.blob_path(recent.sha256, "pdf")))
+
+    def test_evicted_file_returns_410_and_refetch_restores_it(self):
+        artifact, article = self.store(b"%PDF-1.4 evict", accessed_days_ago=0)
+        with self.captureOnCommitCallbacks(execute=True):
+            lifecycle.evict_artifact(artifact)
+        self.assertFalse(os.path.exists(storage.blob_path(artifact.sha256, "pdf")))
+
+        with patch("search.views.refetch_article") as refetch:
+            response = Client().get(f"/api/files/{artifact.name}")
+        self.assertEqual(response.status_code, 410)
+        refetch.delay.assert_called_once_with(article.id)
+
+        # Ta sama treść pobrana ponownie przywraca artefakt i artykuł
+        storage.put_bytes(b"%PDF-1.4 evict", "pdf")
+        article.refresh_from_db()
+        self.assertFalse(article.evicted)
+        self.assertEqual(Client().get(f"/api/files/{artifact.name}").status_code, 200)
+
+    def test_eviction_does_not_remove_file_restored_before_commit(self):
+        artifact, _ = self.store(b"%PDF-1.4 restored", accessed_days_ago=0)
+        with self.captureOnCommitCallbacks() as callbacks:
+            lifecycle.evict_artifact(artifact)
+
+        storage.put_bytes(b"%PDF-1.4 restored", "pdf")
+        for callback in callbacks:
+            callback()
+        artifact.refresh_from_db()
+        self.assertFalse(artifact.evicted)
+        self.assertTrue(os.path.exists(storage.blob_path(artifact.sha256, "pdf")))
+
+
+class RateLimitTests(SimpleTestCase):
+    """
+    Testy ograniczania tempa żądań do serwisów.
+    """
+
+    def test_subdomains_share_the_site_bucket(self):
+        self.assertEqual(ratelimit.rate_domain("https://wiadomosci.onet.pl/kraj/a"), "onet.pl")
+        self.assertEqual(ratelimit.rate_domain("https://www.example.com/a.pdf"), "example.com")
+
+    def test_block_page_is_reported_and_not_saved(self):
+        driver = Mock()
+        driver.execute_script.return_value = ["Attention Required! | Cloudflare", False]
+        with patch("search.ratelimit.report_block") as report_block:
+            with self.assertRaises(ratelimit.BlockedError):
+                check_block_page(driver, "https://www.rp.pl/a")
+        report_block.assert_called_once_with("https://www.rp.pl/a")
+
+    def test_challenge_form_is_a_block_page(self):
+        html = (
+            '<html><head><title>Just a moment...</title></head><body>'
+            '<form id="challenge-form" action="/cdn-cgi/challenge-platform"></form></body></html>'
+        )
+        self.assertTrue(ratelimit.is_block_html(html))
+        self.assertTrue(ratelimit.is_block_html(html.replace("Just a moment...", "rp.pl")))
+
+    def test_results_page_with_recaptcha_is_not_a_block_page(self):
+        html = (
+            '<html><head><title>Wyniki wyszukiwania | rp.pl</title>'
+            '<script src="https://www.google.com/recaptcha/api.js"></script>'
+            '<script>var blocked = "Access denied"; window.captchaReady = true;</script></head><body>'
+            '<div class="search-results"><article class="teaser"><a href="/kraj/a">Artykuł</a></article></div>'
+            '<form action="/newsletter"><div class="g-recaptcha" data-sitekey="x"></div></form>'
+            '<iframe src="https://www.google.com/recaptcha/api2/anchor?size=invisible"></iframe>'
+            '</body></html>'
+        )
+        self.assertFalse(ratelimit.is_block_html(html))
+
+    def test_query_with_marker_word_is_not_a_block_page(self):
+        html = '<html><head><title>Wyniki: Access Denied</title></head><body><p>captcha</p></body></html>'
+        self.assertFalse(ratelimit.is_block_html(html, "access denied"))
+        self.assertTrue(ratelimit.is_block_html(html, "sejm"))
+
+        driver = Mock()
+        driver.execute_script.return_value = ["Szukaj: captcha - Onet", False]
+        with patch("search.ratelimit.report_block") as report_block:
+            check_block_page(driver, "https://szukaj.onet.pl/?q=captcha", "captcha")
+        report_block.assert_not_called()
+
+    @override_settings(DOWNLOAD_BACKOFF_BASE=0)
+    def test_throttled_download_slows_domain_down(self):
+        session = fake_session(
+            FakeStreamResponse(429, [], headers={"Retry-After": "3"}),
+            FakeStreamResponse(200, [b"%PDF"]),
+        )
+        dest = os.path.join(tempfile.mkdtemp(), "a.pdf")
+        with patch("search.downloader.get_session", return_value=session), \
+                patch("search.ratelimit.acquire") as acquire, \
+                patch("search.ratelimit.report_block") as report_block:
+            self.assertTrue(downloader.download("https://rp.pl/a.pdf", dest))
+        report_block.assert_called_once_with("https://rp.pl/a.pdf", "3")
+        self.assertEqual(acquire.call_count, 2)
+
+
+class BlockingProfileTests(SimpleTestCase):
+    """
+    Testy profili blokowania zasobów.
+    """
+
+    @override_settings(SITE_BLOCKING_PROFILES={"onet.pl": "aggressive"})
+    def test_profile_is_sent_once_per_session_and_site_override_applies(self):
+        driver = FakeDriver()
+        with patch("search.selenium_client.execute_cdp") as execute_cdp:
+            apply_blocking_profile(driver, "www.onet.pl")
+            apply_blocking_profile(driver, "onet.pl")
+
+        blocked = execute_cdp.call_args_list[-1].args[2]["urls"]
+        self.assertEqual(execute_cdp.call_count, 2)
+        self.assertIn("*.jpg*", blocked)
+        self.assertIn("*doubleclick.net*", blocked)
+
+    def test_none_profile_blocks_nothing(self):
+        self.assertEqual(blocking.blocked_urls("rp.pl", "none"), [])
+
+
+ARTICLE_PAGE = """
+<html><head><title>Portal</title>
+<meta property="og:title" content="Nowy most na Wiśle">
+<meta name="author" content="Jan Kowalski">
+</head><body>
+<header><nav><a href="/">Strona główna</a></nav></header>
+<div class="ad-slot"><p>Kup teraz! Promocja tygodnia.</p></div>
+<article>
+  <h1>Nowy most na Wiśle</h1>
+  <span class="author">Jan Kowalski</span>
+  <figure><img data-src="/img/most.jpg" src="data:image/gif;base64,R0lGOD"><figcaption>Most</figcaption></figure>
+  <div class="content">
+    <p>%s</p>
+    <p>%s</p>
+    <div class="related-articles"><p>Zobacz też: inne artykuły</p></div>
+  </div>
+</article>
+<section id="comments"><p>Świetny tekst!</p></section>
+<script>track();</script>
+</body></html>
+""" % ("Budowa mostu potrwa trzy lata. " * 12, "Koszt inwestycji wyniesie miliard złotych. " * 10)
+
+
+@override_settings(READER_MIN_TEXT_LENGTH=200)
+class ReaderModeTests(SimpleTestCase):
+    """
+    Testy trybu czytania (PDF z samej treści artykułu).
+    """
+
+    def test_article_content_is_extracted_without_page_chrome(self):
+        article = reader.extract_article(ARTICLE_PAGE, "https://www.rp.pl/kraj/most")
+
+        self.assertEqual(article.title, "Nowy most na Wiśle")
+        self.assertEqual(article.byline, "Jan Kowalski")
+        self.assertEqual(article.images, ["https://www.rp.pl/img/most.jpg"])
+        self.assertIn("Budowa mostu potrwa", article.body)
+        for noise in ("Strona główna", "Promocja", "Zobacz też", "Świetny tekst", "track()", "Jan Kowalski"):
+            self.assertNotIn(noise, article.body)
+
+    def test_page_without_enough_text_is_not_extracted(self):
+        self.assertIsNone(reader.extract_article("<html><body><p>Galeria</p></body></html>", "https://rp.pl/"))
+
+    def test_reader_mode_skips_full_page_print(self):
+        driver = Mock(page_source=ARTICLE_PAGE)
+        with patch("search.reader.render_pdf", return_value=b"%PDF-reader") as render_pdf, \
+                patch("search.storage.put_bytes") as put_bytes:
+            save_page_as_pdf(driver, "Most", "https://www.rp.pl/kraj/most", reader.READER)
+
+        render_pdf.assert_called_once()
+        put_bytes.assert_called_once_with(b"%PDF-reader", "pdf")
+        driver.execute_cdp_cmd.assert_not_called()
+
+    def test_local_and_internal_images_are_not_fetched(self):
+        page = ARTICLE_PAGE.replace('<figcaption>', '<img src="file:///etc/passwd"><figcaption>')
+        self.assertEqual(reader.extract_article(page, "https://www.rp.pl/kraj/most").images,
+                         ["https://www.rp.pl/img/most.jpg"])
+
+        def resolve(host, port, **kwargs):
+            address = {"www.rp.pl": "93.184.216.34", "redis": "172.18.0.3"}.get(host, "127.0.0.1")
+            return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (address, port))]
+
+        session = Mock()
+        session.get.return_value = Mock(is_redirect=False, content=b"GIF89a", headers={"Content-Type": "image/gif"})
+        fetch = reader.resource_fetcher("rp.pl")
+        with patch("search.reader.socket.getaddrinfo", side_effect=resolve), \
+                patch("search.downloader.get_session", return_value=session), \
+                patch("search.ratelimit.acquire") as acquire:
+            for url in ("file:///etc/passwd", "http://redis:6379/", "http://localhost/a.png",
+                        "http://169.254.169.254/latest/meta-data/", "https://www.rp.pl/ads.doubleclick.net/a.png"):
+                with self.assertRaises(ValueError):
+                    fetch(url)
+            self.assertEqual(fetch("https://www.rp.pl/img/most.gif")["string"], b"GIF89a")
+
+            session.get.return_value = Mock(is_redirect=True, headers={"Location": "http://redis/x.png"})
+            with self.assertRaises(ValueError):
+                fetch("https://www.rp.pl/img/redirect.gif")
+        acquire.assert_any_call("https://www.rp.pl/img/most.gif")
+
+    def test_site_mode_and_search_override(self):
+        with override_settings(SITE_RENDER_MODES={"onet.pl": "full"}, SEARCH_RENDER_MODE="reader"):
+            self.assertEqual(reader.mode_for("www.onet.pl"), "full")
+            self.assertEqual(reader.mode_for("rp.pl"), "reader")
+            self.assertEqual(reader.mode_for("onet.pl", "reader"), "reader")
+
+
+class StreamedPrintTests(SimpleTestCase):
+    """
+    Testy strumieniowego wydruku PDF (Page.printToPDF + IO.read).
+    """
+
+    def test_pdf_stream_is_written_in_chunks_and_closed(self):
+        document = b"%PDF-1.7 " + os.urandom(10000)
+        calls = []
+
+        def execute_cdp_cmd(cmd, params):
+            calls.append((cmd, params))
+            if cmd == "Page.printToPDF":
+                return {"stream": "stream-1"}
+            if cmd == "IO.read":
+                offset = sum(1 for c, _ in calls if c == "IO.read") - 1
+                chunk = document[offset * 4096:(offset + 1) * 4096]
+                return {
+                    "data": base64.b64encode(chunk).decode(),
+                    "base64Encoded": True,
+                    "eof": (offset + 1) * 4096 >= len(document),
+                }
+            return {}
+
+        driver = Mock()
+        driver.execute_cdp_cmd.side_effect = execute_cdp_cmd
+        dest = os.path.join(tempfile.mkdtemp(), "page.pdf")
+        sha256 = print_page_to_file(driver, dest, chunk_size=4096)
+
+        with open(dest, "rb") as fh:
+            self.assertEqual(fh.read(), document)
+        self.assertEqual(sha256, hashlib.sha256(document).hexdigest())
+        self.assertEqual(calls[0][1]["transferMode"], "ReturnAsStream")
+        self.assertTrue(all(params["size"] == 4096 for cmd, params in calls if cmd == "IO.read"))
+        self.assertEqual(calls[-1], ("IO.close", {"handle": "stream-1"}))
+
+
+class SiteAdapterTests(TestCase):
+    """
+    Testy rejestru adapterów serwisów i wyuczonej kolejności selektorów.
+    """
+
+    def test_database_profile_overrides_builtin_adapter(self):
+        SiteProfile.objects.create(
+            domain="rp.pl", search_url="https://www.rp.pl/wyniki?fraza={query}",
+            result_selectors=".wynik a\n.wynik-duzy a\n",
+        )
+        adapter = sites.get_adapter("www.rp.pl")
+
+        self.assertEqual(adapter.build_search_url("jan kowalski"), "https://www.rp.pl/wyniki?fraza=jan+kowalski")
+        self.assertEqual(adapter.result_selectors, (".wynik a", ".wynik-duzy a"))
+        self.assertEqual(adapter.sources, ("builtin", "database"))
+        self.assertTrue(sites.get_adapter("onet.pl").js_only)
+
+    def test_selector_that_found_links_is_tried_first(self):
+        html = '<div class="teaser"><a href="/kultura/art1-chopin">Chopin w Warszawie - nowa wystawa</a></div>'
+        calls = []
+
+        def extract(selectors):
+            calls.append(list(selectors))
+            return extract_links_from_html(html, "https://www.example.pl/szukaj", selectors)
+
+        first = select_article_links(extract, "example.pl")
+        calls.clear()
+        second = select_article_links(extract, "example.pl")
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(calls), 1)
+        self.assertLess(len(calls[0]), 4)
+        self.assertIn(".teaser a", calls[0])
+
+    @override_settings(SELECTOR_MAX_MISSES=1)
+    def test_stale_learned_selector_falls_back_to_full_scan(self):
+        SelectorStat.objects.create(domain="example.pl", selector=".old-list a", hits=10)
+        html = '<main><h2><a href="/kraj/art2-most">Nowy most na Wiśle otwarty</a></h2></main>'
+        extract = lambda selectors: extract_links_from_html(html, "https://example.pl/", selectors)
+
+        links = select_article_links(extract, "example.pl")
+
+        self.assertEqual(links, [("Nowy most na Wiśle otwarty", "https://example.pl/kraj/art2-most")])
+        self.assertEqual(SelectorStat.objects.get(selector=".old-list a").misses, 1)
+        self.assertNotIn(".old-list a", sites.learned_selectors("example.pl"))
+
+
+def results_page(first, count, next_href=None):
+    """Strona wyników wyszukiwania z artykułami first..first+count-1 i odnośnikiem do następnej."""
+    items = "".join(
+        f'<h2><a href="/kraj/art{i}-wiadomosc">Artykuł numer {i} o ważnych sprawach</a></h2>'
+        for i in range(first, first + count)
+    )
+    pager = f'<a rel="next" href="{next_href}">Dalej</a>' if next_href else ""
+    resp = type("Response", (), {})()
+    resp.status_code = 200
+    resp.text = f"<main>{items}</main>{pager}"
+    resp.url = "https://www.example.pl/szukaj?q=most"
+    resp.raise_for_status = lambda: None
+    return resp
+
+
+class PaginationTests(TestCase):
+    """
+    Testy zbierania linków z kolejnych stron wyników.
+    """
+
+    def test_links_are_collected_across_pages_until_enough(self):
+        session = fake_session(
+            results_page(0, 4, "/szukaj?q=most&strona=2"),
+            results_page(4, 4, "/szukaj?q=most&strona=3"),
+            results_page(8, 4, "/szukaj?q=most&strona=4"),
+        )
+        with patch("search.downloader.get_session", return_value=session):
+            links = collect_article_links_http("most", "example.pl", max_results=6)
+
+        self.assertEqual([url for _, url in links], [f"https://www.example.pl/kraj/art{i}-wiadomosc" for i in range(6)])
+        self.assertEqual(session.get.call_count, 2)
+        self.assertEqual(session.get.call_args.args[0], "https://www.example.pl/szukaj?q=most&strona=2")
+
+    def test_page_without_new_links_stops_crawling(self):
+        session = fake_session(results_page(0, 3, "/szukaj?q=most&strona=2"), results_page(0, 3, "/x"))
+        with patch("search.downloader.get_session", return_value=session):
+            links = collect_article_links_http("most", "example.pl", max_results=50)
+
+        self.assertEqual(len(links), 3)
+        self.assertEqual(session.get.call_count, 2)
+
+    def test_javascript_pager_waits_for_results_to_be_replaced(self):
+        stale = []
+
+        def element(**attrs):
+            node = Mock(tag_name="a", **attrs)
+            node.get_attribute.return_value = "javascript:void(0)"
+
+            def is_enabled():
+                if stale:
+                    raise StaleElementReferenceException()
+                return True
+            node.is_enabled.side_effect = is_enabled
+            return node
+
+        pager, result = element(), element()
+        pager.click.side_effect = lambda: stale.append(True)
+        driver = Mock()
+        driver.find_elements.side_effect = lambda by, selector: [result] if "gs-title" in selector else [pager]
+
+        with patch("search.selenium_client.wait_until_ready") as ready:
+            self.assertTrue(open_next_page(driver, "most", "onet.pl", sites.get_adapter("onet.pl"), 2))
+        pager.click.assert_called_once()
+        ready.assert_called_once()
+
+    @override_settings(SEARCH_MAX_RESULTS=100)
+    def test_search_view_accepts_max_results(self):
+        with patch("search.views.perform_search.delay"):
+            response = Client().post(
+                "/api/search/", data=json.dumps({"query": "most", "site": "rp.pl", "max_results": 500}),
+                content_type="application/json",
+            )
+        search = SearchQuery.objects.get(id=response.json()["search_id"])
+        self.assertEqual(search.max_results, 100)
+
+
+class FakeBitmapRedis:
+    """Minimalny Redis z bitmapami (SETBIT/GETBIT w potoku) dla filtra Blooma."""
+
+    def __init__(self):
+        self.bits = set()
+        self.keys = {}
+
+    def exists(self, key):
+        return key in self.keys
+
+    def set(self, key, value, nx=False, ex=None):
+        if nx and key in self.keys:
+            return False
+        self.keys[key] = value
+        return True
+
+    def delete(self, key):
+        self.keys.pop(key, None)
+
+    def pipeline(self, transaction=True):
+        redis, commands = self, []
+        pipe = Mock()
+        pipe.setbit.side_effect = lambda key, pos, value: commands.append(lambda: redis.bits.add(pos))
+        pipe.getbit.side_effect = lambda key, pos: commands.append(lambda: int(pos in redis.bits))
+        pipe.set.side_effect = lambda key, value: commands.append(lambda: redis.set(key, value))
+
+        def execute():
+            results = [command() for command in commands]
+            commands.clear()
+            return results
+
+        pipe.execute.side_effect = execute
+        return pipe
+
+
+class SeenIndexTests(TestCase):
+    """
+    Testy globalnego indeksu widzianych adresów.
+    """
+
+    def test_amp_and_tracking_variants_share_one_key(self):
+        canonical = url_hash("https://www.rp.pl/kraj/art1-most")
+        for variant in (
+            "https://www.rp.pl/kraj/art1-most/amp?utm_source=fb#komentarze",
+            "https://amp.www.rp.pl/kraj/art1-most",
+            "https://www-rp-pl.cdn.ampproject.org/c/s/www.rp.pl/kraj/art1-most",
+            "https://WWW.RP.PL/kraj/art1-most?outputType=amp",
+        ):
+            self.assertEqual(url_hash(variant), canonical, variant)
+
+    def test_bloom_filter_answers_unseen_urls_without_database(self):
+        redis = FakeBitmapRedis()
+        seen.rebuild_bloom(redis)
+        with patch("search.seen.get_redis", return_value=redis):
+            seen.mark_seen(["https://rp.pl/a?utm_medium=x"])
+            with self.assertNumQueries(0):
+                self.assertEqual(seen.unseen(["https://rp.pl/b", "https://rp.pl/c"]),
+                                 ["https://rp.pl/b", "https://rp.pl/c"])
+            self.assertEqual(seen.unseen(["https://rp.pl/a", "https://rp.pl/b"]), ["https://rp.pl/b"])
+
+    def test_lost_filter_is_rebuilt_from_database(self):
+        seen.mark_seen(["https://rp.pl/a"])
+        with patch("search.seen.get_redis", return_value=FakeBitmapRedis()):
+            self.assertEqual(seen.unseen(["https://rp.pl/a", "https://rp.pl/b"]), ["https://rp.pl/b"])
+
+    def test_only_new_skips_known_articles_and_reads_further_pages(self):
+        seen.mark_seen([f"https://www.example.pl/kraj/art{i}-wiadomosc" for i in range(3)])
+        session = fake_session(results_page(0, 4, "/szukaj?q=most&strona=2"), results_page(4, 4))
+        with patch("search.downloader.get_session", return_value=session):
+            links = collect_article_links_http("most", "example.pl", max_results=3, only_new=True)
+
+        self.assertEqual([url for _, url in links], [f"https://www.example.pl/kraj/art{i}-wiadomosc" for i in (3, 4, 5)])
+        self.assertEqual(SeenUrl.objects.count(), 3)
+
+    def test_only_saved_articles_are_marked_seen(self):
+        search = SearchQuery.objects.create(query="most", site="rp.pl")
+        artifact = Artifact.objects.create(sha256="d" * 64, ext="pdf")
+        with patch("search.seen.get_redis", return_value=FakeBitmapRedis()):
+            save_found_articles(search.id, [
+                (0, {"title": "A", "url": "https://rp.pl/a", "artifact": artifact.sha256, "downloaded": True}),
+                (1, {"title": "B", "url": "https://rp.pl/b", "artifact": None, "downloaded": False}),
+            ])
+            self.assertEqual(seen.unseen(["https://rp.pl/a", "https://rp.pl/b"]), ["https://rp.pl/b"])
+
+
+@skipUnless(connection.vendor == "postgresql", "Wyszukiwanie pełnotekstowe wymaga PostgreSQL")
+class LibraryTests(TestCase):
+    """
+    Testy lokalnej biblioteki artykułów (wyszukiwanie pełnotekstowe).
+    """
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        for name, value in (("ARTICLES_DIR", tmp.name), ("TMP_DIR", tmp.name)):
+            patcher = patch.object(storage, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.search = SearchQuery.objects.create(query="most", site="rp.pl")
+
+    def add_article(self, title, url, body):
+        html = f"<html><body><h1>{title}</h1><p>{body}</p><script>var x = 'most';</script></body></html>"
+        artifact = storage.put_bytes(html.encode(), "html")
+        FoundArticle.objects.create(search=self.search, title=title, url=url, artifact=artifact, downloaded=True)
+        return artifact
+
+    def test_indexed_articles_are_found_by_rank(self):
+        library.index_artifact(self.add_article("Most na Wiśle", "https://www.rp.pl/a", "Budowa mostu trwa."))
+        library.index_artifact(self.add_article("Wybory", "https://www.rp.pl/b", "Nowy most w Gdańsku i wybory."))
+        self.add_article("Pogoda", "https://www.rp.pl/c", "Deszcz i wiatr.")
+
+        results = library.search("most")
+        self.assertEqual([r["title"] for r in results], ["Most na Wiśle", "Wybory"])
+        self.assertIn("<b>", results[1]["snippet"])
+        self.assertEqual(list(library.unindexed_artifacts()), [Artifact.objects.get(articles__title="Pogoda")])
+        self.assertEqual(library.search("most", site="onet.pl"), [])
+
+    def test_library_view_answers_from_local_corpus(self):
+        library.index_artifact(self.add_article("Most", "https://www.rp.pl/a", "Remont mostu Poniatowskiego."))
+        response = Client().get("/api/library/", {"q": "poniatowskiego", "site": "rp.pl"})
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([r["url"] for r in data["results"]], ["https://www.rp.pl/a"])
+        self.assertIn("took_ms", data)
+        self.assertEqual(Client().get("/api/library/").status_code, 400)
+
+    def test_saved_artifacts_are_queued_for_indexing(self):
+        artifact = storage.put_bytes(b"<html><p>most</p></html>", "html")
+        with patch("search.tasks.index_article_text.delay") as index_delay:
+            with self.captureOnCommitCallbacks(execute=True):
+                save_found_articles(self.search.id, [
+                    (0, {"title": "A", "url": "https://rp.pl/a", "artifact": artifact.sha256, "downloaded": True}),
+                ])
+        index_delay.assert_called_once_with(artifact.id)
+
+
+class FixtureSiteTests(TestCase):
+    """
+    Testy lokalnego serwisu testowego używanego przez komendę benchmark_search.
+    """
+
+    def serve(self, **config):
+        server = FixtureServer(FixtureConfig(**config)).start()
+        self.addCleanup(server.stop)
+        site = f"127.0.0.1:{server.port}"
+        overrides = override_settings(
+            SITE_ADAPTERS={site: server.adapter()}, SITE_RATE_LIMITS={"127.0.0.1": (1000.0, 1000)}
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        return server, site
+
+    def test_search_pages_are_crawled_over_http(self):
+        for layout in ("teaser", "cse"):
+            server, site = self.serve(layout=layout, articles=25, per_page=10)
+            links = collect_article_links_http("most", site, max_results=15)
+
+            self.assertEqual(len(links), 15, layout)
+            self.assertTrue(all(url.startswith(server.url() + "/kraj/") for _, url in links))
+            self.assertEqual(server.config.hits, {"search": 2})
+
+    def test_article_pages_carry_consent_weight_and_pdf_links(self):
+        server, site = self.serve(consent=True, page_weight=50000, pdf_every=2)
+        session = requests.Session()
+        self.addCleanup(session.close)
+        html = session.get(server.url() + "/kraj/abc-4-artykul").text
+
+        self.assertIn("Akceptuję", html)
+        self.assertGreater(len(html), 50000)
+        self.assertIn('href="/pdf/abc-4.pdf"', html)
+        self.assertNotIn(".pdf", session.get(server.url() + "/kraj/abc-3-artykul").text)
+
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        with patch.object(storage, "ARTICLES_DIR", tmp.name), patch.object(storage, "TMP_DIR", tmp.name):
+            artifact = download_pdf(server.url() + "/pdf/abc-4.pdf")
+        self.assertEqual(artifact.ext, "pdf")
+        self.assertEqual(server.config.hits["pdf"], 1)
+
+
+    def test_benchmark_removes_fixture_site_rows_and_files(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        for name in ("ARTICLES_DIR", "TMP_DIR"):
+            patcher = patch.object(storage, name, tmp.name)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        kept = storage.put_bytes(b"%PDF-1.4 real article", "pdf")
+        Artifact.objects.filter(id=kept.id).update(ref_count=1)
+
+        def fake_search(query, site, **kwargs):
+            SiteProfile.objects.update_or_create(
+                domain=site_domain(site), defaults={"fetch_strategy": SiteProfile.HTTP}
+            )
+            SelectorStat.objects.get_or_create(domain=site_domain(site), selector="article a")
+            artifact = storage.put_bytes(f"%PDF-1.4 {query}".encode(), "pdf")
+            return [{"downloaded": True, "artifact": artifact.sha256}, {"downloaded": True, "artifact": kept.sha256}]
+
+        with patch("search.management.commands.benchmark_search.webdriver.Remote"), \
+                patch("search.selenium_client.search_and_find_pdfs", side_effect=fake_search), \
+                self.captureOnCommitCallbacks(execute=True):
+            call_command("benchmark_search", searches=2, results=1, stdout=io.StringIO())
+
+        self.assertFalse(SiteProfile.objects.exists())
+        self.assertFalse(SelectorStat.objects.exists())
+        self.assertEqual(list(Artifact.objects.all()), [kept])
+
+    def test_benchmark_reports_missing_local_chrome(self):
+        with patch("search.management.commands.benchmark_search.webdriver.Chrome",
+                   side_effect=WebDriverException("chrome not found")):
+            with self.assertRaisesMessage(CommandError, "does not include it"):
+                call_command("benchmark_search", local_chrome=True, stdout=io.StringIO())
+
+
+class FakeHashRedis:
+    """Minimalny Redis z hashem liczników (HINCRBY/HINCRBYFLOAT/HGETALL)."""
+
+    def __init__(self):
+        self.hash = {}
+
+    def hincrby(self, key, field, amount=1):
+        self.hash[field] = self.hash.get(field, 0) + amount
+
+    def hincrbyfloat(self, key, field, amount):
+        self.hash[field] = self.hash.get(field, 0) + amount
+
+    def hgetall(self, key):
+        return {field.encode(): str(value).encode() for field, value in self.hash.items()}
+
+    def pipeline(self, transaction=True):
+        redis = self
+
+        class Pipeline:
+            def __getattr__(self, name):
+                return getattr(redis, name)
+
+            def execute(self):
+                return []
+
+        return Pipeline()
+
+
+class StageTimingTests(TestCase):
+    """
+    Testy pomiaru czasu etapów wyszukiwania i eksportu metryk.
+    """
+
+    def setUp(self):
+        self.redis = FakeHashRedis()
+        patcher = patch("search.metrics.get_redis", return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_spans_are_stored_per_search_including_lane_threads(self):
+        search = SearchQuery.objects.create(query="most", site="www.rp.pl")
+        for _ in range(2):
+            with timing.trace(search.id, search.site, "discovery"):
+                with timing.span("session"):
+                    pass
+                with ThreadPoolExecutor(max_workers=2) as executor:
+                    futures = [timing.submit(executor, timing.span("print")(lambda: None)) for _ in range(3)]
+                    for future in futures:
+                        future.result()
+
+        self.assertEqual(
+            dict(search.timings.values_list("stage", "count")), {"session": 2, "print": 6}
+        )
+        self.assertEqual(
+            self.redis.hash[metrics.metric_field(
+                "search_stage_seconds_count", {"stage": "print", "site": "rp.pl", "queue": "discovery"}
+            )], 6,
+        )
+
+    @override_settings(SITE_ADAPTERS={"example.pl": {"search_url": "https://example.pl/?q={query}"}})
+    def test_site_label_is_limited_to_known_sites(self):
+        SiteProfile.objects.create(domain="learned.pl")
+        SiteProfile.objects.create(domain="configured.pl", search_url="https://configured.pl/?q={query}")
+        self.assertEqual(sites.metric_site("https://wiadomosci.onet.pl"), "onet.pl")
+        self.assertEqual(sites.metric_site("www.example.pl"), "example.pl")
+        self.assertEqual(sites.metric_site("configured.pl"), "configured.pl")
+        self.assertEqual(sites.metric_site("learned.pl"), sites.OTHER_SITE)
+
+        search = SearchQuery.objects.create(query="most", site="random-blog.example.com")
+        with timing.trace(search.id, search.site, "discovery"):
+            with timing.span("session"):
+                pass
+        self.assertEqual(self.redis.hash[metrics.metric_field(
+            "search_stage_seconds_count", {"stage": "session", "site": "other", "queue": "discovery"}
+        )], 1)
+        self.assertEqual(search.timings.get().stage, "session")
+
+    def test_spans_outside_a_search_are_only_exported(self):
+        with timing.span("download"):
+            pass
+        self.assertFalse(SearchStageTiming.objects.exists())
+        self.assertEqual(self.redis.hash[metrics.metric_field(
+            "search_stage_seconds_count", {"stage": "download", "site": "", "queue": ""}
+        )], 1)
+
+    def test_metrics_endpoint_exports_prometheus_text(self):
+        metrics.incr("render_cache_hits_total", 3)
+        metrics.observe("search_stage_seconds", 0.3, buckets=(0.1, 1.0), stage="print", site="rp.pl", queue="render")
+        response = Client().get("/metrics")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        lines = response.content.decode().splitlines()
+        labels = 'queue="render",site="rp.pl",stage="print"'
+        self.assertEqual(lines, [
+            "# TYPE render_cache_hits_total counter",
+            "render_cache_hits_total 3",
+            "# TYPE search_stage_seconds histogram",
+            f'search_stage_seconds_bucket{{le="0.1",{labels}}} 0',
+            f'search_stage_seconds_bucket{{le="1.0",{labels}}} 1',
+            f'search_stage_seconds_bucket{{le="+Inf",{labels}}} 1',
+            f"search_stage_seconds_sum{{{labels}}} 0.3",
+            f"search_stage_seconds_count{{{labels}}} 1",
+        ])
@@ -0,0 +1,117 @@
+"""
+Moduł pomiaru czasu etapów wyszukiwania.
+span(stage) mierzy czas etapu i zapisuje go w histogramie
+search_stage_seconds z etykietami stage, site i queue (search/metrics.py,
+eksport w /metrics). Etapy: session (sesja przeglądarki), search_page
+(strona wyników), consent (zgoda na cookies), extract_links (wybór linków),
+article_page (strona artykułu), print (zapis strony jako PDF), download
+(pobranie pliku PDF) oraz search (całe zadanie). Etykieta site to serwis
+z adapterem albo "other" (sites.metric_site), więc liczba serii jest
+ograniczona; szczegóły dla pojedynczych wyszukiwań są w SearchStageTiming.
+
+Zadanie Celery otwiera trace(search_id, site, queue): sumy czasów etapów
+są zbierane w pamięci i po zakończeniu zadania dodawane do SearchStageTiming
+danego wyszukiwania. Kontekst jest przekazywany do wątków ścieżek
+artykułów przez submit() (contextvars).
+"""
+
+import time
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db.models import F
+from django.db.models.functions import Greatest
+
+from . import metrics
+from .models import SearchStageTiming
+from .sites import metric_site
+
+# Konfiguracja loggera dla tego modułu
+logger = logging.getLogger(__name__)
+
+# Przedziały histogramu czasu etapów w sekundach (etapy trwają od ułamków sekundy do minut)
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# Bieżący pomiar zadania (None poza zadaniem, np. w komendach)
+_current = contextvars.ContextVar("search_trace", default=None)
+
+
+class Trace:
+    """Sumy czasów etapów jednego zadania wyszukiwania (wywoływane z wielu wątków)."""
+
+    def __init__(self, search_id=None, site="", queue=""):
+        self.search_id = search_id
+        self.site = metric_site(site) if site else ""
+        self.queue = queue
+        self.stages = {}
+        self.lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self.lock:
+            count, total, longest = self.stages.get(stage, (0, 0.0, 0.0))
+            self.stages[stage] = (count + 1, total + seconds, max(longest, seconds))
+
+    def flush(self):
+        """Dodanie zebranych sum do SearchStageTiming (zadania fan-out sumują się)."""
+        with self.lock:
+            stages, self.stages = self.stages, {}
+        if self.search_id is None:
+            return
+        for stage, (count, total, longest) in stages.items():
+            timing, created = SearchStageTiming.objects.get_or_create(
+                search_id=self.search_id, stage=stage,
+                defaults={"count": count, "total_seconds": total, "max_seconds": longest},
+            )
+            if not created:
+                SearchStageTiming.objects.filter(id=timing.id).update(
+                    count=F("count") + count,
+                    total_seconds=F("total_seconds") + total,
+                    max_seconds=Greatest(F("max_seconds"), longest),
+                )
+
+
+def task_queue(task_name):
+    """Kolejka Celery zadania według CELERY_TASK_ROUTES (etykieta queue)."""
+    return settings.CELERY_TASK_ROUTES.get(task_name, {}).get("queue", "celery")
+
+
+@contextmanager
+def trace(search_id, site, queue):
+    """Pomiar etapów zadania wyszukiwania; sumy są zapisywane po wyjściu."""
+    current = Trace(search_id, site, queue)
+    token = _current.set(current)
+    try:
+        yield current
+    finally:
+        _current.reset(token)
+        try:
+            current.flush()
+        except Exception:
+            # Zapis pomiarów nie może przesłonić wyniku zadania
+            logger.exception("Could not store stage timings for search %s", search_id)
+
+
+@contextmanager
+def span(stage):
+    """Pomiar czasu etapu (także jako dekorator funkcji)."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        current = _current.get()
+        site, queue = (current.site, current.queue) if current else ("", "")
+        metrics.observe(
+            "search_stage_seconds", seconds, buckets=STAGE_BUCKETS, stage=stage, site=site, queue=queue
+        )
+        if current is not None:
+            current.add(stage, seconds)
+        logger.debug("Stage %s took %.3fs", stage, seconds)
+
+
+def submit(executor, fn, *args):
+    """executor.submit z kopią bieżącego kontekstu (pomiar trafia do tego samego zadania)."""
+    return executor.submit(contextvars.copy_context().run, fn, *args)
@@ -14,6 +14,10 @@ urlpatterns = [
     path("search/", views.search_view, name="search_search"),
     # Endpoint sprawdzania statusu wyszukiwania (GET)
     path("search/<int:search_id>/", views.search_status_view, name="search_status"),
+    # Endpoint wyszukiwania w lokalnej bibliotece artykułów (GET)
+    path("library/", views.library_view, name="library"),
     # Endpoint pobierania plików PDF (GET)
     path("files/<str:filename>", views.file_view, name="file_view"),
+    # Endpoint ponownego pobrania usuniętego pliku artykułu (POST)
+    path("articles/<int:article_id>/refetch/", views.refetch_view, name="article_refetch"),
 ]
@@ -5,12 +5,24 @@ Zawiera endpointy API do wyszukiwania artykułów i pobierania plików PDF.
 
 import os
 import json
+import time
 import urllib.parse
-from django.http import JsonResponse, HttpResponseNotFound, FileResponse
+from django.http import (
+    FileResponse, HttpResponse, HttpResponseNotFound, HttpResponseNotModified, JsonResponse,
+)
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_etags
 from django.views.decorators.csrf import csrf_exempt
 from django.conf import settings
-from .models import SearchQuery, FoundArticle
-from .tasks import perform_search
+from django.core.cache import cache
+from . import blocking, library, metrics, reader, snapshots, storage
+from .coalescing import find_reusable_search, search_key, search_lock
+from .models import Artifact, SearchQuery, FoundArticle
+from .selenium_client import sanitize_filename
+from .tasks import perform_search, refetch_article
+
+# Czas w sekundach, przez jaki kolejne żądania nie zlecają ponownie pobrania tego samego artykułu
+REFETCH_GUARD_TTL = 600
 
 
 @csrf_exempt
@@ -18,7 +30,9 @@ def search_view(request):
     """
     Endpoint do inicjalizacji wyszukiwania artykułów.
     Przyjmuje żądanie POST z parametrami 'query' i 'site'.
-    Zwraca ID wyszukiwania i status 'pending'.
+    Zwraca ID wyszukiwania i status 'pending'; z opcją 'include_local'
+    również artykuły z lokalnej biblioteki, zanim wyszukiwanie na żywo
+    zbierze nowe wyniki.
     """
     # Sprawdzenie czy żądanie jest typu POST
     if request.method != "POST":
@@ -38,49 +52,136 @@ def search_view(request):
     if not query or not site:
         return JsonResponse({"error": "query and site required"}, status=400)
 
-    # Utworzenie rekordu wyszukiwania w bazie danych
-    search = SearchQuery.objects.create(query=query, site=site, status="pending")
+    # Opcjonalna liczba artykułów przetwarzanych równolegle
+    concurrency = data.get("concurrency")
+    if concurrency is not None:
+        try:
+            concurrency = int(concurrency)
+        except (TypeError, ValueError):
+            return JsonResponse({"error": "concurrency must be an integer"}, status=400)
+        concurrency = max(1, min(concurrency, settings.SEARCH_MAX_ARTICLE_CONCURRENCY))
+
+    # Opcjonalna liczba artykułów do zebrania (z kolejnych stron wyników)
+    max_results = data.get("max_results")
+    if max_results is not None:
+        try:
+            max_results = int(max_results)
+        except (TypeError, ValueError):
+            return JsonResponse({"error": "max_results must be an integer"}, status=400)
+        max_results = max(1, min(max_results, settings.SEARCH_MAX_RESULTS))
+
+    # Opcjonalne pomijanie artykułów znalezionych we wcześniejszych wyszukiwaniach
+    only_new = data.get("only_new", False)
+    if not isinstance(only_new, bool):
+        return JsonResponse({"error": "only_new must be a boolean"}, status=400)
+
+    # Opcjonalny profil blokowania zasobów stron artykułów
+    blocking_profile = data.get("blocking_profile") or ""
+    if blocking_profile and blocking_profile not in blocking.PROFILES:
+        return JsonResponse(
+            {"error": f"blocking_profile must be one of: {', '.join(blocking.PROFILES)}"}, status=400
+        )
+
+    # Opcjonalny tryb generowania PDF: sama treść artykułu (reader) lub cała strona (full)
+    render_mode = data.get("render_mode") or ""
+    if render_mode and render_mode not in reader.RENDER_MODES:
+        return JsonResponse(
+            {"error": f"render_mode must be one of: {', '.join(reader.RENDER_MODES)}"}, status=400
+        )
+
+    # Opcjonalne wyniki z lokalnej biblioteki artykułów w odpowiedzi
+    include_local = data.get("include_local", False)
+    if not isinstance(include_local, bool):
+        return JsonResponse({"error": "include_local must be a boolean"}, status=400)
+    extra = {"local_results": local_results(query, site)} if include_local else {}
+
+    # Identyczne wyszukiwanie w toku lub świeżo zakończone jest zwracane zamiast nowego
+    # (poza wyszukiwaniem tylko nowych artykułów - jego wynik zależy od chwili uruchomienia)
+    key = search_key(query, site, render_mode or None, blocking_profile or None)
+    with search_lock(key):
+        existing = None if only_new else find_reusable_search(key, max_results)
+        if existing:
+            return JsonResponse({
+                "search_id": existing.id,
+                "status": existing.status,
+                "reused": True,
+                **extra,
+            })
+
+        # Utworzenie rekordu wyszukiwania w bazie danych
+        search = SearchQuery.objects.create(
+            query=query, site=site, status="pending", concurrency=concurrency,
+            search_key="" if only_new else key,
+            blocking_profile=blocking_profile, render_mode=render_mode, max_results=max_results,
+            only_new=only_new,
+        )
+
+        # Uruchomienie asynchronicznego zadania Celery
+        perform_search.delay(search.id)
+
+    return JsonResponse({"search_id": search.id, "status": "pending", "reused": False, **extra})
+
+
+def local_results(query, site=None, limit=None):
+    """Wyszukiwanie w lokalnej bibliotece artykułów z pomiarem czasu odpowiedzi."""
+    started = time.perf_counter()
+    results = library.search(query, site=site, limit=limit or settings.LIBRARY_RESULTS_LIMIT)
+    metrics.observe("library_search_seconds", time.perf_counter() - started)
+    return results
+
+
+def library_view(request):
+    """
+    Endpoint wyszukiwania w lokalnej bibliotece zapisanych artykułów.
+    Parametry GET: 'q' (zapytanie), opcjonalnie 'site' i 'limit'.
+    Nie uruchamia wyszukiwania na żywo.
+    """
+    query = request.GET.get("q", "").strip()
+    if not query:
+        return JsonResponse({"error": "q required"}, status=400)
 
-    # Uruchomienie asynchronicznego zadania Celery
-    perform_search.delay(search.id)
+    try:
+        limit = int(request.GET.get("limit") or settings.LIBRARY_RESULTS_LIMIT)
+    except ValueError:
+        return JsonResponse({"error": "limit must be an integer"}, status=400)
+    limit = max(1, min(limit, settings.LIBRARY_MAX_RESULTS_LIMIT))
 
-    return JsonResponse({"search_id": search.id, "status": "pending"})
+    started = time.perf_counter()
+    results = local_results(query, site=request.GET.get("site") or None, limit=limit)
+    return JsonResponse({
+        "query": query,
+        "results": results,
+        "took_ms": round((time.perf_counter() - started) * 1000, 1),
+    })
 
 
 def search_status_view(request, search_id):
     """
     Endpoint do sprawdzania statusu wyszukiwania.
     Zwraca status wyszukiwania i listę znalezionych artykułów.
+    Odpowiedź pochodzi z buforowanej migawki i ma ETag - niezmieniony stan
+    zwraca 304 Not Modified (bez zapytań do bazy danych).
     """
-    # Pobranie obiektu wyszukiwania z bazy danych
-    try:
-        search = SearchQuery.objects.get(id=search_id)
-    except SearchQuery.DoesNotExist:
+    started = time.perf_counter()
+
+    # Pobranie migawki stanu wyszukiwania
+    snapshot, hit = snapshots.get_snapshot(search_id)
+    if snapshot is None:
         return JsonResponse({"error": "search not found"}, status=404)
 
-    # Pobranie wszystkich znalezionych artykułów
-    results = FoundArticle.objects.filter(search=search)
-    items = []
-    
-    # Przygotowanie listy wyników
-    for fa in results:
-        file_url = None
-        # Generowanie URL do pobrania pliku PDF
-        if fa.downloaded and fa.pdf_filename:
-            file_url = f"/api/files/{urllib.parse.quote(fa.pdf_filename)}"
-        items.append({
-            "id": fa.id,
-            "title": fa.title,
-            "url": fa.url,
-            "downloaded": fa.downloaded,
-            "file_url": file_url,
-        })
+    # Żądanie warunkowe - klient ma już aktualny stan
+    if snapshot["etag"] in parse_etags(request.headers.get("If-None-Match", "")):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(snapshot["body"], content_type="application/json")
+    response["ETag"] = snapshot["etag"]
+    response["Cache-Control"] = "no-cache"
 
-    return JsonResponse({
-        "search_id": search.id,
-        "status": search.status,
-        "results": items,
-    })
+    # Współczynnik trafień i rozkład czasu odpowiedzi (p99) endpointu
+    labels = {"cache": "hit" if hit else "miss", "code": str(response.status_code)}
+    metrics.incr("status_view_requests_total", **labels)
+    metrics.observe("status_view_seconds", time.perf_counter() - started, **labels)
+    return response
 
 
 def file_view(request, filename):
@@ -89,6 +190,11 @@ def file_view(request, filename):
     filename = urllib.parse.unquote(filename)
     filename = os.path.basename(filename)
     
+    # Pliki z magazynu adresowanego treścią (<sha256>.<rozszerzenie>)
+    blob = storage.parse_blob_name(filename)
+    if blob:
+        return blob_file_response(request, *blob)
+    
     # Walidacja nazwy pliku (zabezpieczenie przed path traversal)
     if not filename or ".." in filename or "/" in filename or "\\" in filename:
         return HttpResponseNotFound()
@@ -107,11 +213,100 @@ def file_view(request, filename):
     if not os.path.exists(filepath):
         return HttpResponseNotFound()
     
-    # Zwrócenie pliku jako odpowiedź HTTP
+    # Zwrócenie pliku jako odpowiedź HTTP (starsze pliki mogą być nadpisane - bez długiego cache)
     try:
-        file_handle = open(filepath, "rb")
-        response = FileResponse(file_handle, as_attachment=True, filename=filename)
-        response['Content-Type'] = 'application/pdf'
+        return file_response(request, filepath, filename, 'application/pdf', immutable=False)
+    except OSError:
+        return HttpResponseNotFound()
+
+
+def blob_file_response(request, sha256, ext):
+    """Odpowiedź z plikiem z magazynu artefaktów; nazwa pobieranego pliku pochodzi z tytułu."""
+    artifact = Artifact.objects.filter(sha256=sha256).first()
+    if artifact is None:
+        return HttpResponseNotFound()
+    
+    # Plik usunięty przez limit miejsca - ponowne pobranie w tle
+    article = FoundArticle.objects.filter(artifact=artifact).only("title").first()
+    if artifact.evicted:
+        if article:
+            schedule_refetch(article.id)
+        return JsonResponse({"error": "file evicted", "refetching": article is not None}, status=410)
+    
+    filepath = storage.blob_path(sha256, ext)
+    if not os.path.exists(filepath):
+        return HttpResponseNotFound()
+    storage.touch(artifact.id)
+    
+    title = sanitize_filename(article.title) if article else ""
+    download_name = f"{title or sha256}.{ext}"
+    
+    # Treść pliku nigdy się nie zmienia (nazwa to skrót treści)
+    return file_response(request, filepath, download_name, storage.CONTENT_TYPES[ext], immutable=True)
+
+
+def file_response(request, filepath, download_name, content_type, immutable):
+    """
+    Odpowiedź z plikiem z katalogu mediów.
+    W trybie FILE_SERVE_MODE="nginx" Django tylko sprawdza dostęp, a bajty
+    wysyła nginx (X-Accel-Redirect, sendfile, obsługa Range, ETag i
+    Last-Modified). W trybie "django" plik jest strumieniowany przez
+    FileResponse z tymi samymi walidatorami (ETag w formacie nginx, więc zmiana
+    trybu nie unieważnia pamięci podręcznej klientów) i obsługą 304.
+    """
+    stat = os.stat(filepath)
+    cache_control = (
+        f"public, max-age={settings.FILE_CACHE_MAX_AGE}, immutable" if immutable else "no-cache"
+    )
+
+    if settings.FILE_SERVE_MODE == "nginx":
+        relative = os.path.relpath(filepath, settings.MEDIA_ROOT).replace(os.sep, "/")
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = settings.FILE_ACCEL_PREFIX + urllib.parse.quote(relative)
+        response["Content-Disposition"] = content_disposition_header(True, download_name)
+        response["Cache-Control"] = cache_control
         return response
+
+    etag = '"%x-%x"' % (int(stat.st_mtime), stat.st_size)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(stat.st_mtime),
+        "Cache-Control": cache_control,
+    }
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        response = FileResponse(open(filepath, "rb"), as_attachment=True, filename=download_name)
+        response['Content-Type'] = content_type
+    for name, value in headers.items():
+        response[name] = value
+    return response
+
+
+@csrf_exempt
+def refetch_view(request, article_id):
+    """
+    Endpoint do ponownego pobrania artykułu, którego plik został usunięty
+    z dysku (evicted). Zwraca 202, gdy pobieranie zostało zlecone.
+    """
+    # Sprawdzenie czy żądanie jest typu POST
+    if request.method != "POST":
+        return JsonResponse({"error": "POST required"}, status=405)
+
+    article = FoundArticle.objects.filter(id=article_id).first()
+    if article is None:
+        return JsonResponse({"error": "article not found"}, status=404)
+    if not article.evicted:
+        return JsonResponse({"id": article.id, "status": "available"})
+
+    schedule_refetch(article.id)
+    return JsonResponse({"id": article.id, "status": "refetching"}, status=202)
+
+
+def schedule_refetch(article_id):
+    """Zlecenie zadania refetch_article (najwyżej jedno na artykuł w oknie REFETCH_GUARD_TTL)."""
+    try:
+        first = cache.add(f"refetch:{article_id}", 1, timeout=REFETCH_GUARD_TTL)
     except Exception:
-        return HttpResponseNotFound()
+        first = True
+    if first:
+        refetch_article.delay(article_id)
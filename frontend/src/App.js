@@ -46,7 +46,11 @@ function App() {
         setError("Search failed");
         setLoading(false);
       } else {
-        // Wyszukiwanie w toku - ponowne odpytanie za 2 sekundy
+        // Wyszukiwanie w toku - wyświetlenie dotychczasowych wyników
+        // i ponowne odpytanie za 2 sekundy
+        if (data.results && data.results.length) {
+          setResults(data.results);
+        }
         setTimeout(() => pollSearchStatus(id), 2000);
       }
     } catch (err) {
@@ -56,6 +60,70 @@ function App() {
     }
   };
 
+  /**
+   * Funkcja śledząca wyszukiwanie przez strumień zdarzeń (SSE).
+   * Przy braku strumienia (np. serwer deweloperski) przechodzi na odpytywanie.
+   * @param {number} id - ID wyszukiwania
+   */
+  const watchSearch = (id) => {
+    if (!window.EventSource) {
+      pollSearchStatus(id);
+      return;
+    }
+
+    const source = new EventSource(`/api/search/${id}/events/`);
+    let items = [];
+    let finished = false;
+
+    // Zakończenie śledzenia po zmianie statusu na końcowy
+    const finish = (status) => {
+      finished = true;
+      source.close();
+      if (status === "error") {
+        setError("Search failed");
+      }
+      setLoading(false);
+    };
+
+    // Stan początkowy: status i dotychczasowe wyniki
+    source.addEventListener("snapshot", (e) => {
+      const data = JSON.parse(e.data);
+      items = data.results || [];
+      setResults(items.length || data.status === "done" ? items : null);
+      if (data.status === "done" || data.status === "error") {
+        finish(data.status);
+      }
+    });
+
+    // Nowy wynik (pomijany, jeśli był już w stanie początkowym)
+    source.addEventListener("result", (e) => {
+      const item = JSON.parse(e.data);
+      if (!items.some((r) => r.id === item.id)) {
+        items = [...items, item];
+        setResults(items);
+      }
+    });
+
+    // Zmiana statusu wyszukiwania
+    source.addEventListener("status", (e) => {
+      const data = JSON.parse(e.data);
+      if (data.status === "done") {
+        setResults(items);
+      }
+      if (data.status === "done" || data.status === "error") {
+        finish(data.status);
+      }
+    });
+
+    // Strumień niedostępny - powrót do odpytywania
+    source.onerror = () => {
+      source.close();
+      if (!finished) {
+        pollSearchStatus(id);
+      }
+    };
+  };
+
   /**
    * Funkcja inicjująca wyszukiwanie.
    * Wysyła żądanie POST z parametrami wyszukiwania.
@@ -85,9 +153,9 @@ function App() {
         throw new Error(data.error || "Search failed");
       }
 
-      // Zapisanie ID wyszukiwania i rozpoczęcie odpytywania
+      // Zapisanie ID wyszukiwania i rozpoczęcie śledzenia
       setSearchId(data.search_id);
-      pollSearchStatus(data.search_id);
+      watchSearch(data.search_id);
     } catch (err) {
       // Obsługa błędów sieciowych
       setError(err.message || "Error occurred during search");